@@ -0,0 +1,404 @@
+"""
+Banc de mesure du Mini SGBD JSON.
+
+Génère des bases synthétiques (dans un répertoire temporaire, databases/ n'est pas touché)
+et appelle les vraies fonctions de main.py sans interaction : insertions en masse
+(insert_rows) et unitaires (insert_data), search_table avec des clauses WHERE variées,
+alter_on_tables, alter_table et require_permission. Les réponses aux prompts sont
+fournies par une file de réponses, la sortie des commandes est jetée.
+
+Résultat JSON (stdout ou --out) : débit, latences p50 / p99 par opération et pic de mémoire
+(RSS) par taille, temps de démarrage d'une commande en ligne (-c) ; --compare <ancien.json>
+affiche l'écart avec une mesure précédente.
+
+    python bench.py --rows 10000,100000 --out bench.json
+    python bench.py --rows 10000 --compare bench.json
+"""
+import argparse
+import builtins
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import main
+
+BENCH_USER = "bench"
+BENCH_DB = "bench"
+CITIES = ["Antananarivo", "Toamasina", "Fianarantsoa", "Mahajanga", "Toliara", "Antsiranana", "Paris", "Lyon"]
+KINDS = ["click", "view", "buy", "login", "logout"]
+
+# Schémas : (nom, type, not_null, unique, auto_increment, défaut) ; tous les types supportés
+PEOPLE_SCHEMA = [
+    ("id", "int", True, True, True, ""),
+    ("name", "str", True, False, False, ""),
+    ("city", "str", False, False, False, ""),
+    ("age", "int", False, False, False, ""),
+    ("score", "float", False, False, False, "0"),
+    ("active", "bool", False, False, False, ""),
+    ("born", "date", False, False, False, ""),
+    ("seen", "datetime", False, False, False, ""),
+]
+EVENTS_SCHEMA = [
+    ("id", "int", True, True, True, ""),
+    ("kind", "str", True, False, False, ""),
+    ("at", "datetime", False, False, False, ""),
+    ("tags", "list", False, False, False, ""),
+    ("payload", "dict", False, False, False, ""),
+]
+
+MAIN_DIR = os.path.dirname(os.path.abspath(main.__file__))
+# (libellé, arguments de l'interpréteur) : démarrage à froid d'un processus, répertoire vide
+STARTUP_COMMANDS = [
+    ("python -c pass", ["-c", "pass"]),
+    ("import main", ["-c", "import main"]),
+    ("python -m main -c show_db", ["-m", "main", "-c", "show_db"]),
+    ("python main.py -c show_db", [os.path.join(MAIN_DIR, "main.py"), "-c", "show_db"]),
+]
+
+# (libellé, table, colonnes, where, group by)
+SEARCHES = [
+    ("point id", "people", "*", "id = {k}", None),
+    ("range age", "people", "id,age", "age between 20 and 25", None),
+    ("eq city", "people", "id,city", "city = 'Paris'", None),
+    ("like prefix", "people", "id,name", "name like 'n12%'", None),
+    ("and float/bool", "people", "id,score", "score > 99.5 and active = true", None),
+    ("date range", "people", "id,born", "born >= '2004-06-01'", None),
+    ("in / or", "people", "id", "city in ('Lyon', 'Toliara') or age < 1", None),
+    ("group by", "people", "city,count(*),avg(age)", None, "city"),
+    ("events kind", "events", "id,at", "kind = 'buy' and id < {k}", None),
+]
+
+
+# ---------- Outils ----------
+
+@contextlib.contextmanager
+def scripted(answers=()):
+    """Réponses successives aux input() des commandes ; sortie standard jetée."""
+    queue = iter(answers)
+    real_input = builtins.input
+
+    def fake_input(prompt_txt=""):
+        try:
+            return next(queue)
+        except StopIteration:
+            raise RuntimeError(f"réponse manquante pour le prompt {prompt_txt!r}") from None
+
+    builtins.input = fake_input
+    try:
+        with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        builtins.input = real_input
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def summarize(latencies, units=1):
+    """latencies en secondes ; units : éléments traités par appel (débit en éléments/s)."""
+    total = sum(latencies)
+    return {
+        "count": len(latencies),
+        "total_s": round(total, 4),
+        "ops_per_s": round(len(latencies) * units / total, 1) if total else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # octets sur macOS
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ---------- Données synthétiques ----------
+
+def create_table(name, schema, partition_spec=None):
+    answers = []
+    for col, typ, not_null, unique, auto_inc, default in schema:
+        answers += [col, typ, "o" if not_null else "n", "o" if unique else "n"]
+        if typ == "int":
+            answers.append("o" if auto_inc else "n")
+        answers.append(default)
+    answers.append("")
+    with scripted(answers):
+        main.create_table(name, partition_spec)
+
+
+def people_records(rng, n, start):
+    base = date(1950, 1, 1)
+    for i in range(start, start + n):
+        yield {
+            "name": f"n{i}",
+            "city": rng.choice(CITIES),
+            "age": str(rng.randrange(0, 90)),
+            "score": f"{rng.uniform(0, 100):.2f}",
+            "active": rng.choice(("true", "false")),
+            "born": (base + timedelta(days=rng.randrange(0, 20000))).isoformat(),
+            "seen": datetime(2024, 1, 1, rng.randrange(24), rng.randrange(60)).isoformat(),
+        }
+
+
+def event_records(rng, n):
+    for _ in range(n):
+        yield {
+            "kind": rng.choice(KINDS),
+            "at": datetime(2024, rng.randrange(1, 13), rng.randrange(1, 29), rng.randrange(24)).isoformat(),
+            "tags": json.dumps(rng.sample(KINDS, 2)),
+            "payload": json.dumps({"v": rng.randrange(1000)}),
+        }
+
+
+def setup_session(root):
+    """Base de mesure dans `root` : utilisateur admin de la base, base courante."""
+    main.DB_ROOT = root
+    main.USERS_PATH = os.path.join(root, "users.json")
+    os.makedirs(root, exist_ok=True)
+    with scripted():
+        main.create_user(BENCH_USER, "bench")
+        users = main.load_users()
+        users[BENCH_USER]["rights"] = {BENCH_DB: ["admin"]}
+        main.save_users(users)
+        main.set_current_user(BENCH_USER)
+        main.create_db(BENCH_DB)
+    main.current_db = BENCH_DB
+
+
+# ---------- Mesures ----------
+
+def bench_bulk_insert(results, rows, batch, rng):
+    create_table("people", PEOPLE_SCHEMA)
+    create_table("events", EVENTS_SCHEMA, "hash(id) 4")
+    for table, gen in (("people", lambda n, s: people_records(rng, n, s)), ("events", lambda n, s: event_records(rng, n))):
+        latencies = []
+        done = 0
+        while done < rows:
+            n = min(batch, rows - done)
+            records = list(gen(n, done))
+            with scripted():
+                start = time.perf_counter()
+                inserted = main.insert_rows(table, records)
+                latencies.append(time.perf_counter() - start)
+            if inserted != n:
+                raise RuntimeError(f"insert_rows({table}) : {inserted} ligne(s) au lieu de {n}")
+            done += n
+        stats = summarize(latencies)
+        stats["rows_per_s"] = round(rows / stats["total_s"], 1) if stats["total_s"] else None
+        results[f"bulk_insert {table}"] = stats
+
+
+def bench_single_insert(results, count, rng):
+    latencies = []
+    for rec in people_records(rng, count, 10 ** 9):
+        answers = [rec[c] for c, *_ in PEOPLE_SCHEMA[1:]]
+        with scripted(answers):
+            latencies.append(timed(main.insert_data, "people"))
+    results["insert_data people"] = summarize(latencies)
+
+
+def bench_search(results, rows, repeat, rng):
+    for label, table, cols, where, group_by in SEARCHES:
+        latencies = []
+        for _ in range(repeat):
+            where_txt = where.format(k=rng.randrange(1, rows + 1)) if where else None
+            with scripted():
+                latencies.append(timed(main.search_table, table, cols.split(","), where_txt,
+                                       group_by.split(",") if group_by else None))
+        results[f"search {label}"] = summarize(latencies)
+
+
+def bench_update(results, rows, repeat, rng):
+    latencies = []
+    for _ in range(repeat):
+        answers = ["o", "age", str(rng.randrange(90))]
+        with scripted(answers):
+            latencies.append(timed(main.alter_on_tables, "people", f"id = {rng.randrange(1, rows + 1)}"))
+    results["alter_on_tables people"] = summarize(latencies)
+
+
+def bench_alter(results, repeat):
+    steps = [
+        ("add", ["1", "extra", "int", "n", "n", "n", "7"]),
+        ("rename", ["4", "extra", "extra2"]),
+        ("retype", ["3", "extra2", "float"]),
+        ("drop", ["2", "extra2"]),
+    ]
+    latencies = {label: [] for label, _ in steps}
+    for _ in range(repeat):
+        for label, answers in steps:
+            with scripted(answers):
+                latencies[label].append(timed(main.alter_table, "people"))
+    for label, values in latencies.items():
+        results[f"alter_table {label}"] = summarize(values)
+    with scripted():
+        results["rewrite people"] = summarize([timed(main.rewrite_table, "people")])
+
+
+def bench_permissions(results, count):
+    start = time.perf_counter()
+    with scripted():
+        for _ in range(count):
+            main.require_permission(BENCH_DB, "read")
+    elapsed = time.perf_counter() - start
+    results["require_permission"] = {
+        "count": count,
+        "total_s": round(elapsed, 4),
+        "ops_per_s": round(count / elapsed, 1) if elapsed else None,
+        "p50_ms": round(elapsed / count * 1000, 4),
+        "p99_ms": None,  # appels trop courts pour être chronométrés un à un
+    }
+
+
+def bench_startup(repeat):
+    """Temps de démarrage (processus complet) des appels en ligne de commande."""
+    env = dict(os.environ, PYTHONPATH=MAIN_DIR + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="sgbd-startup-") as cwd:
+        for label, cmd in STARTUP_COMMANDS:
+            cmd = [sys.executable] + cmd
+            subprocess.run(cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL, check=True)  # __pycache__ à jour
+            latencies = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                subprocess.run(cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL, check=True)
+                latencies.append(time.perf_counter() - start)
+            results[label] = summarize(latencies)
+    return results
+
+
+def run_size(rows, args):
+    """Toutes les mesures pour une taille ; retourne le bloc JSON de cette taille."""
+    rng = random.Random(args.seed)
+    root = tempfile.mkdtemp(prefix="sgbd-bench-")
+    results = {}
+    try:
+        setup_session(root)
+        batch = args.batch or max(10000, rows // 10)
+        bench_bulk_insert(results, rows, batch, rng)
+        bench_single_insert(results, args.single, rng)
+        bench_search(results, rows, args.repeat, rng)
+        bench_update(results, rows, args.repeat, rng)
+        bench_alter(results, max(1, args.repeat // 5))
+        bench_permissions(results, 1000)
+    finally:
+        main.shutdown_scan_pool()
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+        else:
+            print(f"Base conservée : {root}", file=sys.stderr)
+    return {"rows": rows, "peak_rss_kb": peak_rss_kb(), "results": results}
+
+
+def compare(old, new):
+    """Écart p50 par (taille, opération) ; plus lent de plus de 10 % : signalé."""
+    old_runs = {run["rows"]: run["results"] for run in old.get("runs", [])}
+    old_runs["démarrage"] = old.get("startup")
+    print(f"Comparaison {old.get('commit')} -> {new.get('commit')} (p50, ms)")
+    for run in new["runs"] + [{"rows": "démarrage", "results": new.get("startup")}]:
+        before = old_runs.get(run["rows"])
+        if not before or not run["results"]:
+            continue
+        for op, stats in run["results"].items():
+            prev = before.get(op)
+            if not prev or not prev.get("p50_ms") or stats.get("p50_ms") is None:
+                continue
+            ratio = stats["p50_ms"] / prev["p50_ms"]
+            flag = "  <-- plus lent" if ratio > 1.10 else ""
+            print(f"  {run['rows']:>9} {op:<28} {prev['p50_ms']:>10.3f} -> {stats['p50_ms']:>10.3f}  x{ratio:.2f}{flag}")
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de mesure du Mini SGBD JSON")
+    parser.add_argument("--rows", default="10000", help="tailles séparées par des virgules (ex: 10000,100000,1000000)")
+    parser.add_argument("--repeat", type=int, default=20, help="répétitions par recherche / mise à jour")
+    parser.add_argument("--single", type=int, default=20, help="insertions unitaires (insert_data)")
+    parser.add_argument("--batch", type=int, default=0, help="lignes par insertion en masse (défaut : max(10000, rows/10))")
+    parser.add_argument("--startup", type=int, default=20, help="lancements par mesure de démarrage (0 : aucune)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="fichier JSON du résultat (défaut : stdout)")
+    parser.add_argument("--compare", help="résultat JSON précédent à comparer")
+    parser.add_argument("--keep", action="store_true", help="conserver les bases générées")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    sizes = [int(n) for n in args.rows.split(",") if n.strip()]
+    if args.child:
+        # une taille par processus : pic de mémoire propre à chaque taille
+        json.dump(run_size(sizes[0], args), sys.stdout)
+        return 0
+
+    runs = []
+    for rows in sizes:
+        cmd = [sys.executable, os.path.abspath(__file__), "--child", "--rows", str(rows), "--repeat", str(args.repeat),
+               "--single", str(args.single), "--batch", str(args.batch), "--seed", str(args.seed)]
+        if args.keep:
+            cmd.append("--keep")
+        print(f"Mesure sur {rows} ligne(s)...", file=sys.stderr)
+        out = subprocess.run(cmd, capture_output=True, text=True)
+        if out.returncode != 0:
+            print(out.stderr, file=sys.stderr)
+            return 1
+        runs.append(json.loads(out.stdout))
+    startup = None
+    if args.startup > 0:
+        print("Mesure du démarrage...", file=sys.stderr)
+        startup = bench_startup(args.startup)
+
+    report = {
+        "bench": "mini-sgbd-json",
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": runs,
+        "startup": startup,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,15 +1,22 @@
 import os
+import sys
 import json
-import shutil
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import re
-import hashlib
+import bisect
+import contextlib
+import zlib
+import functools
+import itertools
+import collections
+import copy
+import operator
+import threading
+import time
 from typing import Optional, Dict, Any, List
 
 
-DB_ROOT = "databases"
-
-os.makedirs(DB_ROOT, exist_ok=True)
+DB_ROOT = "databases"  # créé à la première écriture (create_db, users.json, journal lent)
 
 current_db = None
 
@@ -19,7 +26,14 @@ current_user: Optional[str] = None  # utilisateur courant
 ###   Fonction    ###
 
 # parse 
+COLUMN_TYPES = ["int", "float", "str", "bool", "date", "datetime", "list", "dict"]
+
+
 def parse_schema_input(schema_txt):
+    """
+    'id:int auto_increment, nom:str not null unique, age:int default 18' -> colonnes du schema
+    (mêmes contraintes que le prompt de create_table). ValueError si une définition est invalide.
+    """
     cols = []
     if not schema_txt.strip():
         return cols
@@ -30,10 +44,36 @@ def parse_schema_input(schema_txt):
             continue
         if ":" in p:
             name, typ = p.split(":", 1)
-            cols.append({"name": name.strip(), "type": typ.strip().lower()})
         else:
             # si pas de type fourni => str par défaut
-            cols.append({"name": p.strip(), "type": "str"})
+            name, typ = p, "str"
+        words = typ.split()
+        col = {"name": name.strip(), "type": words[0].lower() if words else "str",
+               "not_null": False, "unique": False, "auto_increment": False, "default": None}
+        if col["type"] not in COLUMN_TYPES:
+            raise ValueError(f"type invalide '{col['type']}' pour '{col['name']}'")
+        flags = words[1:]
+        while flags:
+            word = flags.pop(0).lower()
+            if word == "not" and flags and flags[0].lower() == "null":
+                flags.pop(0)
+                col["not_null"] = True
+            elif word in ("not_null", "unique", "auto_increment"):
+                col[word] = True
+            elif word == "default" and flags:
+                raw = " ".join(flags).strip("'\"")
+                flags = []
+                try:
+                    col["default"] = serializable_value(convert_input_to_type(raw, col["type"]))
+                except Exception:
+                    raise ValueError(f"valeur par défaut invalide pour '{col['name']}'")
+            else:
+                raise ValueError(f"contrainte inconnue '{word}' pour '{col['name']}'")
+        if col["auto_increment"] and col["type"] != "int":
+            raise ValueError(f"AUTO_INCREMENT réservé aux colonnes int ('{col['name']}')")
+        cols.append(col)
+    if sum(1 for c in cols if c["auto_increment"]) > 1:
+        raise ValueError("une seule colonne AUTO_INCREMENT est autorisée par table")
     return cols
 
 # convertion en type python ( Vérification )
@@ -90,670 +130,3667 @@ def serializable_value(val):
         return val.isoformat()
     return val
 
+# stockage natif des colonnes date / datetime : entier (jours / microsecondes depuis 1970-01-01),
+# comparable sans re-parsing ; remis au format ISO seulement à la lecture de la valeur
+_TEMPORAL_TYPES = ("date", "datetime")
+_EPOCH_DATE = date(1970, 1, 1)
+_EPOCH_DATETIME = datetime(1970, 1, 1)
+
+
+def _temporal_to_int(val, col_type):
+    """date -> jours, datetime -> microsecondes depuis l'époque ; None si non convertible (ou avec fuseau)."""
+    if val is None:
+        return None
+    if type(val) is int:
+        return val
+    try:
+        if isinstance(val, str):
+            val = convert_input_to_type(val, col_type)
+        if col_type == "date":
+            if isinstance(val, datetime):
+                val = val.date()
+            return (val - _EPOCH_DATE).days
+        if not isinstance(val, datetime):
+            val = datetime(val.year, val.month, val.day)
+        if val.tzinfo is not None:
+            return None
+        delta = val - _EPOCH_DATETIME
+        return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+    except Exception:
+        return None
+
+
+def _int_to_temporal(n, col_type):
+    """Inverse de _temporal_to_int, au format ISO (celui de serializable_value)."""
+    if col_type == "date":
+        return date.fromordinal(_EPOCH_DATE.toordinal() + n).isoformat()
+    return (_EPOCH_DATETIME + timedelta(microseconds=n)).isoformat()
+
 # message 
 def ensure_db_selected():
     if not current_db:
-        print("Sélectionnez d'abord une base avec 'use <nom_base>'.")
+        _fail("Sélectionnez d'abord une base avec 'use <nom_base>'.")
         return False
     return True
 
 
 # Pour la fonction recherche 
-def _parse_single_condition(cond_txt): # fonction de la condition  ( colonne value opérateur)
-    cond_txt = cond_txt.strip()
 
-    # regex pour extraire col, op, value
-    m = re.match(r'^([A-Za-z0-9_.]+)\s*(==|=|!=|>=|<=|>|<|(?i:like))\s*(\'[^\']*\'|"[^"]*"|[^ ]+)$', cond_txt)
-    
-    if not m:
-        return None
-    
-    col, op, val = m.group(1), m.group(2).lower(), m.group(3)
-    
-    if (val.startswith("'") and val.endswith("'")) or (val.startswith('"') and val.endswith('"')):
-        val = val[1:-1]
+# Grammaire WHERE :
+#   expr      := and_expr ('or' and_expr)*
+#   and_expr  := not_expr ('and' not_expr)*
+#   not_expr  := 'not' not_expr | '(' expr ')' | predicat
+#   predicat  := col op valeur | col [not] like valeur | col [not] in (v1, v2, ...)
+#              | col [not] between v1 and v2 | col is [not] null
+_WHERE_TOKEN_RE = re.compile(r"""\s*(?:
+    (?P<str>'(?:[^']|'')*'|"(?:[^"]|"")*")
+  | (?P<op>==|!=|<>|>=|<=|=|>|<)
+  | (?P<punct>[(),])
+  | (?P<word>[^\s(),=!<>'"]+)
+)""", re.X)
+
+_WHERE_KEYWORDS = {"and", "or", "not", "in", "between", "is", "null", "like"}
+
+
+def _tokenize_where(where_txt):
+    tokens = []
+    pos = 0
+    txt = where_txt.strip()
+    while pos < len(txt):
+        m = _WHERE_TOKEN_RE.match(txt, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"caractère inattendu à la position {pos}: {txt[pos:pos + 10]!r}")
+        pos = m.end()
+        if m.group("str") is not None:
+            raw = m.group("str")
+            quote = raw[0]
+            tokens.append(("str", raw[1:-1].replace(quote * 2, quote)))
+        elif m.group("op") is not None:
+            op = m.group("op")
+            tokens.append(("op", {"==": "=", "<>": "!="}.get(op, op)))
+        elif m.group("punct") is not None:
+            tokens.append(("punct", m.group("punct")))
+        elif m.group("word") is not None:
+            word = m.group("word")
+            if word.lower() in _WHERE_KEYWORDS:
+                tokens.append(("kw", word.lower()))
+            else:
+                tokens.append(("word", word))
+    return tokens
 
-    return col, op, val
 
-# condition séparer 
-def _parse_where_clause(where_txt): 
-    parts = re.split(r'\s+(?i:and)\s+', where_txt)
-    conds = []
-    for p in parts:
-        parsed = _parse_single_condition(p)
-        if not parsed:
-            return None
-        conds.append(parsed)
-    return conds
+class _WhereParser:
+    """Analyseur descendant récursif : produit un arbre de tuples."""
 
-def _match_condition(row, schema_map, col, op, val_str):
-    
-    row_val = row.get(col, None)
-    col_type = schema_map.get(col, "str")
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+        self.nparams = 0
 
-    # pour like 
-    if op == "like":
+    def peek(self, kind=None, value=None):
+        if self.pos >= len(self.tokens):
+            return None
+        tok = self.tokens[self.pos]
+        if kind and tok[0] != kind:
+            return None
+        if value is not None and tok[1] != value:
+            return None
+        return tok
+
+    def accept(self, kind, value=None):
+        tok = self.peek(kind, value)
+        if tok:
+            self.pos += 1
+        return tok
+
+    def expect(self, kind, value=None):
+        tok = self.accept(kind, value)
+        if not tok:
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "fin de clause"
+            label = value or {"word": "colonne", "op": "opérateur"}.get(kind, kind)
+            raise ValueError(f"{label} attendu, trouvé '{found}'")
+        return tok
+
+    def parse(self):
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"élément inattendu '{self.tokens[self.pos][1]}'")
+        return node
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.accept("kw", "or"):
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while self.accept("kw", "and"):
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def parse_not(self):
+        if self.accept("kw", "not"):
+            return ("not", self.parse_not())
+        if self.accept("punct", "("):
+            node = self.parse_or()
+            self.expect("punct", ")")
+            return node
+        return self.parse_predicate()
+
+    def parse_value(self):
+        if self.accept("word", "?"):
+            self.nparams += 1
+            return ("param", self.nparams - 1)
+        tok = self.accept("str") or self.accept("word")
+        if tok:
+            return ("lit", tok[1])
+        if self.accept("kw", "null"):
+            return ("null",)
+        raise ValueError("valeur attendue")
+
+    def parse_predicate(self):
+        col = self.expect("word")[1]
+
+        if self.accept("kw", "is"):
+            negated = bool(self.accept("kw", "not"))
+            self.expect("kw", "null")
+            return ("isnull", col, negated)
+
+        negated = bool(self.accept("kw", "not"))
+        if self.accept("kw", "like"):
+            return ("like", col, self.parse_value(), negated)
+        if self.accept("kw", "in"):
+            self.expect("punct", "(")
+            values = [self.parse_value()]
+            while self.accept("punct", ","):
+                values.append(self.parse_value())
+            self.expect("punct", ")")
+            return ("in", col, values, negated)
+        if self.accept("kw", "between"):
+            lo = self.parse_value()
+            self.expect("kw", "and")
+            hi = self.parse_value()
+            return ("between", col, lo, hi, negated)
+        if negated:
+            raise ValueError("'like', 'in' ou 'between' attendu après 'not'")
+
+        op = self.expect("op")[1]
+        value = self.parse_value()
+        # compatibilité : col = null / col != null
+        if value == ("null",) or (value[0] == "lit" and value[1].lower() in ("null", "none") and op in ("=", "!=")):
+            if op not in ("=", "!="):
+                raise ValueError(f"opérateur '{op}' impossible avec NULL")
+            return ("isnull", col, op == "!=")
+        return ("cmp", col, op, value)
 
-        pattern = re.escape(val_str)
-        pattern = pattern.replace(r'\%', '.*') # regex, % -> *
 
-        try:
-            return re.search(pattern, str(row_val), flags=re.IGNORECASE) is not None
-        except re.error:
-            return False
+# condition séparer 
+@functools.lru_cache(maxsize=256)
+def _parse_where_clause(where_txt):
+    """
+    Retourne l'arbre de la clause WHERE (lève ValueError si la syntaxe est invalide).
+    Mis en cache par texte : une recherche répétée ne repasse pas par le parseur.
+    """
+    return _WhereParser(_tokenize_where(where_txt)).parse()
+
+
+def _count_params(node):
+    """Nombre de paramètres '?' dans un arbre WHERE."""
+    if node is None:
+        return 0
+    kind = node[0]
+    if kind in ("and", "or"):
+        return sum(_count_params(n) for n in node[1])
+    if kind == "not":
+        return _count_params(node[1])
+    values = {"cmp": lambda: [node[3]], "like": lambda: [node[2]], "in": lambda: node[2],
+              "between": lambda: [node[2], node[3]]}.get(kind, lambda: [])()
+    return sum(1 for v in values if v[0] == "param")
+
+
+def _where_columns(node):
+    """Ensemble des colonnes référencées par un arbre WHERE."""
+    kind = node[0]
+    if kind in ("and", "or"):
+        cols = set()
+        for n in node[1]:
+            cols |= _where_columns(n)
+        return cols
+    if kind == "not":
+        return _where_columns(node[1])
+    return {node[1]}
 
-    # si pas de value 
-    if row_val is None:
-        if (op in ("=", "==")) and val_str.lower() in ("null", "none"):
-            return True
-        return False
 
-    # convertion de type à rechercher 
+# valeur de la ligne -> type python comparable
+def _coerce_value(val, col_type):
+    if val is None:
+        return None
+    if col_type == "str":
+        return val if isinstance(val, str) else str(val)
+    if col_type in ("int", "float") and isinstance(val, (int, float)) and not isinstance(val, bool):
+        return val
+    if col_type == "bool" and isinstance(val, bool):
+        return val
     try:
-        left = convert_input_to_type(str(row_val), col_type)
+        return convert_input_to_type(str(val), col_type)
     except Exception:
-        left = row_val
+        return val
 
-    try:
-        right = convert_input_to_type(val_str, col_type)
-    except Exception:
-        try:
-            if isinstance(left, int):
-                right = int(val_str)
-            elif isinstance(left, float):
-                right = float(val_str)
-            elif isinstance(left, bool):
-                right = val_str.lower() in ("true", "1", "yes", "o", "oui")
-            else:
-                right = val_str
-        except Exception:
-            right = val_str
 
-    # Comparaisons
+# littéral de la clause -> type de la colonne (une seule fois, à la compilation)
+def _convert_operand(val_str, col_type):
     try:
-        if op in ("=", "=="):
-            return left == right
-        if op == "!=":
-            return left != right
-        if op == ">":
-            return left > right
-        if op == "<":
-            return left < right
-        if op == ">=":
-            return left >= right
-        if op == "<=":
-            return left <= right
+        return convert_input_to_type(val_str, col_type)
     except Exception:
-        return False
+        for conv in (int, float):
+            try:
+                return conv(val_str)
+            except Exception:
+                pass
+        return val_str
 
-    return False
 
+_COMPARATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
 
 
+def _classify_like(pattern_txt):
+    """
+    Classe d'un motif LIKE (insensible à la casse, % = n'importe quelle suite de caractères) :
+    ("exact", t) 'abc', ("prefix", t) 'abc%', ("suffix", t) '%abc', ("contains", t) '%abc%'
+    avec t en minuscules, sinon ("regex", motif) quand un % apparaît au milieu.
+    """
+    text = pattern_txt.lower()
+    inner = text.strip("%")
+    if "%" in inner:
+        return "regex", pattern_txt
+    starts, ends = text.startswith("%"), text.endswith("%")
+    if starts and ends:
+        return "contains", inner
+    if ends:
+        return "prefix", inner
+    if starts:
+        return "suffix", inner
+    return "exact", inner
+
+
+def _compile_like(pattern_txt):
+    """Motif LIKE -> fonction str -> bool (classé une fois : méthode de chaîne sauf cas général)."""
+    kind, text = _classify_like(pattern_txt)
+    if kind == "exact":
+        return lambda s: s.lower() == text
+    if kind == "prefix":
+        return lambda s: s.lower().startswith(text)
+    if kind == "suffix":
+        return lambda s: s.lower().endswith(text)
+    if kind == "contains":
+        return lambda s: text in s.lower()
+    regex = re.compile(".*".join(re.escape(piece) for piece in text.split("%")), flags=re.IGNORECASE | re.DOTALL)
+    return lambda s: regex.fullmatch(s) is not None
+
+
+def _operand_cell(value, col_type, binders, convert=None):
+    """
+    Cellule [valeur] pour un opérande : remplie tout de suite pour un littéral,
+    à chaque execute() pour un paramètre '?' (via la liste binders).
+    """
+    convert = convert or (lambda v: _convert_operand(v, col_type))
+    if value[0] == "lit":
+        return [convert(value[1])]
+    if value[0] == "null":
+        return [None]
+    if binders is None:
+        raise ValueError("paramètre '?' utilisable seulement dans une requête préparée")
+    cell = [None]
+    idx = value[1]
+    def bind(params):
+        raw = params[idx]
+        cell[0] = None if raw is None else convert(raw if isinstance(raw, str) else str(raw))
+    binders.append(bind)
+    return cell
+
+
+def _stored_value(row, col):
+    """Valeur telle que stockée (code / entier pour une colonne encodée) ; valeur simple pour un dict."""
+    try:
+        return row.raw(col)
+    except AttributeError:
+        return row.get(col)
 
 
-###   Base de donnée   ###
+def _compile_temporal(node, col, col_type, binders):
+    """
+    cmp / between / in sur une colonne date ou datetime : les opérandes sont convertis une fois
+    en entiers et la ligne fournit l'entier stocké -> simple comparaison d'entiers.
+    Un opérande qui n'est pas une date valide (ou NULL) ne correspond à aucune ligne.
+    """
+    def convert(txt):
+        v = _convert_operand(txt, col_type)
+        return _temporal_to_int(v, col_type) if isinstance(v, date) else None
+
+    def left(row):
+        v = _stored_value(row, col)
+        return v if type(v) is int else _temporal_to_int(v, col_type)
+
+    kind = node[0]
+    if kind == "in":
+        _, _, values, negated = node
+        cells = [_operand_cell(v, col_type, binders, convert) for v in values]
+        members = [None]
+        def rebuild(params=None):
+            members[0] = {c[0] for c in cells if c[0] is not None}
+        rebuild()
+        if binders is not None and any(v[0] == "param" for v in values):
+            binders.append(rebuild)
+        def pred(row):
+            v = left(row)
+            if v is None:
+                return False
+            return (v in members[0]) != negated
+        return pred
+
+    if kind == "between":
+        _, _, lo, hi, negated = node
+        low = _operand_cell(lo, col_type, binders, convert)
+        high = _operand_cell(hi, col_type, binders, convert)
+        def pred(row):
+            v = left(row)
+            if v is None or low[0] is None or high[0] is None:
+                return False
+            return (low[0] <= v <= high[0]) != negated
+        return pred
+
+    _, _, op, value = node
+    compare = _COMPARATORS[op]
+    cell = _operand_cell(value, col_type, binders, convert)
+    def pred(row):
+        v = left(row)
+        if v is None or cell[0] is None:
+            return False
+        return compare(v, cell[0])
+    return pred
 
-# Creation de base de donnée
-def create_db(db_name):
-    global current_db
-    path = os.path.join(DB_ROOT, db_name)
-    if os.path.exists(path):
-        print(f"La base '{db_name}' existe déjà.")
-    else:
-        os.makedirs(path)
-        current_db = db_name
-        print(f"Base de données '{db_name}' créée avec succès.")
 
-# Utilise une base de donnée
-def use_db(db_name):
-    global current_db
-    path = os.path.join(DB_ROOT, db_name)
-    if os.path.exists(path) and os.path.isdir(path):
-        current_db = db_name
-        print(f"Vous utilisez maintenant la base '{db_name}'.")
-    else:
-        print(f"La base '{db_name}' n'existe pas.")
+def _compile_encoded_in(col, encoding, literals, negated):
+    """
+    Égalité / IN sur une colonne encodée par dictionnaire : les littéraux sont traduits
+    une fois en codes et chaque ligne compare un entier. Une valeur pas encore encodée
+    (chaîne brute dans la ligne) est comparée telle quelle.
+    """
+    codes = {encoding[v] for v in literals if v in encoding}
+    strings = set(literals)
+    def pred(row):
+        v = _stored_value(row, col)
+        if v is None:
+            return False
+        if type(v) is int:
+            return (v in codes) != negated
+        return (v in strings) != negated
+    return pred
 
-# List les bases de données
-def list_dbs():
-    dbs = [d for d in os.listdir(DB_ROOT) if os.path.isdir(os.path.join(DB_ROOT, d))]
-    if not dbs:
-        print("Aucune base de données trouvée.")
-    else:
-        print("Bases de données disponibles :")
-        for db in dbs:
-            print(f" - {db}")
 
-# Suppression 
-def delete_db(db_name):
-    path = os.path.join(DB_ROOT, db_name)
-    if not os.path.exists(path):
-        print(f"La base '{db_name}' n'existe pas.")
-        return
+def _compile_where(node, schema_map, binders=None, encodings=None):
+    """
+    Compile l'arbre WHERE en une fonction row -> bool.
+    Les littéraux sont convertis une seule fois ; and/or s'arrêtent au premier résultat décisif.
+    Les paramètres '?' sont lus dans des cellules remplies par les fonctions ajoutées à `binders`.
+    encodings {col: {valeur: code}} : =, != et in sur ces colonnes comparent les codes du dictionnaire.
+    date / datetime : comparaisons sur l'entier stocké (voir _compile_temporal).
+    Lève ValueError si une colonne est inconnue.
+    """
+    kind = node[0]
+
+    if kind in ("and", "or"):
+        preds = [_compile_where(n, schema_map, binders, encodings) for n in node[1]]
+        # les LIKE (regex) en dernier : les tests simples court-circuitent avant
+        preds.sort(key=lambda p: getattr(p, "_cost", 0))
+        if kind == "and":
+            def pred(row):
+                for p in preds:
+                    if not p(row):
+                        return False
+                return True
+        else:
+            def pred(row):
+                for p in preds:
+                    if p(row):
+                        return True
+                return False
+        pred._cost = max(getattr(p, "_cost", 0) for p in preds)
+        return pred
+
+    if kind == "not":
+        inner = _compile_where(node[1], schema_map, binders, encodings)
+        pred = lambda row: not inner(row)
+        pred._cost = getattr(inner, "_cost", 0)
+        return pred
+
+    col = node[1]
+    if col not in schema_map:
+        raise ValueError(f"colonne inconnue '{col}'")
+    col_type = schema_map[col]
+
+    if encodings and col in encodings:
+        if kind == "cmp" and node[2] in ("=", "!=") and node[3][0] == "lit":
+            return _compile_encoded_in(col, encodings[col], [node[3][1]], node[2] == "!=")
+        if kind == "in" and all(v[0] == "lit" for v in node[2]):
+            return _compile_encoded_in(col, encodings[col], [v[1] for v in node[2]], node[3])
+
+    if col_type in _TEMPORAL_TYPES and kind in ("cmp", "between", "in"):
+        return _compile_temporal(node, col, col_type, binders)
+
+    if kind == "isnull":
+        if node[2]:
+            return lambda row: row.get(col) is not None
+        return lambda row: row.get(col) is None
+
+    if kind == "like":
+        _, _, value, negated = node
+        cell = _operand_cell(value, col_type, binders, convert=_compile_like)
+        def pred(row):
+            v = row.get(col)
+            match = cell[0]
+            if v is None or match is None:
+                return False
+            return match(str(v)) != negated
+        pred._cost = 1
+        return pred
+
+    if kind == "in":
+        _, _, values, negated = node
+        cells = [_operand_cell(v, col_type, binders) for v in values]
+        members = [None]
+        def rebuild(params=None):
+            try:
+                members[0] = {c[0] for c in cells if c[0] is not None}
+            except TypeError:
+                raise ValueError(f"valeur non comparable dans IN pour '{col}'")
+        rebuild()
+        if binders is not None and any(v[0] == "param" for v in values):
+            binders.append(rebuild)
+        def pred(row):
+            left = _coerce_value(row.get(col), col_type)
+            if left is None:
+                return False
+            try:
+                return (left in members[0]) != negated
+            except TypeError:
+                return False
+        return pred
+
+    if kind == "between":
+        _, _, lo, hi, negated = node
+        low = _operand_cell(lo, col_type, binders)
+        high = _operand_cell(hi, col_type, binders)
+        def pred(row):
+            left = _coerce_value(row.get(col), col_type)
+            if left is None:
+                return False
+            try:
+                return (low[0] <= left <= high[0]) != negated
+            except TypeError:
+                return False
+        return pred
+
+    # cmp
+    _, _, op, value = node
+    compare = _COMPARATORS[op]
+    if value[0] == "param":
+        cell = _operand_cell(value, col_type, binders)
+        def pred(row):
+            left = _coerce_value(row.get(col), col_type)
+            if left is None:
+                return False
+            try:
+                return compare(left, cell[0])
+            except TypeError:
+                return False
+        return pred
+
+    right = _convert_operand(value[1], col_type)
+    def pred(row):
+        left = _coerce_value(row.get(col), col_type)
+        if left is None:
+            return False
+        try:
+            return compare(left, right)
+        except TypeError:
+            return False
+    return pred
 
-        # permission : suppression de la base
-    # on exige un admin/droit drop_db sur la base cible
-    if not require_permission(db_name, "drop_db"):
-        return
 
+def _build_where_predicate(where_clause, schema_map):
+    """
+    Analyse + compile une clause WHERE (texte) pour un schema_map {col: type}.
+    Retourne une fonction row -> bool (toujours vraie si clause vide).
+    Lève ValueError avec un message lisible en cas d'erreur.
+    """
+    if not where_clause or not where_clause.strip():
+        return lambda row: True
+    return _compile_where(_parse_where_clause(where_clause), schema_map)
+
+
+
+
+
+###   Stockage des tables   ###
+# Une table = <table>_schema.json + données.
+# Non partitionnée : <table>_data.json
+# Partitionnée     : <table>_data.p0.json ... pN.json, décrites dans <table>_meta.json
+#   {"partition": {"kind": "hash", "column": "id", "count": 4}}
+#   {"partition": {"kind": "range", "column": "age", "bounds": [18, 65]}}
+#     range : p0 = valeurs < 18 (et NULL), p1 = [18, 65[, p2 = >= 65
+# Schéma versionné (alter_table ne réécrit pas les données) :
+#   meta["schema_version"] = N, meta["schema_changes"] = [{"version", "op", ...}]
+#   chaque fichier porte la version de son écriture (ancien format : "_sv" par ligne, 1 si absent)
+#   et ses lignes sont mises à niveau à la lecture ;
+#   'rewrite <table>' applique physiquement les changements en attente.
+# Colonnes encodées (analyze) : meta["dictionaries"] = {col: [valeurs]}, le fichier stocke les
+#   codes et porte une copie des dictionnaires utilisés ("dictionaries", après les lignes).
+# Colonnes date / datetime : stockées en entiers (jours / microsecondes depuis 1970-01-01),
+#   listées dans l'en-tête ("temporal") ; valeurs ISO rendues par get().
+
+# ---------- Instrumentation des commandes ('timing on') ----------
+# Chaque commande du REPL (run_command) reçoit un relevé : durée totale, analyse de la clause
+# WHERE, filtrage des lignes (prédicat), mise en forme du résultat, octets lus / écrits,
+# lignes parcourues / retenues. Relevés conservés (command_stats) et transmis aux
+# fonctions enregistrées par add_stats_listener ; affichés après la commande si timing on.
+TIMING: Dict[str, Any] = {"enabled": False}
+_current_stats: Optional[Dict[str, Any]] = None
+_stats_history = collections.deque(maxlen=1000)
+_stats_listeners: List[Any] = []
+
+
+def _new_stats(line):
+    return {
+        "command": line, "user": current_user, "db": current_db,
+        "started": datetime.now().isoformat(timespec="milliseconds"),
+        "total_s": 0.0, "parse_s": 0.0, "filter_s": 0.0, "format_s": 0.0,
+        "bytes_read": 0, "bytes_written": 0, "rows_scanned": 0, "rows_matched": 0,
+        "access_path": None, "invalid": False, "error": None,
+    }
 
-    confirm = input(f"Voulez-vous vraiment supprimer '{db_name}' ? (oui/non) : ").strip().lower()
-    if confirm == "oui":
-        shutil.rmtree(path)
-        global current_db
-        if current_db == db_name:
-            # si utilisée
-            current_db = None  
-        print(f"Base de données '{db_name}' supprimée.")
-    else:
-        print("Suppression annulée.")
 
+def _stat_add(key, value):
+    stats = _current_stats
+    if stats is not None:
+        stats[key] += value
 
-###########################
 
-###     Partie concernant les tables   ###
+def _stat_set(key, value):
+    stats = _current_stats
+    if stats is not None:
+        stats[key] = value
 
-# Création de table 
-def create_table(table_name):
-    if not ensure_db_selected():
-        return
 
-    if not require_permission(current_db, "create_table"):
-        return
+def _fail(*parts):
+    """Affiche un message d'erreur et marque la commande courante en échec (code de sortie en mode script)."""
+    print(*parts)
+    _stat_set("error", " ".join(str(p) for p in parts))
 
-    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
-    data_path = os.path.join(DB_ROOT, current_db, f"{table_name}_data.json")
 
-    if os.path.exists(schema_path):
-        print(f"⚠ La table '{table_name}' existe déjà.")
-        return
+def _stat_read(path):
+    """Compte la taille d'un fichier lu en entier."""
+    if _current_stats is not None:
+        try:
+            _current_stats["bytes_read"] += os.path.getsize(path)
+        except OSError:
+            pass
 
-    print("\n=== Création de la table ===")
-    schema = []
-    auto_inc_present = False
 
-    while True:
-        col_name = input("Nom de la colonne (ou vide pour terminer) : ").strip()
-        if not col_name:
-            break
+def _stat_written(path):
+    """Compte la taille d'un fichier écrit."""
+    if _current_stats is not None:
+        try:
+            _current_stats["bytes_written"] += os.path.getsize(path)
+        except OSError:
+            pass
 
-        # Type de donnée
-        col_type = input("Type (int, float, str, bool, date, datetime, list, dict) : ").strip().lower()
-        if col_type not in ["int", "float", "str", "bool", "date", "datetime", "list", "dict"]:
-            print("Type invalide !")
-            continue
 
-        not_null = input("NOT NULL ? (o/n) : ").strip().lower() == "o"
-        unique = input("UNIQUE ? (o/n) : ").strip().lower() == "o"
-        auto_increment = False
-        #primary_key = False
-        default_val = None
+@contextlib.contextmanager
+def _timed_stat(key):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stat_add(key, time.perf_counter() - start)
 
-        if col_type == "int":
-            auto_increment = input("AUTO_INCREMENT ? (o/n) : ").strip().lower() == "o"
-            if auto_increment:
-                if auto_inc_present:
-                    print("Une seule colonne AUTO_INCREMENT est autorisée par table.")
-                    auto_increment = False
-                else:
-                    auto_inc_present = True
 
-        # primary_key = input("PRIMARY KEY ? (o/n) : ").strip().lower() == "o"
+def _print_stats(stats):
+    print(f"Temps : {stats['total_s'] * 1000:.1f} ms (analyse {stats['parse_s'] * 1000:.1f}, "
+          f"filtrage {stats['filter_s'] * 1000:.1f}, affichage {stats['format_s'] * 1000:.1f}) ; "
+          f"lu {stats['bytes_read']} o, écrit {stats['bytes_written']} o ; "
+          f"lignes parcourues {stats['rows_scanned']}, retenues {stats['rows_matched']}"
+          + (f" ; accès : {stats['access_path']}" if stats.get("access_path") else ""))
 
-        default_input = input("Valeur par défaut (laisser vide si aucune) : ").strip()
-        if default_input:
-            try:
-                default_val = convert_input_to_type(default_input, col_type)
-            except Exception:
-                print("Valeur par défaut invalide — ignorée.")
-                default_val = None
 
-        schema.append({
-            "name": col_name,
-            "type": col_type,
-            "not_null": not_null,
-            "unique": unique,
-            "auto_increment": auto_increment,
-            "default": default_val,
-            #            "primary_key": primary_key
-        })
+def command_stats(clear=False):
+    """Relevés des dernières commandes (au plus 1000), du plus ancien au plus récent."""
+    records = [dict(stats) for stats in _stats_history]
+    if clear:
+        _stats_history.clear()
+    return records
 
-    if not schema:
-        print("Aucun champ défini — table non créée.")
-        return
 
-    # Sauvegarde du schéma
-    with open(schema_path, "w", encoding="utf-8") as f:
-        json.dump(schema, f, indent=2)
-    with open(data_path, "w", encoding="utf-8") as f:
-        json.dump([], f, indent=2)
+def add_stats_listener(func):
+    """func(relevé) est appelée après chaque commande."""
+    if func not in _stats_listeners:
+        _stats_listeners.append(func)
 
-    print(f"Table '{table_name}' créée avec succès.")
 
+def remove_stats_listener(func):
+    if func in _stats_listeners:
+        _stats_listeners.remove(func)
 
-# Lister les tables
-def list_tables():
-    if not ensure_db_selected():
-        return
 
-        # permission : lecture/listage des tables
-    if not require_permission(current_db, "read"):
-        return
+def set_timing(arg=None):
+    """timing [on|off] : relevé affiché après chaque commande."""
+    if arg is not None:
+        if arg.lower() not in ("on", "off"):
+            _fail("Syntaxe : timing [on|off]")
+            return
+        TIMING["enabled"] = arg.lower() == "on"
+    print(f"Timing : {'on' if TIMING['enabled'] else 'off'}")
 
 
-    db_path = os.path.join(DB_ROOT, current_db)
-    files = os.listdir(db_path)
+# ---------- Journal des requêtes lentes (databases/slow_queries.jsonl) ----------
+# Une ligne JSON par commande plus longue que SLOW_LOG["threshold_ms"] : texte, utilisateur,
+# base, durée, lignes parcourues / retenues, chemin d'accès. Fichier en ajout (pas de
+# réécriture atomique : une entrée perdue n'a pas d'importance), renommé en .1 au-delà de
+# max_bytes. 'slowlog' résume les pires requêtes, regroupées à littéraux près.
+SLOW_LOG: Dict[str, Any] = {
+    "threshold_ms": 1000.0,  # None : journal désactivé
+    "max_bytes": 10 * 1024 * 1024,
+}
+_SLOW_LITERAL_RE = re.compile(r"""'[^']*'|"[^"]*"|\b\d+(?:\.\d+)?\b""")
 
-    tables = set()
-    for f in files:
-        if f.endswith("_schema.json"):
-            tables.add(f[:-12]) 
-    if not tables:
-        print("Aucune table trouvée dans la base sélectionnée.")
-    else:
-        print(f"Tables dans la base '{current_db}':")
-        for t in sorted(tables):
-            print(f" - {t}")
 
+def _slow_log_file():
+    return os.path.join(DB_ROOT, "slow_queries.jsonl")
 
-# Suppression 
-def delete_table(table_name):
-    if not ensure_db_selected():
-        return
 
-        # permission : suppression de table
-    if not require_permission(current_db, "drop_table"):
+def _log_slow_command(stats):
+    threshold = SLOW_LOG["threshold_ms"]
+    duration_ms = stats["total_s"] * 1000
+    if threshold is None or duration_ms < threshold or stats["command"].split()[0] == "slowlog":
         return
+    entry = {
+        "at": stats["started"], "command": stats["command"], "user": stats["user"], "db": stats["db"],
+        "duration_ms": round(duration_ms, 3), "rows_scanned": stats["rows_scanned"],
+        "rows_matched": stats["rows_matched"], "access_path": stats.get("access_path"),
+    }
+    path = _slow_log_file()
+    try:
+        if os.path.exists(path) and os.path.getsize(path) > SLOW_LOG["max_bytes"]:
+            os.replace(path, path + ".1")
+        os.makedirs(DB_ROOT, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"Journal des requêtes lentes indisponible ({e}).")
 
 
-    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
-    data_path = os.path.join(DB_ROOT, current_db, f"{table_name}_data.json")
+add_stats_listener(_log_slow_command)
 
-    if not os.path.exists(schema_path) and not os.path.exists(data_path):
-        print(f"La table '{table_name}' n'existe pas dans la base '{current_db}'.")
-        return
 
-    confirm = input(f"Supprimer la table '{table_name}' (schema + données) ? (oui/non) : ").strip().lower()
-    if confirm not in ("oui", "o", "yes", "y"):
-        print("Suppression annulée.")
+def _read_slow_log():
+    entries = []
+    for path in (_slow_log_file() + ".1", _slow_log_file()):
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue  # ligne tronquée
+    return entries
+
+
+def slowlog(args: List[str]):
+    """slowlog [top=N] | slowlog threshold=<ms>|off | slowlog clear"""
+    top = 10
+    for arg in args:
+        name, _, value = arg.partition("=")
+        name = name.lower()
+        if name == "clear":
+            for path in (_slow_log_file(), _slow_log_file() + ".1"):
+                if os.path.exists(path):
+                    os.remove(path)
+            print("Journal des requêtes lentes vidé.")
+            return
+        if name == "off":
+            SLOW_LOG["threshold_ms"] = None
+            print("Journal des requêtes lentes désactivé.")
+            return
+        try:
+            if name == "threshold":
+                SLOW_LOG["threshold_ms"] = None if value.lower() == "off" else max(0.0, float(value))
+                print(f"Seuil du journal des requêtes lentes : {SLOW_LOG['threshold_ms']} ms")
+                return
+            if name == "top":
+                top = max(1, int(value))
+                continue
+        except ValueError:
+            _fail(f"Valeur invalide pour '{name}'.")
+            return
+        _fail("Syntaxe : slowlog [top=N] | slowlog threshold=<ms>|off | slowlog clear")
         return
 
+    entries = _read_slow_log()
+    if not entries:
+        print(f"Aucune requête lente (seuil : {SLOW_LOG['threshold_ms']} ms).")
+        return
+    # regroupement par forme de la commande (littéraux remplacés par ?)
+    groups = {}
+    for e in entries:
+        key = (e.get("db"), _SLOW_LITERAL_RE.sub("?", e["command"]))
+        g = groups.setdefault(key, {"count": 0, "total": 0.0, "max": 0.0, "scanned": 0, "paths": set(), "example": e})
+        g["count"] += 1
+        g["total"] += e["duration_ms"]
+        g["scanned"] += e.get("rows_scanned", 0)
+        if e["duration_ms"] >= g["max"]:
+            g["max"] = e["duration_ms"]
+            g["example"] = e
+        if e.get("access_path"):
+            g["paths"].add(e["access_path"])
+    worst = sorted(groups.items(), key=lambda kv: -kv[1]["total"])[:top]
+    print(f"Requêtes lentes (seuil : {SLOW_LOG['threshold_ms']} ms, {len(entries)} entrée(s)) — par temps cumulé :")
+    for (db, shape), g in worst:
+        print(f" - [{db}] {shape}")
+        print(f"     {g['count']} fois, total {g['total']:.0f} ms, max {g['max']:.0f} ms, moyenne {g['total'] / g['count']:.0f} ms, "
+              f"{g['scanned'] // g['count']} ligne(s) parcourue(s) en moyenne ; accès : {', '.join(sorted(g['paths'])) or '-'}")
+        print(f"     pire : {g['example']['command']} ({g['example']['at']}, {g['example']['user']})")
+
+
+# ---------- Métriques (format texte Prometheus : 'metrics', 'metrics serve [port]') ----------
+# Compteurs et histogrammes alimentés par les relevés de commandes et par les caches ;
+# les jauges (écritures en attente, fichiers non synchronisés, taux de succès des caches)
+# sont calculées au moment de l'export.
+METRICS_PORT = 9464
+_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+_metrics: Dict[str, Dict[str, Any]] = {}  # nom -> {"type", "help", "values": {labels: valeur}}
+_metrics_lock = threading.Lock()
+_metrics_server = None
+
+
+def _declare_metric(name, kind, help_txt, labelled=True):
+    _metrics[name] = {"type": kind, "help": help_txt, "values": {} if labelled else {(): 0}}
+
+
+_declare_metric("sgbd_commands_total", "counter", "Commandes exécutées, par commande.")
+_declare_metric("sgbd_command_duration_seconds", "histogram", "Durée des commandes, par commande.")
+_declare_metric("sgbd_bytes_read_total", "counter", "Octets lus dans les fichiers de données, index et zone maps.", labelled=False)
+_declare_metric("sgbd_bytes_written_total", "counter", "Octets écrits (toutes écritures de fichiers).", labelled=False)
+_declare_metric("sgbd_rows_scanned_total", "counter", "Lignes parcourues par les recherches et mises à jour.", labelled=False)
+_declare_metric("sgbd_rows_matched_total", "counter", "Lignes retenues par les recherches et mises à jour.", labelled=False)
+_declare_metric("sgbd_cache_requests_total", "counter", "Accès aux caches, par cache et résultat (hit / miss).")
+_declare_metric("sgbd_lock_wait_seconds_total", "counter", "Attente pour acquérir un verrou, par verrou.")
+_declare_metric("sgbd_lock_contended_total", "counter", "Acquisitions de verrou qui ont dû attendre.")
+
+
+def _metric_inc(name, value=1, **labels):
+    key = tuple(sorted(labels.items()))
+    with _metrics_lock:
+        values = _metrics[name]["values"]
+        values[key] = values.get(key, 0) + value
+
+
+def _metric_observe(name, value, **labels):
+    key = tuple(sorted(labels.items()))
+    with _metrics_lock:
+        values = _metrics[name]["values"]
+        hist = values.get(key)
+        if hist is None:
+            hist = values[key] = {"buckets": [0] * len(_LATENCY_BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(_LATENCY_BUCKETS):
+            if value <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+def _cache_access(cache, hit):
+    _metric_inc("sgbd_cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+
+@contextlib.contextmanager
+def _locked(lock, name):
+    """Acquiert `lock` en comptant l'attente éventuelle (métriques)."""
+    if not lock.acquire(blocking=False):
+        start = time.perf_counter()
+        lock.acquire()
+        _metric_inc("sgbd_lock_wait_seconds_total", time.perf_counter() - start, lock=name)
+        _metric_inc("sgbd_lock_contended_total", lock=name)
     try:
-        if os.path.exists(schema_path):
-            os.remove(schema_path)
-        if os.path.exists(data_path):
-            os.remove(data_path)
-        print(f"Table '{table_name}' supprimée de la base '{current_db}'.")
-    except Exception as e:
-        print("Erreur lors de la suppression :", e)
+        yield
+    finally:
+        lock.release()
+
+
+def _record_command_metrics(stats):
+    command = "other" if stats["invalid"] else stats["command"].split()[0]
+    _metric_inc("sgbd_commands_total", command=command)
+    _metric_observe("sgbd_command_duration_seconds", stats["total_s"], command=command)
+    for key in ("bytes_read", "bytes_written", "rows_scanned", "rows_matched"):
+        if stats[key]:
+            _metric_inc(f"sgbd_{key}_total", stats[key])
+
+
+add_stats_listener(_record_command_metrics)
+
+
+def _metric_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+def _gauges():
+    """[(nom, aide, [(labels, valeur)])] calculées à l'export."""
+    pending = list(_pending_writes.values())
+    ratios = []
+    requests = _metrics["sgbd_cache_requests_total"]["values"]
+    caches = {dict(k)["cache"] for k in requests}
+    lru = {"where": _parse_where_clause.cache_info(), "row_class": _row_class.cache_info()}
+    for cache in sorted(caches):
+        hits = requests.get((("cache", cache), ("result", "hit")), 0)
+        misses = requests.get((("cache", cache), ("result", "miss")), 0)
+        ratios.append(((("cache", cache),), hits / (hits + misses) if hits + misses else 0.0))
+    for cache, info in lru.items():
+        total = info.hits + info.misses
+        ratios.append(((("cache", cache),), info.hits / total if total else 0.0))
+    return [
+        ("sgbd_cache_hit_ratio", "Part des accès servis par le cache.", ratios),
+        ("sgbd_pending_write_partitions", "Partitions modifiées en attente d'écriture (writeback).", [((), len(pending))]),
+        ("sgbd_pending_write_rows", "Lignes des partitions en attente d'écriture (writeback).",
+         [((), sum(len(e["rows"]) for e in pending))]),
+        ("sgbd_unsynced_files", "Fichiers écrits pas encore synchronisés (durability normal, avant checkpoint).",
+         [((), len(_unsynced_paths))]),
+        ("sgbd_slow_log_bytes", "Taille du journal des requêtes lentes.",
+         [((), os.path.getsize(_slow_log_file()) if os.path.exists(_slow_log_file()) else 0)]),
+    ]
+
+
+def metrics_text():
+    """Toutes les métriques au format texte d'exposition Prometheus."""
+    lines = []
+    with _metrics_lock:
+        for name, metric in _metrics.items():
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for key, value in sorted(metric["values"].items()):
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_metric_labels(key)} {value}")
+                    continue
+                for bound, count in zip(_LATENCY_BUCKETS, value["buckets"]):
+                    lines.append(f"{name}_bucket{_metric_labels(key, [('le', bound)])} {count}")
+                lines.append(f"{name}_bucket{_metric_labels(key, [('le', '+Inf')])} {value['count']}")
+                lines.append(f"{name}_sum{_metric_labels(key)} {value['sum']}")
+                lines.append(f"{name}_count{_metric_labels(key)} {value['count']}")
+    for name, help_txt, values in _gauges():
+        lines.append(f"# HELP {name} {help_txt}")
+        lines.append(f"# TYPE {name} gauge")
+        for key, value in values:
+            lines.append(f"{name}{_metric_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def serve_metrics(port=None):
+    """Sert /metrics en HTTP sur 127.0.0.1:port (thread en arrière-plan)."""
+    global _metrics_server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class _MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # pas de trace par requête dans le REPL
+
+    if _metrics_server is not None:
+        print(f"Métriques déjà servies sur http://127.0.0.1:{_metrics_server.server_address[1]}/metrics")
+        return False
+    try:
+        _metrics_server = ThreadingHTTPServer(("127.0.0.1", port or METRICS_PORT), _MetricsHandler)
+    except OSError as e:
+        _fail(f"Impossible d'ouvrir le port {port or METRICS_PORT} ({e}).")
+        return False
+    threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Métriques servies sur http://127.0.0.1:{_metrics_server.server_address[1]}/metrics")
+    return True
 
 
-# Description du table
-def describe_table(table_name):
-    if not ensure_db_selected():
-        return
+def stop_metrics_server():
+    global _metrics_server
+    if _metrics_server is not None:
+        _metrics_server.shutdown()
+        _metrics_server.server_close()
+        _metrics_server = None
 
-        # permission : lecture des métadonnées
-    if not require_permission(current_db, "read"):
-        return
 
+def metrics_command(args: List[str]):
+    """metrics | metrics serve [port] | metrics stop"""
+    if not args:
+        print(metrics_text(), end="")
+    elif args[0] == "serve" and len(args) <= 2:
+        try:
+            serve_metrics(int(args[1]) if len(args) == 2 else None)
+        except ValueError:
+            _fail("Port invalide.")
+    elif args[0] == "stop" and len(args) == 1:
+        stop_metrics_server()
+        print("Serveur de métriques arrêté.")
+    else:
+        _fail("Syntaxe : metrics | metrics serve [port] | metrics stop")
 
-    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
-    data_path = os.path.join(DB_ROOT, current_db, f"{table_name}_data.json")
 
-    if not os.path.exists(schema_path):
-        print(f"La table '{table_name}' n'existe pas (pas de schema).")
+# ---------- Profilage d'une commande : profile [top=N] [save=<fichier.prof>] <commande ...> ----------
+def profile_command(line):
+    """
+    Exécute une commande du REPL sous cProfile et tracemalloc : fonctions les plus coûteuses
+    (temps cumulé), principaux sites d'allocation, pic mémoire ; save= écrit le .prof
+    (lisible par pstats / snakeviz).
+    """
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    top, save = 20, None
+    words = line.split()
+    inner = line.strip()
+    while words and "=" in words[0] and words[0].split("=", 1)[0].lower() in ("top", "save"):
+        option = words.pop(0)
+        inner = inner[len(option):].lstrip()  # la commande peut contenir le texte des options
+        name, _, value = option.partition("=")
+        if name.lower() == "top":
+            try:
+                top = max(1, int(value))
+            except ValueError:
+                _fail(f"Valeur entière attendue pour top : '{value}'.")
+                return
+        else:
+            save = value
+    if not words:
+        _fail("Syntaxe : profile [top=N] [save=<fichier.prof>] <commande ...>")
+        return
+    if words[0] in ("exit", "profile"):
+        _fail(f"'{words[0]}' ne peut pas être profilée.")
         return
 
+    profiler = cProfile.Profile()
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start(10)
+    tracemalloc.reset_peak()
+    start = tracemalloc.take_snapshot()
+    profiler.enable()
     try:
-        with open(schema_path, "r", encoding="utf-8") as f:
-            schema = json.load(f)
-    except Exception as e:
-        print("Impossible de lire le schema :", e)
-        return
+        run_command(inner)
+        result = _stats_history[-1]
+        if result["error"] or result["invalid"]:
+            _stat_set("error", result["error"] or "commande invalide")  # échec de profile en mode script
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if not tracing:
+            tracemalloc.stop()
+
+    print(f"\n=== Profil de '{inner}' : {top} fonctions les plus coûteuses (temps cumulé) ===")
+    stats = pstats.Stats(profiler, stream=sys.stdout)
+    stats.strip_dirs().sort_stats("cumulative").print_stats(top)
+    print(f"=== Allocations : {top} principaux sites (pic {peak / 1024:.0f} Kio) ===")
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>"))
+    diff = snapshot.filter_traces(ignore).compare_to(start.filter_traces(ignore), "lineno")
+    for stat in diff[:top]:
+        frame = stat.traceback[0]
+        print(f" {stat.size_diff / 1024:+10.1f} Kio {stat.count_diff:+8d} bloc(s)  {frame.filename}:{frame.lineno}")
+    if save:
+        try:
+            stats.dump_stats(save)
+            print(f"Profil enregistré dans '{save}'.")
+        except OSError as e:
+            _fail(f"Impossible d'écrire '{save}' : {e}")
 
-    data = []
-    if os.path.exists(data_path):
+
+# ---------- Durabilité des écritures (par base : databases/<db>/_database.json) ----------
+# off    : fichier temporaire + rename atomique, jamais de fsync (le système vide ses tampons
+#          périodiquement) ; pour regrouper les écritures en mémoire : 'writeback on'
+# normal : fichier temporaire + rename atomique ; fsync différé au prochain 'checkpoint'
+# full   : fichier temporaire + fsync + rename + fsync du répertoire à chaque écriture
+# Toutes les écritures de fichiers passent par _open_for_write : une erreur ou un arrêt en
+# cours d'écriture laisse toujours l'ancienne version du fichier, jamais un fichier tronqué.
+DURABILITY_LEVELS = ("off", "normal", "full")
+_db_settings_cache: Dict[str, Any] = {}
+_unsynced_paths = set()  # écrits en mode normal, pas encore synchronisés
+
+
+def _db_settings_file(db_name):
+    return os.path.join(DB_ROOT, db_name, "_database.json")
+
+
+def _db_settings(db_name):
+    settings = _db_settings_cache.get(db_name)
+    if settings is None:
+        settings = {}
         try:
-            with open(data_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception as e:
-            print("Impossible de lire data (ou fichier vide/corrompu) :", e)
+            with open(_db_settings_file(db_name), "r", encoding="utf-8") as f:
+                settings = json.load(f)
+        except (OSError, ValueError):
+            pass
+        _db_settings_cache[db_name] = settings
+    return settings
 
-    nrows = len(data) if isinstance(data, list) else 0
 
-    # affichage
-    print(f"Description de la table '{table_name}' dans la base '{current_db}':")
+def _durability(db_name=None):
+    db_name = db_name or current_db
+    if not db_name:
+        return "normal"
+    return _db_settings(db_name).get("durability", "normal")
 
-    # Colonnes avec types et contraintes
-    cols = []
-    if isinstance(schema, list):
-        for c in schema:
-            if isinstance(c, dict) and "name" in c and "type" in c:
-                pieces = [f"{c['name']}:{c['type']}"]
-                # contraintes optionnelles
-                if c.get("not_null"):
-                    pieces.append("NOT NULL")
-                if c.get("unique"):
-                    pieces.append("UNIQUE")
-                if c.get("auto_increment"):
-                    pieces.append("AUTO_INCREMENT")
-                if "default" in c and c.get("default") is not None:
-                    pieces.append(f"DEFAULT={c.get('default')}")
-                cols.append(" ".join(pieces))
-            elif isinstance(c, str):
-                # compatibilité: chaine seule -> type par défaut str
-                cols.append(f"{c}:str")
-    elif isinstance(schema, dict):
-        for k, v in schema.items():
-            cols.append(f"{k}:{v}")
-
-    print(f" - Colonnes ({len(cols)}):")
-    if cols:
-        for item in cols:
-            print(f"    - {item}")
-    else:
-        print("    (aucune)")
-
-    # nombre de lignes
-    # print(f" - Nombre de lignes : {nrows}")
 
-    # Exemples 
-    #if nrows == 0:
-    #    print(" - Table vide — aucun exemple à afficher.")
-    #else:
-    #    print(" - Exemples (premières 5 lignes) :")
-    #    for i, row in enumerate(data[:5], start=1):
-    #        print(f"   {i}. {row}")
+def _fsync_dir(dir_path):
+    try:
+        fd = os.open(dir_path or ".", os.O_RDONLY)
+    except OSError:
+        return  # répertoires non ouvrables (Windows)
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
 
 
-# Modifier le table (supprimer/ajouter/modifier)
-def alter_table(table_name):
+@contextlib.contextmanager
+def _open_for_write(path, mode="w", level=None, buffering=-1):
+    """Ouvre `path` en écriture selon le niveau de durabilité (celui de la base courante par défaut)."""
+    level = level or _durability()
+    encoding = None if "b" in mode else "utf-8"
+    # jamais en place : les fichiers liés (journal, sauvegardes, répliques) restent intacts
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, mode, buffering, encoding=encoding) as f:
+            yield f
+            if level == "full":
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    if level == "full":
+        _fsync_dir(os.path.dirname(path))
+        _unsynced_paths.discard(path)
+    elif level == "normal":
+        _unsynced_paths.add(path)
+    _stat_written(path)
+
+
+def checkpoint(verbose=False):
+    """fsync des fichiers écrits en mode normal depuis le dernier checkpoint (et de leurs répertoires)."""
+    paths = sorted(_unsynced_paths)
+    dirs = set()
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                os.fsync(f.fileno())
+        except OSError:
+            pass  # fichier supprimé depuis
+        dirs.add(os.path.dirname(path))
+    for d in dirs:
+        _fsync_dir(d)
+    _unsynced_paths.clear()
+    if verbose:
+        print(f"Checkpoint : {len(paths)} fichier(s) synchronisé(s).")
+
+
+def set_durability(level=None):
+    """durability [off|normal|full] : affiche ou change le niveau de la base courante."""
     if not ensure_db_selected():
         return
-
-        # permission : modifier le schéma de la table
+    if level is None:
+        print(f"Durabilité de la base '{current_db}' : {_durability()}")
+        return
     if not require_permission(current_db, "alter_table"):
         return
+    level = level.lower()
+    if level not in DURABILITY_LEVELS:
+        _fail(f"Niveau inconnu '{level}' ({', '.join(DURABILITY_LEVELS)}).")
+        return
+    checkpoint()  # les écritures déjà faites gardent la garantie de leur niveau
+    _save_db_settings(current_db, durability=level)
+    print(f"Durabilité de la base '{current_db}' : {level}")
 
 
-    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
-    data_path = os.path.join(DB_ROOT, current_db, f"{table_name}_data.json")
+def _table_file(table_name, suffix, db_name=None):
+    return os.path.join(DB_ROOT, db_name or current_db, f"{table_name}_{suffix}")
 
-    if not os.path.exists(schema_path):
-        print(f"La table '{table_name}' n'existe pas.")
-        return
 
-    # Lire le schema et les données
-    with open(schema_path, "r", encoding="utf-8") as f:
-        schema = json.load(f)
-    with open(data_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def _load_table_meta(table_name, db_name=None):
+    path = _table_file(table_name, "meta.json", db_name)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta if isinstance(meta, dict) else {}
+    except Exception:
+        return {}
 
-    # Afficher le schéma actuel (nom, type, contraintes)
-    print("Schéma actuel :")
-    for col in schema:
-        desc = f"{col.get('name')} ({col.get('type')})"
-        flags = []
-        if col.get("not_null"): flags.append("NOT NULL")
-        if col.get("unique"): flags.append("UNIQUE")
-        if col.get("auto_increment"): flags.append("AUTO_INCREMENT")
-        if "default" in col and col.get("default") is not None: flags.append(f"DEFAULT={col.get('default')}")
-        if flags:
-            desc += " [" + ", ".join(flags) + "]"
-        print(f" - {desc}")
 
-    print("\nActions disponibles :")
-    print("1. Ajouter une colonne")
-    print("2. Supprimer une colonne")
-    print("3. Modifier le type d'une colonne")
-    print("4. Renommer une colonne")
-    choice = input("Choisir une action (1/2/3/4) : ").strip()
+def _save_table_meta(table_name, meta, db_name=None):
+    with _open_for_write(_table_file(table_name, "meta.json", db_name), level=_durability(db_name)) as f:
+        json.dump(meta, f, indent=4, ensure_ascii=False)
 
-    valid_types = {"str", "int", "float", "bool", "date", "datetime", "list", "dict"}
 
-    # Helper : vérifier s'il existe déjà une colonne auto_increment
-    def has_auto_increment(sch):
-        return any(c.get("auto_increment") for c in sch)
+def _partition_ids(meta):
+    part = meta.get("partition")
+    if not part:
+        return [None]
+    if part["kind"] == "hash":
+        return list(range(part["count"]))
+    return list(range(len(part["bounds"]) + 1))
 
-    # ajout  
-    if choice == "1":
-        new_col_name = input("Nom de la nouvelle colonne : ").strip()
-        if any(c["name"] == new_col_name for c in schema):
-            print(f"Une colonne '{new_col_name}' existe déjà.")
-            return
 
-        new_col_type = input("Type de la colonne : ").strip().lower()
-        if new_col_type not in valid_types:
-            print(f"Type invalide '{new_col_type}', abandon.")
-            return
+def _data_file(table_name, pid=None, db_name=None):
+    if pid is None:
+        return _table_file(table_name, "data.json", db_name)
+    return _table_file(table_name, f"data.p{pid}.json", db_name)
 
-        not_null = input("NOT NULL ? (o/n) : ").strip().lower() == "o"
-        unique = input("UNIQUE ? (o/n) : ").strip().lower() == "o"
-        auto_increment = False
-        default_val = None
 
-        if new_col_type == "int":
-            auto_increment = input("AUTO_INCREMENT ? (o/n) : ").strip().lower() == "o"
-            if auto_increment and has_auto_increment(schema):
-                print("⚠ Une colonne AUTO_INCREMENT existe déjà. AUTO_INCREMENT annulé pour cette colonne.")
-                auto_increment = False
+class _RowBase:
+    """
+    Ligne compacte : une valeur par slot, les noms de colonnes sont portés par la classe
+    (générée une fois par liste de colonnes, voir _row_class). S'utilise comme un dict.
+    """
+    __slots__ = ()
+    _columns = ()
+    _slot = {}
 
-        default_input = input("Valeur par défaut (laisser vide si aucune) : ").strip()
-        if default_input != "":
-            try:
-                default_val = convert_input_to_type(default_input, new_col_type)
-                default_val = serializable_value(default_val)
-            except Exception:
-                print("Valeur par défaut invalide — ignorée.")
-                default_val = None
+    def get(self, col, default=None):
+        slot = self._slot.get(col)
+        return default if slot is None else getattr(self, slot)
 
-        # ajouter au schema
-        new_col = {
-            "name": new_col_name,
-            "type": new_col_type,
-            "not_null": not_null,
-            "unique": unique,
-            "auto_increment": auto_increment,
-            "default": default_val
-        }
-        schema.append(new_col)
+    def __getitem__(self, col):
+        return getattr(self, self._slot[col])
 
-        # si il existe , ajouter le max 
-        if auto_increment:
+    def __setitem__(self, col, value):
+        slot = self._slot.get(col)
+        if slot is None:
+            raise KeyError(col)
+        setattr(self, slot, value)
 
-            existing_vals = [row.get(new_col_name) for row in data if row.get(new_col_name) is not None]
-            max_val = 0
+    def __contains__(self, col):
+        return col in self._slot
 
-            # recherche de max 
-            for v in existing_vals:
-                try:
-                    iv = int(v)
-                    if iv > max_val:
-                        max_val = iv
-                except Exception:
-                    pass
+    def __iter__(self):
+        return iter(self._columns)
 
-            # assigner auto-incr
-            next_val = max_val + 1
-            for row in data:
-                if new_col_name not in row or row.get(new_col_name) is None:
-                    row[new_col_name] = serializable_value(next_val)
-                    next_val += 1
-        else:
-            # assigner default ou None
-            for row in data:
-                if new_col_name not in row:
-                    row[new_col_name] = default_val if default_val is not None else None
+    def __len__(self):
+        return len(self._columns)
 
-        print(f"Colonne '{new_col_name}' ajoutée (type {new_col_type}).")
+    def keys(self):
+        return self._columns
 
-    # Suppression 
-    elif choice == "2":
-        del_col_name = input("Nom de la colonne à supprimer : ").strip()
-        if not any(c["name"] == del_col_name for c in schema):
-            print(f"Colonne '{del_col_name}' introuvable.")
-            return
-        schema = [c for c in schema if c["name"] != del_col_name]
-        for row in data:
-            row.pop(del_col_name, None)
-        print(f"Colonne '{del_col_name}' supprimée.")
+    def values(self):
+        return [getattr(self, slot) for slot in self.__slots__]
 
-    # modification 
-    elif choice == "3":
-        col_name = input("Nom de la colonne à modifier : ").strip()
-        col = next((c for c in schema if c["name"] == col_name), None)
-        if not col:
-            print(f"Colonne '{col_name}' introuvable.")
-            return
+    def items(self):
+        return list(zip(self._columns, self.values()))
 
-        new_type = input(f"Nouveau type pour '{col_name}' : ").strip().lower()
-        if new_type not in valid_types:
-            print(f"Type invalide '{new_type}', abandon.")
-            return
+    def __eq__(self, other):
+        if isinstance(other, (_RowBase, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
 
-        # si colonne auto_increment 
-        if col.get("auto_increment") and new_type != "int":
-            print("Impossible : colonne AUTO_INCREMENT doit rester de type int. Abandon.")
-            return
+    __hash__ = None
 
-        # conversion 
-        for i, row in enumerate(data):
-            raw_val = row.get(col_name)
-            if raw_val is None:
-                continue
-            try:
-                conv = convert_input_to_type(str(raw_val), new_type)
-                row[col_name] = serializable_value(conv)
-            except Exception:
-                print(f"Impossible de convertir la valeur '{raw_val}' (ligne {i+1}). Mise à None.")
-                row[col_name] = None
+    def __repr__(self):
+        return repr(dict(self.items()))
 
-        # verification double si unique 
-        if col.get("unique"):
-            seen = set()
-            dup_found = False
-            for i, row in enumerate(data):
-                v = row.get(col_name)
-                if v is None:
-                    continue
-                if v in seen:
-                    print(f"Valeur dupliquée après conversion trouvée (ligne {i+1}) — la valeur sera mise à None.")
-                    row[col_name] = None
-                    dup_found = True
-                else:
-                    seen.add(v)
-            if dup_found:
-                print("Des doublons ont été éliminés (mis à None) pour satisfaire UNIQUE.")
+    def __reduce__(self):
+        # classe générée dynamiquement : reconstruite à partir des colonnes (scan parallèle)
+        return (_make_row, (self._columns, self.values()))
 
-        # mise à jour 
-        col["type"] = new_type
-        print(f"Type de '{col_name}' modifié en '{new_type}'.")
+    def raw(self, col):
+        """Valeur stockée, sans décodage (code entier pour une colonne encodée)."""
+        return getattr(self, self._slot[col])
 
-    # Renommer 
-    elif choice == "4":
-        old_name = input("Nom de la colonne à renommer : ").strip()
-        new_name = input("Nouveau nom : ").strip()
-        if not any(c["name"] == old_name for c in schema):
-            print(f"Colonne '{old_name}' introuvable.")
-            return
-        if any(c["name"] == new_name for c in schema):
-            print(f"Une colonne '{new_name}' existe déjà.")
-            return
+    def raw_values(self):
+        return [getattr(self, slot) for slot in self.__slots__]
 
-        # Modifier dans le schéma
-        for c in schema:
-            if c["name"] == old_name:
-                c["name"] = new_name
-                break
 
-        # Modifier dans les données
-        for row in data:
-            if old_name in row:
-                row[new_name] = row.pop(old_name)
+class _EncodedRowBase(_RowBase):
+    """
+    Ligne dont certaines colonnes contiennent un entier décodé par get :
+    code de dictionnaire (str) ou jours / microsecondes depuis l'époque (date / datetime).
+    """
+    __slots__ = ()
+    _decode = {}    # col -> fonction entier -> valeur
+    _encode = {}    # col -> fonction valeur -> entier (None si non encodable)
+    _temporal = {}  # col -> "date" | "datetime"
+
+    def get(self, col, default=None):
+        slot = self._slot.get(col)
+        if slot is None:
+            return default
+        v = getattr(self, slot)
+        if type(v) is int:
+            dec = self._decode.get(col)
+            if dec is not None:
+                return dec(v)
+        return v
+
+    def __getitem__(self, col):
+        if col not in self._slot:
+            raise KeyError(col)
+        return self.get(col)
+
+    def __setitem__(self, col, value):
+        enc = self._encode.get(col)
+        if enc is not None and value is not None and type(value) is not int:
+            code = enc(value)
+            if code is not None:
+                value = code
+        _RowBase.__setitem__(self, col, value)
+
+    def values(self):
+        return [self.get(col) for col in self._columns]
+
+
+def _column_codec(spec):
+    """(décodage, encodage) d'une colonne : spec = tuple des valeurs du dictionnaire ou type date/datetime."""
+    if isinstance(spec, str):
+        return (functools.partial(_int_to_temporal, col_type=spec),
+                functools.partial(_temporal_to_int, col_type=spec))
+    codes = {v: i for i, v in enumerate(spec)}
+    return spec.__getitem__, (lambda v: codes.get(v) if isinstance(v, str) else None)
+
+
+@functools.lru_cache(maxsize=256)
+def _row_class(columns, decoders=()):
+    """
+    Classe de ligne à __slots__ pour un tuple de noms de colonnes.
+    decoders : ((col, spec), ...) pour les colonnes stockées en entier ; spec = (valeur0, valeur1, ...)
+    pour un dictionnaire, "date" / "datetime" pour une colonne temporelle.
+    """
+    slots = tuple(f"_{i}" for i in range(len(columns)))
+    namespace = {"__slots__": slots, "_columns": columns, "_slot": dict(zip(columns, slots))}
+    if decoders:
+        codecs = {col: _column_codec(spec) for col, spec in decoders}
+        namespace["_decode"] = {col: codec[0] for col, codec in codecs.items()}
+        namespace["_encode"] = {col: codec[1] for col, codec in codecs.items()}
+        namespace["_temporal"] = {col: spec for col, spec in decoders if isinstance(spec, str)}
+    # __init__ généré (comme namedtuple) : une affectation par slot, sans boucle
+    if slots:
+        code = "def __init__(self, values):\n    " + ", ".join(f"self.{s}" for s in slots) + ", = values\n"
+    else:
+        code = "def __init__(self, values):\n    pass\n"
+    exec(code, namespace)
+    return type("Row", (_EncodedRowBase if decoders else _RowBase,), namespace)
 
-        print(f"Colonne '{old_name}' renommée en '{new_name}'.")
 
-    else:
-        print("Action invalide.")
-        return
+def _make_row(columns, values):
+    return _row_class(tuple(columns))(values)
 
-    # Sauvegarde
-    try:
-        with open(schema_path, "w", encoding="utf-8") as f:
-            json.dump(schema, f, indent=4, ensure_ascii=False)
-        with open(data_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        print("Erreur lors de la sauvegarde :", e)
-        return
 
-    print("Fin de modification.")
+def _upgrade_columns(columns, changes):
+    cols = list(columns)
+    for change in changes:
+        if change["op"] == "add" and change["column"] not in cols:
+            cols.append(change["column"])
+        elif change["op"] == "drop" and change["column"] in cols:
+            cols.remove(change["column"])
+        elif change["op"] == "rename" and change["from"] in cols:
+            cols[cols.index(change["from"])] = change["to"]
+    return cols
 
 
+def _read_data_file(path, meta=None):
+    """
+    Lignes d'un fichier de données, au schéma courant décrit par `meta`.
+    Format compact : {"schema_version": N, "columns": [...], "rows": [[v1, v2, ...], ...]}
+    -> lignes _RowBase ; ancien format (liste de dicts) : lu tel quel et mis à niveau ligne par ligne.
+    """
+    if not os.path.exists(path):
+        return []
+    if _is_compressed(path):
+        return _read_compressed(path, meta)
+    _stat_read(path)
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    meta = meta or {}
+    if isinstance(data, list):
+        return _upgrade_rows(data, meta)
+    if not isinstance(data, dict):
+        return []
+    return _compact_rows(data, data.get("rows", []), meta)
+
+
+def _compact_rows(header, rows, meta):
+    """Tableaux de valeurs d'un fichier compact (en-tête `header`) -> lignes au schéma courant."""
+    columns = header.get("columns", [])
+    version = header.get("schema_version", 1)
+    # colonnes stockées en entier : dictionnaires du fichier, puis date / datetime
+    decoders = tuple((col, tuple(values)) for col, values in sorted(header.get("dictionaries", {}).items()))
+    decoders += tuple(sorted(header.get("temporal", {}).items()))
+    if version < _schema_version(meta):
+        changes = [c for c in meta.get("schema_changes", []) if c["version"] > version]
+        new_columns = _upgrade_columns(columns, changes)
+        cls = _row_class(tuple(new_columns))
+        old_cls = _row_class(tuple(columns), decoders)
+        upgraded = []
+        for values in rows:
+            row = dict(old_cls(values).items())
+            for change in changes:
+                _apply_schema_change(row, change)
+            upgraded.append(cls([row.get(c) for c in new_columns]))
+        return upgraded
+    return list(map(_row_class(tuple(columns), decoders), rows))
+
+
+def _read_selected_rows(table_name, meta, pids, selection):
+    """
+    Lignes des partitions `pids` restreintes à selection[pid] (positions triées ; None : partition
+    entière). Retourne None si un fichier n'est pas au format compact.
+    """
+    rows = []
+    for pid in pids:
+        positions = selection.get(pid)
+        if positions is None:
+            part_rows = _read_data_file(_data_file(table_name, pid), meta)
+        else:
+            part_rows = _read_rows_at(_data_file(table_name, pid), positions, meta)
+            if part_rows is None:
+                return None
+        rows.extend(part_rows)
+    return rows
 
-###   Pour gestion de données 
 
-# Vérification de l'unicité 
-def is_unique_violation(col_name, candidate_serialized):
-        for row in data:
-            existing = row.get(col_name, None)
-            if existing is None and candidate_serialized is None:
-                return True
-            if existing == candidate_serialized:
-                return True
-        return False
+def _read_rows_at(path, positions, meta=None):
+    """
+    Lignes aux positions (triées) d'un fichier compact : le fichier a une ligne de texte par
+    enregistrement, seules les lignes demandées sont décodées.
+    Retourne None si le fichier n'est pas au format compact (lecture complète nécessaire).
+    """
+    if not positions or not os.path.exists(path):
+        return []
+    if _is_compressed(path):
+        return _read_compressed(path, meta, positions)
+    wanted = set(positions)
+    last = positions[-1] if positions else -1
+    picked = []
+    nread = 0  # caractères lus (≈ octets)
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline().rstrip()
+        if not (first.startswith('{"schema_version"') and first.endswith('"rows": [')):
+            return None
+        header = json.loads(first + "]}")
+        trailer = None
+        for pos, line in enumerate(f):
+            nread += len(line)
+            if line.startswith("]"):
+                trailer = line[1:] + f.read()
+                break
+            if pos in wanted:
+                picked.append(json.loads(line.rstrip().rstrip(",")))
+            if pos >= last:
+                rest = f.read()
+                end = 0 if rest.startswith("]") else rest.rfind("\n]") + 1
+                trailer = rest[end + 1:]
+                break
+    _stat_add("bytes_read", len(first) + nread + len(trailer or ""))
+    # dictionnaires écrits après les lignes
+    trailer = (trailer or "").strip().lstrip(",").strip()
+    if trailer.startswith('"dictionaries"'):
+        header["dictionaries"] = json.loads("{" + trailer)["dictionaries"]
+    return _compact_rows(header, picked, meta or {})
 
-# Insertion dans une table 
-def insert_data(table_name):
-    if not ensure_db_selected():
-        return
 
-        # permission : écriture/insertion dans la table
-    if not require_permission(current_db, "write"):
+def _compact_layout(path):
+    """
+    (en-tête avec dictionnaires, début, fin) d'un fichier compact : les lignes d'enregistrements
+    occupent les octets [début, fin). None pour un autre format.
+    """
+    with open(path, "rb") as f:
+        first = f.readline().decode("utf-8").rstrip()
+        if not (first.startswith('{"schema_version"') and first.endswith('"rows": [')):
+            return None
+        start = f.tell()
+        size = os.fstat(f.fileno()).st_size
+        # fin des lignes : dernier "\n]" (le pied ne contient pas de saut de ligne)
+        window = 1 << 16
+        while True:
+            pos = max(start, size - window)
+            f.seek(pos)
+            tail = f.read()
+            i = tail.rfind(b"\n]")
+            if i >= 0 or pos == start:
+                break
+            window *= 4
+    if i < 0:
+        return None
+    header = json.loads(first + "]}")
+    trailer = tail[i + 2:].decode("utf-8").strip().lstrip(",").strip()
+    if trailer.startswith('"dictionaries"'):
+        header["dictionaries"] = json.loads("{" + trailer)["dictionaries"]
+    return header, start, pos + i + 1
+
+
+def _data_segments(path, count):
+    """
+    Découpe un fichier de données en au plus `count` segments lisibles indépendamment (scan parallèle) :
+    ("blocks", premier, fin) pour le format compressé, ("lines", début, fin, en-tête) plage d'octets
+    du format compact. [None] (fichier entier) pour un seul segment ou l'ancien format.
+    """
+    if count <= 1 or not os.path.exists(path):
+        return [None]
+    if _is_compressed(path):
+        with open(path, "rb") as f:
+            nblocks = len(_read_footer(f)["blocks"])
+        step = max(1, -(-nblocks // count))
+        return [("blocks", i, min(i + step, nblocks)) for i in range(0, nblocks, step)] or [None]
+    layout = _compact_layout(path)
+    if layout is None:
+        return [None]
+    header, start, end = layout
+    step = max(1, -(-(end - start) // count))
+    return [("lines", lo, min(lo + step, end), header) for lo in range(start, end, step)] or [None]
+
+
+def _read_segment(path, segment, meta=None):
+    """
+    Lignes d'un segment (voir _data_segments) ; None : fichier entier.
+    Une ligne de texte appartient au segment où elle commence.
+    """
+    if segment is None:
+        return _read_data_file(path, meta)
+    if segment[0] == "blocks":
+        return _read_compressed(path, meta, blocks=segment[1:])
+    _, lo, hi, header = segment
+    values = []
+    with open(path, "rb") as f:
+        f.seek(lo - 1)
+        f.readline()  # fin de la ligne commencée avant lo (ou saut de ligne qui la précède)
+        pos = f.tell()
+        while pos < hi:
+            line = f.readline()
+            pos += len(line)
+            values.append(json.loads(line.rstrip(b",\r\n")))
+    return _compact_rows(header, values, meta or {})
+
+
+def _write_data_file(path, rows, columns, schema_version=1, dictionaries=None, temporal=None, compression=None,
+                     level=None):
+    """
+    Écrit l'en-tête (noms de colonnes une seule fois) puis une ligne JSON (tableau) par enregistrement.
+    dictionaries {col: [valeurs]} : ces colonnes sont écrites en codes ; les listes sont
+    complétées (ajout en fin uniquement, les codes existants ne changent jamais).
+    temporal {col: "date"|"datetime"} : ces colonnes sont écrites en entiers (voir _temporal_to_int).
+    compression {"codec", "level"} : format compressé par blocs (voir _write_compressed).
+    level : niveau de durabilité (celui de la base courante par défaut).
+    """
+    columns = list(columns)
+    dictionaries = {c: d for c, d in (dictionaries or {}).items() if c in columns}
+    temporal = {c: t for c, t in (temporal or {}).items() if c in columns}
+    encoded = _encoded_values(rows, columns, dictionaries, temporal)
+    header = {"schema_version": schema_version, "columns": columns}
+    if temporal:
+        header["temporal"] = temporal
+    if compression:
+        _write_compressed(path, encoded, header, dictionaries, compression, level)
         return
+    with _open_for_write(path, level=level) as f:
+        f.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "rows": [')
+        sep = "\n"
+        for values in encoded:
+            f.write(sep)
+            f.write(json.dumps(values, ensure_ascii=False))
+            sep = ",\n"
+        f.write("\n]")
+        if dictionaries:
+            # écrits après les lignes : ils contiennent les valeurs ajoutées pendant l'écriture
+            f.write(',\n"dictionaries": %s' % json.dumps(dictionaries, ensure_ascii=False))
+        f.write("}\n")
+
+
+def _encoded_values(rows, columns, dictionaries, temporal):
+    """Tableau de valeurs stockées (codes de dictionnaire, entiers date/datetime) de chaque ligne."""
+    columns_t = tuple(columns)
+    encoders = [(columns.index(c), d, {v: i for i, v in enumerate(d)}) for c, d in dictionaries.items()]
+    temporal_pos = [(columns.index(c), t) for c, t in temporal.items()]
+    decoded_pos = {}  # classe de ligne -> positions à relire décodées (get)
+    for row in rows:
+        if isinstance(row, _RowBase) and row._columns == columns_t:
+            # valeurs stockées : les entiers date/datetime sont réécrits tels quels
+            values = row.raw_values()
+            cls = type(row)
+            fix = decoded_pos.get(cls)
+            if fix is None:
+                fix = decoded_pos[cls] = [
+                    (columns.index(c), c) for c in getattr(cls, "_decode", {})
+                    if cls._temporal.get(c) is None or cls._temporal[c] != temporal.get(c)
+                ]
+            for pos, col in fix:
+                values[pos] = row.get(col)
+        else:
+            values = [row.get(c) for c in columns]
+        for pos, values_list, codes in encoders:
+            v = values[pos]
+            if v is None:
+                continue
+            code = codes.get(v)
+            if code is None:
+                code = codes[v] = len(values_list)
+                values_list.append(v)
+            values[pos] = code
+        for pos, col_type in temporal_pos:
+            v = values[pos]
+            if v is not None and type(v) is not int:
+                code = _temporal_to_int(v, col_type)
+                if code is not None:
+                    values[pos] = code
+        yield values
+
+
+# Format compressé : MAGIC, blocs compressés indépendants (lignes JSON séparées par des virgules),
+# puis le pied JSON {"schema_version", "columns", "temporal", "dictionaries", "codec",
+# "blocks": [[offset, taille, nb lignes], ...]} et sa taille sur 8 octets.
+# Les blocs ont la taille des segments des zone maps : une lecture sélective ne décompresse
+# que les blocs des lignes demandées.
+_COMPRESSED_MAGIC = b"SGBDZ1\n"
+COMPRESSION_CODECS = ("zlib", "lzma")
+
+
+def _codec(name):
+    """(compress(données, niveau), decompress(données)) du codec 'zlib' ou 'lzma'."""
+    if name == "zlib":
+        return (lambda data, level: zlib.compress(data, level)), zlib.decompress
+    if name == "lzma":
+        import lzma
+        return (lambda data, level: lzma.compress(data, preset=level)), lzma.decompress
+    raise ValueError(f"codec inconnu '{name}' ({', '.join(COMPRESSION_CODECS)})")
+
+
+def _is_compressed(path):
+    with open(path, "rb") as f:
+        return f.read(len(_COMPRESSED_MAGIC)) == _COMPRESSED_MAGIC
+
+
+def _write_compressed(path, encoded, header, dictionaries, compression, level=None):
+    compress, _ = _codec(compression["codec"])
+    level = int(compression.get("level", 6))
+    size = max(1, int(ZONE_MAPS["segment_rows"]))
+    blocks = []
+    with _open_for_write(path, "wb", level) as f:
+        f.write(_COMPRESSED_MAGIC)
+        offset = len(_COMPRESSED_MAGIC)
+        batch = []
+        for values in itertools.chain(encoded, [None]):
+            if values is not None:
+                batch.append(json.dumps(values, ensure_ascii=False))
+                if len(batch) < size:
+                    continue
+            if batch:
+                data = compress(",".join(batch).encode("utf-8"), level)
+                f.write(data)
+                blocks.append([offset, len(data), len(batch)])
+                offset += len(data)
+                batch = []
+        footer = dict(header, codec=compression["codec"], blocks=blocks)
+        if dictionaries:
+            footer["dictionaries"] = dictionaries
+        data = json.dumps(footer, ensure_ascii=False).encode("utf-8")
+        f.write(data)
+        f.write(len(data).to_bytes(8, "little"))
+
+
+def _read_footer(f):
+    """Pied d'un fichier compressé ouvert en binaire."""
+    f.seek(-8, os.SEEK_END)
+    length = int.from_bytes(f.read(8), "little")
+    f.seek(-8 - length, os.SEEK_END)
+    _stat_add("bytes_read", length + 8)
+    return json.loads(f.read(length).decode("utf-8"))
+
+
+def _read_compressed(path, meta=None, positions=None, blocks=None):
+    """
+    Lignes d'un fichier compressé ; avec `positions` (triées), seuls les blocs concernés sont décompressés.
+    blocks (premier, fin) : seulement ces blocs (segment d'un scan parallèle).
+    """
+    picked = []
+    with open(path, "rb") as f:
+        footer = _read_footer(f)
+        _, decompress = _codec(footer["codec"])
+        start = 0
+        for n, (offset, size, nrows) in enumerate(footer["blocks"]):
+            end = start + nrows
+            if blocks is not None and not blocks[0] <= n < blocks[1]:
+                start = end
+                continue
+            if positions is None:
+                selected = None
+            else:
+                lo = bisect.bisect_left(positions, start)
+                hi = bisect.bisect_left(positions, end)
+                selected = positions[lo:hi]
+            if selected is None or selected:
+                f.seek(offset)
+                _stat_add("bytes_read", size)
+                values = json.loads("[" + decompress(f.read(size)).decode("utf-8") + "]")
+                picked.extend(values if selected is None else [values[p - start] for p in selected])
+            start = end
+    return _compact_rows(footer, picked, meta or {})
 
 
-    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
-    data_path = os.path.join(DB_ROOT, current_db, f"{table_name}_data.json")
+def _table_types(table_name, db_name=None):
+    return _schema_types(_table_schema(table_name, db_name))
 
-    if not os.path.exists(schema_path):
-        print(f"La table '{table_name}' n'existe pas.")
-        return
 
-    # Charger le schéma
-    try:
-        with open(schema_path, "r", encoding="utf-8") as f:
-            schema = json.load(f)
-    except Exception as e:
-        print("Impossible de lire le schema :", e)
-        return
+def _table_schema(table_name, db_name=None):
+    with open(_table_file(table_name, "schema.json", db_name), "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    return [c if isinstance(c, dict) else {"name": str(c), "type": "str"} for c in schema] if isinstance(schema, list) else []
 
-    # Charger les données 
-    try:
-        with open(data_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if not isinstance(data, list):
-                data = []
-    except Exception:
-        data = []
 
-    schema_map = {}
-    for col in schema:
-        if isinstance(col, dict):
-            schema_map[col["name"]] = col
-        else:
-            schema_map[str(col)] = {"name": str(col), "type": "str"}
+def _schema_types(schema):
+    return {c["name"]: c.get("type", "str") if isinstance(c, dict) else "str" for c in schema} if isinstance(schema, list) else {}
 
-    
 
-    new_record = {}
+def _partition_of_value(meta, col_type, value):
+    """Numéro de partition d'une valeur de la colonne de partitionnement (NULL -> p0)."""
+    part = meta["partition"]
+    v = _coerce_value(value, col_type)
+    if v is None:
+        return 0
+    if part["kind"] == "hash":
+        # crc32 : stable d'un processus à l'autre (hash() des str ne l'est pas)
+        key = json.dumps(serializable_value(v), ensure_ascii=False, sort_keys=True)
+        return zlib.crc32(key.encode("utf-8")) % part["count"]
+    bounds = [_coerce_value(b, col_type) for b in part["bounds"]]
+    try:
+        return bisect.bisect_right(bounds, v)
+    except TypeError:
+        return 0
 
-    # auto incrémenter: get max 
-    auto_inc_cols = [c["name"] for c in schema if isinstance(c, dict) and c.get("auto_increment")]
-    auto_inc_next = {}
-    for col_name in auto_inc_cols:
+
+def _partition_of_row(meta, schema_map, row):
+    part = meta.get("partition")
+    if not part:
+        return None
+    col = part["column"]
+    return _partition_of_value(meta, schema_map.get(col, "str"), row.get(col))
+
+
+def _schema_version(meta):
+    return meta.get("schema_version", 1)
+
+
+def _record_schema_change(meta, change):
+    """Ajoute un changement de schéma (add/drop/rename/retype) et incrémente la version."""
+    meta["schema_version"] = _schema_version(meta) + 1
+    change["version"] = meta["schema_version"]
+    meta.setdefault("schema_changes", []).append(change)
+
+
+def _apply_schema_change(row, change):
+    op = change["op"]
+    if op == "add":
+        if change["column"] not in row:
+            row[change["column"]] = change.get("default")
+    elif op == "drop":
+        row.pop(change["column"], None)
+    elif op == "rename":
+        if change["from"] in row:
+            row[change["to"]] = row.pop(change["from"])
+    elif op == "retype":
+        raw_val = row.get(change["column"])
+        if raw_val is not None:
+            try:
+                row[change["column"]] = serializable_value(convert_input_to_type(str(raw_val), change["type"]))
+            except Exception:
+                row[change["column"]] = None
+
+
+def _upgrade_rows(rows, meta):
+    """Mise à niveau à la lecture des lignes écrites avec une version antérieure du schéma."""
+    version = _schema_version(meta)
+    if version == 1:
+        return rows
+    changes = meta.get("schema_changes", [])
+    for row in rows:
+        row_version = row.get("_sv", 1)
+        if row_version < version:
+            for change in changes:
+                if change["version"] > row_version:
+                    _apply_schema_change(row, change)
+            row["_sv"] = version
+    return rows
+
+
+def _load_partitions(table_name, meta, pids=None, shared=False, db_name=None):
+    """
+    [(pid, lignes)] pour les partitions demandées (toutes par défaut), au schéma courant.
+    Partition en attente d'écriture : ses lignes en mémoire (copiées, sauf shared=True : lecture seule).
+    """
+    return list(_iter_partitions(table_name, meta, pids, shared, db_name))
+
+
+def _iter_partitions(table_name, meta, pids=None, shared=False, db_name=None):
+    """Comme _load_partitions, une partition lue à la fois (export en flux)."""
+    if pids is None:
+        pids = _partition_ids(meta)
+    for pid in pids:
+        rows = _pending_rows(table_name, pid, db_name)
+        _cache_access("table", rows is not None)
+        if rows is None:
+            rows = _read_data_file(_data_file(table_name, pid, db_name), meta)
+        elif not shared:
+            rows = [_copy_row(row) for row in rows]  # l'appelant peut modifier ses lignes
+        yield pid, rows
+
+
+def _load_rows(table_name, meta=None, db_name=None):
+    """Toutes les lignes de la table, partitions concaténées dans l'ordre."""
+    if meta is None:
+        meta = _load_table_meta(table_name, db_name)
+    rows = []
+    for _, part_rows in _load_partitions(table_name, meta, db_name=db_name):
+        rows.extend(part_rows)
+    return rows
+
+
+def _save_partition(table_name, meta, pid, rows, db_name=None):
+    """
+    Réécrit une seule partition (ou le fichier unique), met à jour son nombre de lignes et ses index.
+    Les lignes lues ont été mises à niveau : le fichier est écrit à la version courante du schéma.
+    En mode writeback, seul le méta est écrit ici : le fichier et ses index le sont par le flusher.
+    """
+    types = _table_types(table_name, db_name)
+    deferred = WRITEBACK["enabled"]
+    if deferred:
+        # dictionnaires complétés dès maintenant : les codes du méta sont ceux du fichier écrit plus tard
+        _extend_dictionaries(meta, rows, types)
+    else:
+        _write_partition(table_name, meta, pid, rows, types, db_name)
+    if pid is None and meta.get("dictionaries"):
+        _save_table_meta(table_name, meta, db_name)  # dictionnaires éventuellement complétés
+    if pid is not None:
+        counts = meta.setdefault("row_counts", {})
+        counts[str(pid)] = len(rows)
+        _save_table_meta(table_name, meta, db_name)
+    _catalog_update(table_name, meta, {pid: len(rows)}, db_name)
+    if deferred:
+        _defer_partition(table_name, meta, pid, rows, types, db_name)
+        return
+    _update_indexes(table_name, meta, pid, rows, types, db_name)
+    _update_zone_maps(table_name, meta, pid, rows, types, db_name)
+
+
+def _write_partition(table_name, meta, pid, rows, types, db_name=None):
+    """Fichier de données de la partition, au schéma `types` (base courante par défaut)."""
+    temporal = {col: t for col, t in types.items() if t in _TEMPORAL_TYPES}
+    _write_data_file(_data_file(table_name, pid, db_name), rows, list(types), _schema_version(meta),
+                     meta.get("dictionaries"), temporal, meta.get("compression"), _durability(db_name))
+
+
+# ---------- Écriture différée (writeback on) ----------
+# Une partition modifiée reste en mémoire (table « sale ») et un thread l'écrit plus tard :
+# après WRITEBACK["delay"] secondes, ou tout de suite au-delà de max_rows lignes en attente
+# ou quand la mémoire disponible passe sous min_free_mb. Le méta (nombres de lignes,
+# dictionnaires) est écrit immédiatement ; le fichier de données, ses index et zone maps
+# par le flusher (rename atomique de _open_for_write).
+# Les lectures (_load_partitions) voient les lignes en attente ; 'use', 'exit' et les
+# commandes qui réécrivent la table (alter, analyze, index, compress...) vident d'abord l'attente.
+WRITEBACK: Dict[str, Any] = {
+    "enabled": False,
+    "delay": 2.0,         # secondes avant l'écriture d'une partition modifiée
+    "max_rows": 500000,   # lignes en attente au-delà desquelles tout est écrit tout de suite
+    "min_free_mb": 64,    # mémoire disponible minimale (Linux : MemAvailable)
+}
+_pending_writes: Dict[Any, Dict[str, Any]] = {}  # (base, table, pid) -> {"meta", "rows", "types", "since"}
+_pending_lock = threading.Lock()   # protège _pending_writes
+_flush_lock = threading.RLock()    # une seule écriture différée à la fois (thread ou commande)
+_writeback_wake = threading.Event()
+_writeback_thread = None
+
+
+def _extend_dictionaries(meta, rows, types):
+    """Ajoute aux dictionnaires du méta les valeurs des lignes pas encore encodées."""
+    dictionaries = {c: d for c, d in meta.get("dictionaries", {}).items() if c in types}
+    if not dictionaries:
+        return
+    temporal = {col: t for col, t in types.items() if t in _TEMPORAL_TYPES}
+    for _ in _encoded_values(rows, list(types), dictionaries, temporal):
+        pass
+
+
+def _copy_row(row):
+    if isinstance(row, _RowBase):
+        return type(row)(row.raw_values())
+    return dict(row)
+
+
+def _pending_rows(table_name, pid, db_name=None):
+    """Lignes de la partition en attente d'écriture (None si le fichier est à jour)."""
+    entry = _pending_writes.get((db_name or current_db, table_name, pid))
+    return None if entry is None else entry["rows"]
+
+
+def _has_pending_writes(table_name):
+    return any(db == current_db and t == table_name for db, t, _ in list(_pending_writes))
+
+
+def _free_memory_mb():
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _writeback_pressure():
+    """Vrai s'il faut écrire tout de suite : trop de lignes en attente ou mémoire basse."""
+    pending = sum(len(entry["rows"]) for entry in list(_pending_writes.values()))
+    if pending > WRITEBACK["max_rows"]:
+        return True
+    free_mb = _free_memory_mb()
+    return free_mb is not None and free_mb < WRITEBACK["min_free_mb"]
+
+
+def _defer_partition(table_name, meta, pid, rows, types, db_name=None):
+    key = (db_name or current_db, table_name, pid)
+    entry = {
+        "meta": json.loads(json.dumps(meta)),  # copie : l'appelant peut encore modifier le méta
+        "rows": list(rows),
+        "types": dict(types),
+        "since": time.monotonic(),
+    }
+    with _pending_lock:
+        previous = _pending_writes.get(key)
+        if previous is not None:
+            entry["since"] = previous["since"]  # écrite au plus tard `delay` après la 1re modification
+        _pending_writes[key] = entry
+    if _writeback_pressure():
+        flush_writes()
+    else:
+        _start_writeback_thread()
+
+
+def flush_writes(table_name=None, older_than=None):
+    """
+    Écrit les partitions en attente (de `table_name`, sinon toutes) ; older_than : seulement celles
+    modifiées depuis au moins N secondes. Une écriture en échec reste en attente.
+    Retourne le nombre de partitions écrites.
+    """
+    written = 0
+    with _locked(_flush_lock, "flush"):
+        now = time.monotonic()
+        with _pending_lock:
+            batch = [
+                (key, entry) for key, entry in _pending_writes.items()
+                if (table_name is None or key[:2] == (current_db, table_name))
+                and (older_than is None or now - entry["since"] >= older_than)
+            ]
+        for key, entry in batch:
+            # la base de la clé, pas la base courante : 'create_db' / 'use' ou le thread
+            # peuvent écrire une partition en attente d'une autre base
+            db_name, table, pid = key
+            try:
+                _write_partition(table, entry["meta"], pid, entry["rows"], entry["types"], db_name)
+                _update_indexes(table, entry["meta"], pid, entry["rows"], entry["types"], db_name)
+                _update_zone_maps(table, entry["meta"], pid, entry["rows"], entry["types"], db_name)
+                _catalog_update(table, entry["meta"], db_name=db_name)  # taille des fichiers
+            except Exception as e:
+                if entry.get("error") != str(e):
+                    print(f"\nÉcriture différée de '{table}' impossible : {e}")
+                entry["error"] = str(e)
+                continue
+            with _pending_lock:
+                if _pending_writes.get(key) is entry:  # pas remodifiée pendant l'écriture
+                    del _pending_writes[key]
+            written += 1
+    return written
+
+
+def _discard_pending(table_name=None, db_name=None):
+    """Oublie les écritures en attente d'une table supprimée (ou de toute une base)."""
+    db_name = db_name or current_db
+    with _locked(_flush_lock, "flush"), _pending_lock:
+        for key in [k for k in _pending_writes if k[0] == db_name and (table_name is None or k[1] == table_name)]:
+            del _pending_writes[key]
+
+
+def _writeback_loop():
+    while True:
+        _writeback_wake.wait(max(0.1, WRITEBACK["delay"] / 2))
+        _writeback_wake.clear()
+        if _pending_writes:
+            flush_writes(older_than=WRITEBACK["delay"])
+
+
+def _start_writeback_thread():
+    global _writeback_thread
+    if _writeback_thread is None:
+        _writeback_thread = threading.Thread(target=_writeback_loop, name="writeback", daemon=True)
+        _writeback_thread.start()
+
+
+def set_writeback(args: List[str]) -> bool:
+    """writeback [on|off] [delay=S] [max_rows=N] [min_free_mb=N]"""
+    for arg in args:
+        if arg.lower() in ("on", "off"):
+            if arg.lower() == "off":
+                flush_writes()
+            WRITEBACK["enabled"] = arg.lower() == "on"
+            continue
+        name, _, value = arg.partition("=")
+        name = name.lower()
+        if name not in WRITEBACK or name == "enabled":
+            _fail(f"Option inconnue '{arg}'.")
+            return False
+        try:
+            fvalue = float(value)
+            if fvalue < 0:
+                raise ValueError
+        except ValueError:
+            _fail(f"Valeur positive attendue pour '{name}'.")
+            return False
+        WRITEBACK[name] = fvalue if name == "delay" else int(fvalue)
+    _writeback_wake.set()
+    state = ", ".join(f"{k}={v}" for k, v in WRITEBACK.items())
+    print(f"Écriture différée : {state} ({len(_pending_writes)} partition(s) en attente)")
+    return True
+
+
+# ---------- Catalogue de la base (databases/<db>/_catalog.json) ----------
+# {"tables": {nom: {"kind": "table" | "view", "schema_version", "columns", "rows",
+#   "partition_rows": {pid: nb}, "size" (octets des fichiers de données), "indexes",
+#   "trigram_indexes", "modified"}}}
+# Réécrit (atomiquement) par chaque commande qui modifie une table : show_tables et
+# describe_table le lisent sans parcourir le répertoire ni les données.
+# Base antérieure au catalogue : reconstruit une fois à partir des fichiers.
+_catalog_cache: Dict[str, Any] = {}  # base -> (empreinte du fichier, catalogue)
+_catalog_lock = threading.RLock()    # partagé avec le thread d'écriture différée
+
+
+def _catalog_file(db_name=None):
+    return os.path.join(DB_ROOT, db_name or current_db, "_catalog.json")
+
+
+def _load_catalog(db_name=None):
+    db_name = db_name or current_db
+    path = _catalog_file(db_name)
+    stamp = _file_stamp(path)
+    cached = _catalog_cache.get(db_name)
+    _cache_access("catalog", cached is not None and cached[0] == stamp)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    catalog = None
+    if stamp is not None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                catalog = json.load(f)
+        except (OSError, ValueError):
+            catalog = None
+    if not isinstance(catalog, dict) or not isinstance(catalog.get("tables"), dict):
+        return _rebuild_catalog(db_name)
+    _catalog_cache[db_name] = (stamp, catalog)
+    return catalog
+
+
+def _save_catalog(catalog, db_name=None):
+    db_name = db_name or current_db
+    path = _catalog_file(db_name)
+    with _open_for_write(path, level=_durability(db_name)) as f:
+        json.dump(catalog, f, indent=4, ensure_ascii=False)
+    _catalog_cache[db_name] = (_file_stamp(path), catalog)
+
+
+def _rebuild_catalog(db_name=None):
+    """Catalogue reconstruit depuis les fichiers de la base (tables non partitionnées : lignes comptées)."""
+    db_name = db_name or current_db
+    catalog = {"tables": {}}
+    for f in sorted(os.listdir(os.path.join(DB_ROOT, db_name))):
+        if f.endswith("_schema.json"):
+            name = f[:-12]
+            modified = datetime.fromtimestamp(os.path.getmtime(os.path.join(DB_ROOT, db_name, f)))
+            catalog["tables"][name] = _catalog_entry(name, _load_table_meta(name, db_name), {}, modified, db_name)
+    _save_catalog(catalog, db_name)
+    return catalog
+
+
+def _catalog_entry(table_name, meta, counts, modified=None, db_name=None):
+    """Entrée du catalogue ; counts {clé de partition: nb lignes} connus, les autres sont comptés."""
+    counts = dict(counts)
+    size = 0
+    for pid in _partition_ids(meta):
+        path = _data_file(table_name, pid, db_name)
+        if os.path.exists(path):
+            size += os.path.getsize(path)
+        key = _partition_key(pid)
+        if key not in counts:
+            n = None if pid is None else meta.get("row_counts", {}).get(str(pid))
+            if n is None:
+                n = len(_load_partitions(table_name, meta, [pid], shared=True, db_name=db_name)[0][1])
+            counts[key] = n
+    return {
+        "kind": "view" if _is_view(table_name, db_name) else "table",
+        "schema_version": _schema_version(meta),
+        "columns": len(_table_types(table_name, db_name)),
+        "rows": sum(counts.values()),
+        "partition_rows": counts,
+        "size": size,
+        "indexes": list(meta.get("indexes", [])),
+        "trigram_indexes": list(meta.get("trigram_indexes", [])),
+        "modified": (modified or datetime.now()).isoformat(timespec="seconds"),
+    }
+
+
+def _catalog_update(table_name, meta=None, part_rows=None, db_name=None):
+    """Met à jour l'entrée de la table ; part_rows {pid: nb lignes} des partitions réécrites."""
+    if meta is None:
+        meta = _load_table_meta(table_name, db_name)
+    with _locked(_catalog_lock, "catalog"):
+        catalog = _load_catalog(db_name)
+        counts = dict(catalog["tables"].get(table_name, {}).get("partition_rows", {}))
+        for pid, n in (part_rows or {}).items():
+            counts[_partition_key(pid)] = n
+        catalog["tables"][table_name] = _catalog_entry(table_name, meta, counts, db_name=db_name)
+        _save_catalog(catalog, db_name)
+
+
+def _catalog_drop(table_name, db_name=None):
+    with _locked(_catalog_lock, "catalog"):
+        catalog = _load_catalog(db_name)
+        if catalog["tables"].pop(table_name, None) is not None:
+            _save_catalog(catalog, db_name)
+
+
+# Encodage par dictionnaire des colonnes str peu variées (activé par 'analyze <table>') :
+# meta["dictionaries"][col] = liste de valeurs, le code d'une valeur est son indice.
+# La liste ne fait que grandir : un code déjà écrit reste valable dans tous les fichiers.
+DICTIONARY_ENCODING: Dict[str, Any] = {
+    "max_values": 4096,  # nb maximal de valeurs distinctes
+    "max_ratio": 0.5,    # valeurs distinctes / valeurs non nulles
+}
+
+
+def _column_encodings(meta, schema_map):
+    """{col: {valeur: code}} pour les colonnes encodées du schéma courant."""
+    return {
+        col: {v: i for i, v in enumerate(values)}
+        for col, values in (meta or {}).get("dictionaries", {}).items()
+        if schema_map.get(col) == "str"
+    }
+
+
+def _scan_row_counts(table_name, pids):
+    """Nombre de lignes de chaque partition d'après le catalogue (table non partitionnée comprise)."""
+    counts = _load_catalog()["tables"].get(table_name, {}).get("partition_rows", {})
+    return [counts.get(_partition_key(pid), 0) for pid in pids]
+
+
+def _prune_partitions(tree, meta, schema_map, params=()):
+    """
+    Partitions pouvant contenir des lignes satisfaisant `tree`.
+    Seuls =, in, between, <, <=, >, >= et is null sur la colonne de partitionnement élaguent ;
+    tout le reste (or sur une autre colonne, not, !=, like) garde toutes les partitions.
+    """
+    all_pids = _partition_ids(meta)
+    part = meta.get("partition")
+    if not part or tree is None:
+        return all_pids
+    key = part["column"]
+    col_type = schema_map.get(key, "str")
+
+    def literal(value):
+        if value[0] == "param":
+            raw = params[value[1]] if value[1] < len(params) else None
+            return None if raw is None else _convert_operand(str(raw), col_type)
+        if value[0] == "null":
+            return None
+        return _convert_operand(value[1], col_type)
+
+    def span(lo, hi):
+        # partitions couvrant l'intervalle [lo, hi] (None = non borné)
+        first = _partition_of_value(meta, col_type, lo) if lo is not None else 0
+        last = _partition_of_value(meta, col_type, hi) if hi is not None else all_pids[-1]
+        return set(range(first, last + 1))
+
+    def walk(node):
+        kind = node[0]
+        if kind == "and":
+            result = None
+            for n in node[1]:
+                s = walk(n)
+                if s is not None:
+                    result = s if result is None else result & s
+            return result
+        if kind == "or":
+            result = set()
+            for n in node[1]:
+                s = walk(n)
+                if s is None:
+                    return None
+                result |= s
+            return result
+        if kind == "not" or node[1] != key:
+            return None
+        try:
+            if kind == "isnull":
+                return None if node[2] else {0}
+            if kind == "in" and not node[3]:
+                return {_partition_of_value(meta, col_type, literal(v)) for v in node[2] if literal(v) is not None}
+            if part["kind"] == "hash":
+                if kind == "cmp" and node[2] == "=":
+                    v = literal(node[3])
+                    return set() if v is None else {_partition_of_value(meta, col_type, v)}
+                return None
+            # range
+            if kind == "between" and not node[4]:
+                return span(literal(node[2]), literal(node[3]))
+            if kind == "cmp":
+                op, v = node[2], literal(node[3])
+                if v is None:
+                    return set()
+                if op == "=":
+                    return {_partition_of_value(meta, col_type, v)}
+                if op in (">", ">="):
+                    return span(v, None)
+                if op in ("<", "<="):
+                    return span(None, v)
+        except (TypeError, IndexError):
+            return None
+        return None
+
+    selected = walk(tree)
+    if selected is None:
+        return all_pids
+    return [pid for pid in all_pids if pid in selected]
+
+
+# ---------- Index (create_index <table> <col> [trigram]) ----------
+# Trié     : <table>_index_<col>.json, colonnes listées dans meta["indexes"]
+#   {"column", "partitions": {"-" | "<pid>": {"stamp", "keys", "pos"}}} : keys triées (nombres,
+#   chaînes, entiers date/datetime), pos = position de la ligne dans le fichier de la partition.
+# Trigramme : <table>_trigram_<col>.json, colonnes str listées dans meta["trigram_indexes"]
+#   {"column", "partitions": {...: {"stamp", "grams": {trigramme: [positions]}}}} (valeurs en minuscules).
+# Reconstruits à chaque écriture de la partition ; "stamp" (mtime, taille du fichier) détecte
+# un index périmé, qui est alors ignoré (scan complet).
+_INDEX_KINDS = {"sorted": ("indexes", "index"), "trigram": ("trigram_indexes", "trigram")}
+
+
+def _index_file(table_name, col, kind="sorted", db_name=None):
+    return _table_file(table_name, f"{_INDEX_KINDS[kind][1]}_{col}.json", db_name)
+
+
+_index_cache: Dict[str, Any] = {}  # chemin -> (stamp du fichier d'index, index) : évite de relire le JSON
+
+
+def _freeze_index(index):
+    """
+    Version gardée en cache : positions en array('q'), clés en tuple. Ni l'un ni l'autre n'est
+    parcouru par le ramasse-miettes, qui sinon ralentit les scans qui allouent beaucoup de lignes.
+    """
+    from array import array
+    for part in index.get("partitions", {}).values():
+        if "keys" in part:
+            part["keys"] = tuple(part["keys"])
+            part["pos"] = array("q", part["pos"])
+        if "grams" in part:
+            part["grams"] = {g: array("q", plist) for g, plist in part["grams"].items()}
+    return index
+
+
+def _load_index(table_name, col, kind="sorted", db_name=None):
+    path = _index_file(table_name, col, kind, db_name)
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return {"column": col, "partitions": {}}
+    cached = _index_cache.get(path)
+    _cache_access("index", cached is not None and cached[0] == stamp)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    _stat_read(path)
+    with open(path, "r", encoding="utf-8") as f:
+        index = _freeze_index(json.load(f))
+    _index_cache[path] = (stamp, index)
+    return index
+
+
+def _save_index(table_name, col, index, kind="sorted", db_name=None):
+    path = _index_file(table_name, col, kind, db_name)
+    with _open_for_write(path, level=_durability(db_name)) as f:
+        json.dump(index, f, ensure_ascii=False, default=list)
+    _index_cache[path] = (_file_stamp(path), _freeze_index(index))
+
+
+def _drop_index_file(table_name, col, kind="sorted"):
+    path = _index_file(table_name, col, kind)
+    _index_cache.pop(path, None)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _indexed_columns(meta, kind="sorted"):
+    return meta.get(_INDEX_KINDS[kind][0], [])
+
+
+def _partition_key(pid):
+    return "-" if pid is None else str(pid)
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _index_key(value, col_type):
+    """Clé d'index d'une valeur (None : non indexée, comme NULL ou une valeur non convertible)."""
+    if value is None:
+        return None
+    if col_type in _TEMPORAL_TYPES:
+        return _temporal_to_int(value, col_type)
+    v = _coerce_value(value, col_type)
+    if col_type == "str":
+        return v
+    if col_type in ("int", "float", "bool") and isinstance(v, (int, float)):
+        return v
+    return None
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _build_index_part(rows, col, col_type, path):
+    entries = []
+    for pos, row in enumerate(rows):
+        v = _stored_value(row, col) if col_type in _TEMPORAL_TYPES else row.get(col)
+        key = _index_key(v, col_type)
+        if key is not None:
+            entries.append((key, pos))
+    entries.sort()
+    return {"stamp": _file_stamp(path), "keys": [k for k, _ in entries], "pos": [p for _, p in entries]}
+
+
+def _build_trigram_part(rows, col, path):
+    grams = {}
+    for pos, row in enumerate(rows):
+        v = row.get(col)
+        if v is None:
+            continue
+        for gram in _trigrams(str(v).lower()):
+            grams.setdefault(gram, []).append(pos)
+    return {"stamp": _file_stamp(path), "grams": grams}
+
+
+def _update_indexes(table_name, meta, pid, rows, types, db_name=None):
+    """Reconstruit la partie `pid` de chaque index de la table (après écriture du fichier)."""
+    path = _data_file(table_name, pid, db_name)
+    for kind in _INDEX_KINDS:
+        for col in _indexed_columns(meta, kind):
+            if col not in types:
+                continue
+            index = _load_index(table_name, col, kind, db_name)
+            if kind == "sorted":
+                part = _build_index_part(rows, col, types[col], path)
+            else:
+                part = _build_trigram_part(rows, col, path)
+            index.setdefault("partitions", {})[_partition_key(pid)] = part
+            _save_index(table_name, col, index, kind, db_name)
+
+
+def _index_operand(value, col_type, params=()):
+    """Littéral ou paramètre '?' converti au type de la colonne (None pour NULL)."""
+    if value[0] == "param":
+        raw = params[value[1]] if value[1] < len(params) else None
+        return None if raw is None else _convert_operand(str(raw), col_type)
+    if value[0] == "lit":
+        return _convert_operand(value[1], col_type)
+    return None
+
+
+def _case_variants(text, limit=64):
+    """Toutes les variantes de casse de `text` (au plus `limit`, sinon None)."""
+    variants = [""]
+    for ch in text:
+        forms = {ch, ch.lower(), ch.upper()}
+        if len(variants) * len(forms) > limit:
+            return None
+        variants = [v + f for v in variants for f in forms]
+    return variants
+
+
+def _index_ranges(term, col_type, params=()):
+    """
+    Intervalles [(bas, bas inclus, haut, haut inclus)] de clés satisfaisant `term`
+    (=, <, <=, >, >=, between, in, like 'abc%') ; None si l'index ne peut pas servir.
+    like étant insensible à la casse, un préfixe donne un intervalle par variante de casse
+    de ses premiers caractères (sur-ensemble, le prédicat est réappliqué).
+    """
+    def key(value):
+        v = _index_operand(value, col_type, params)
+        if col_type in _TEMPORAL_TYPES and not isinstance(v, date):
+            return None
+        return _index_key(v, col_type)
+
+    kind = term[0]
+    if kind == "cmp":
+        op, k = term[2], key(term[3])
+        if k is None or op == "!=":
+            return None
+        return [{
+            "=": (k, True, k, True),
+            ">": (k, False, None, False),
+            ">=": (k, True, None, False),
+            "<": (None, False, k, False),
+            "<=": (None, False, k, True),
+        }[op]]
+    if kind == "between" and not term[4]:
+        lo, hi = key(term[2]), key(term[3])
+        return None if lo is None or hi is None else [(lo, True, hi, True)]
+    if kind == "in" and not term[3]:
+        keys = [key(v) for v in term[2]]
+        return None if any(k is None for k in keys) else [(k, True, k, True) for k in keys]
+    if kind == "like" and not term[3] and col_type == "str":
+        pattern = _index_operand(term[2], col_type, params)
+        if not isinstance(pattern, str):
+            return None
+        like_kind, text = _classify_like(pattern)
+        if like_kind not in ("exact", "prefix") or not text:
+            return None
+        prefix = text[:6]
+        while prefix and _case_variants(prefix) is None:
+            prefix = prefix[:-1]
+        if not prefix:
+            return None
+        # chaînes commençant par v : [v, v + caractère maximal[
+        return [(v, True, v + "\U0010ffff", False) for v in _case_variants(prefix)]
+    return None
+
+
+def _sorted_index_hits(table_name, term, col_type, pids, params=()):
+    """{pid: positions candidates} par l'index trié de la colonne de `term`, ou None."""
+    ranges = _index_ranges(term, col_type, params)
+    if ranges is None:
+        return None
+    parts = _load_index(table_name, term[1]).get("partitions", {})
+    found = {}
+    for pid in pids:
+        part = parts.get(_partition_key(pid))
+        if part is None or part["stamp"] != _file_stamp(_data_file(table_name, pid)):
+            return None
+        keys, pos = part["keys"], part["pos"]
+        selected = set()
+        try:
+            for lo, lo_inc, hi, hi_inc in ranges:
+                start = 0 if lo is None else (bisect.bisect_left(keys, lo) if lo_inc else bisect.bisect_right(keys, lo))
+                end = len(keys) if hi is None else (bisect.bisect_right(keys, hi) if hi_inc else bisect.bisect_left(keys, hi))
+                selected.update(pos[start:end])
+        except TypeError:
+            return None
+        found[pid] = selected
+    return found
+
+
+def _trigram_index_hits(table_name, term, pids, params=()):
+    """
+    {pid: positions candidates} pour un like par l'index trigrammes : lignes contenant tous
+    les trigrammes des morceaux littéraux (>= 3 caractères) du motif ; None si inutilisable.
+    """
+    if term[0] != "like" or term[3]:
+        return None
+    pattern = _index_operand(term[2], "str", params)
+    if not isinstance(pattern, str):
+        return None
+    grams = set()
+    for piece in pattern.lower().split("%"):
+        grams |= _trigrams(piece)
+    if not grams:
+        return None
+    parts = _load_index(table_name, term[1], "trigram").get("partitions", {})
+    found = {}
+    for pid in pids:
+        part = parts.get(_partition_key(pid))
+        if part is None or part["stamp"] != _file_stamp(_data_file(table_name, pid)):
+            return None
+        postings = sorted((part["grams"].get(g, []) for g in grams), key=len)
+        selected = set(postings[0])
+        for plist in postings[1:]:
+            if not selected:
+                break
+            selected.intersection_update(plist)
+        found[pid] = selected
+    return found
+
+
+def _index_positions(table_name, tree, meta, schema_map, pids, params=(), used=None):
+    """
+    {pid: positions triées} des lignes candidates d'après les index, en intersectant les termes
+    'and' servis par un index ; None si aucun index ne s'applique (index périmés ignorés).
+    used : liste complétée par les index utilisés ("index col", "trigrammes col").
+    """
+    sorted_cols = [c for c in _indexed_columns(meta, "sorted") if c in schema_map]
+    trigram_cols = [c for c in _indexed_columns(meta, "trigram") if schema_map.get(c) == "str"]
+    if not (sorted_cols or trigram_cols) or tree is None:
+        return None
+    terms = tree[1] if tree[0] == "and" else [tree]
+    result = None
+    if used is None:
+        used = []
+    for term in terms:
+        if term[0] not in ("cmp", "between", "in", "like"):
+            continue
+        col = term[1]
+        candidates = []
+        if col in sorted_cols:
+            candidates.append(("index", _sorted_index_hits(table_name, term, schema_map[col], pids, params)))
+        if col in trigram_cols:
+            candidates.append(("trigrammes", _trigram_index_hits(table_name, term, pids, params)))
+        for kind, found in candidates:
+            if found is None:
+                continue
+            used.append(f"{kind} {col}")
+            result = found if result is None else {pid: result[pid] & found[pid] for pid in pids}
+    if result is None:
+        return None
+    return {pid: sorted(selected) for pid, selected in result.items()}
+
+
+# ---------- Zone maps et filtres de Bloom (activés par 'analyze <table>') ----------
+# <table>_zones.json : {"partitions": {"-" | "<pid>": {"stamp", "segment_rows", "segments": [
+#     {"rows": n, "columns": {col: {"nulls", "min", "max", "values" | "bloom"}}}, ...]}}}
+# Un segment = segment_rows lignes consécutives du fichier. search saute les segments dont
+# min/max (ou les valeurs / le filtre de Bloom pour l'égalité) excluent la clause WHERE ;
+# "values" remplace le filtre quand le segment a peu de valeurs distinctes.
+ZONE_MAPS: Dict[str, Any] = {
+    "segment_rows": 10000,
+    "exact_values": 16,   # au plus : liste exacte des valeurs au lieu d'un filtre de Bloom
+    "bloom_bits": 10,     # bits par valeur distincte (~1 % de faux positifs)
+    "bloom_hashes": 7,
+    "max_ratio": 0.5,     # lecture ligne à ligne seulement si au plus cette part des lignes reste
+}
+
+
+def _zones_file(table_name, db_name=None):
+    return _table_file(table_name, "zones.json", db_name)
+
+
+def _load_zones(table_name, db_name=None):
+    path = _zones_file(table_name, db_name)
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return {"partitions": {}}
+    cached = _index_cache.get(path)
+    _cache_access("zones", cached is not None and cached[0] == stamp)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    _stat_read(path)
+    with open(path, "r", encoding="utf-8") as f:
+        zones = _freeze_zones(json.load(f))
+    _index_cache[path] = (stamp, zones)
+    return zones
+
+
+def _save_zones(table_name, zones, db_name=None):
+    path = _zones_file(table_name, db_name)
+    with _open_for_write(path, level=_durability(db_name)) as f:
+        json.dump(zones, f, ensure_ascii=False, default=_zones_json)
+    _index_cache[path] = (_file_stamp(path), _freeze_zones(zones))
+
+
+def _zones_json(obj):
+    if isinstance(obj, bytes):
+        return obj.hex()
+    if isinstance(obj, frozenset):
+        return sorted(obj)
+    raise TypeError(type(obj).__name__)
+
+
+def _freeze_zones(zones):
+    """Version gardée en cache : filtres en bytes, valeurs en frozenset."""
+    for part in zones.get("partitions", {}).values():
+        for seg in part["segments"]:
+            for info in seg["columns"].values():
+                if isinstance(info.get("bloom"), str):
+                    info["bloom"] = bytes.fromhex(info["bloom"])
+                if isinstance(info.get("values"), list):
+                    info["values"] = frozenset(info["values"])
+    return zones
+
+
+def _zone_key(value, col_type):
+    """Clé d'index normalisée pour l'égalité (5.0 et 5 ont le même empreinte)."""
+    key = _index_key(value, col_type)
+    if isinstance(key, float) and key.is_integer():
+        return int(key)
+    return key
+
+
+def _zone_key_func(col_type):
+    """_zone_key pour un type de colonne, avec un raccourci pour les valeurs déjà au bon type."""
+    if col_type == "str":
+        return lambda v: v if type(v) is str else _zone_key(v, col_type)
+    if col_type == "int":
+        return lambda v: v if type(v) is int else _zone_key(v, col_type)
+    if col_type in _TEMPORAL_TYPES:
+        return lambda v: v if type(v) is int else _temporal_to_int(v, col_type)
+    return lambda v: _zone_key(v, col_type)
+
+
+def _bloom_bits(key, nbits):
+    # les clés d'une colonne sont toutes du même genre (chaînes ou nombres) : str() suffit
+    data = str(key).encode("utf-8")
+    h1, h2 = zlib.crc32(data), zlib.adler32(data) | 1
+    return [(h1 + i * h2) % nbits for i in range(ZONE_MAPS["bloom_hashes"])]
+
+
+def _bloom_build(keys):
+    nbits = max(64, len(keys) * ZONE_MAPS["bloom_bits"])
+    nhashes = ZONE_MAPS["bloom_hashes"]
+    bits = bytearray((nbits + 7) // 8)
+    crc32, adler32 = zlib.crc32, zlib.adler32
+    for key in keys:
+        data = str(key).encode("utf-8")
+        h1, h2 = crc32(data), adler32(data) | 1
+        for i in range(nhashes):
+            b = (h1 + i * h2) % nbits
+            bits[b >> 3] |= 1 << (b & 7)
+    return bytes(bits)
+
+
+def _bloom_contains(bits, key):
+    nbits = len(bits) * 8
+    return all(bits[b >> 3] & (1 << (b & 7)) for b in _bloom_bits(key, nbits))
+
+
+def _build_zone_part(rows, types, path):
+    size = max(1, int(ZONE_MAPS["segment_rows"]))
+    cols = [(col, t) for col, t in types.items() if t not in ("list", "dict")]
+    segments = []
+    for start in range(0, len(rows), size):
+        block = rows[start:start + size]
+        seg = {"rows": len(block), "columns": {}}
+        for col, col_type in cols:
+            if col_type in _TEMPORAL_TYPES:
+                column = [_stored_value(row, col) for row in block]
+            else:
+                column = [row.get(col) for row in block]
+            nulls = column.count(None)
+            to_key = _zone_key_func(col_type)
+            keys = {to_key(v) for v in column if v is not None}
+            keys.discard(None)
+            info = {"nulls": nulls}
+            if keys:
+                info["min"], info["max"] = min(keys), max(keys)
+                if len(keys) <= ZONE_MAPS["exact_values"]:
+                    info["values"] = frozenset(keys)
+                elif col_type == "int" and info["max"] - info["min"] + 1 == len(keys):
+                    pass  # entiers contigus (ex. id) : min/max suffisent pour l'égalité
+                else:
+                    info["bloom"] = _bloom_build(keys)
+            seg["columns"][col] = info
+        segments.append(seg)
+    return {"stamp": _file_stamp(path), "segment_rows": size, "segments": segments}
+
+
+def _update_zone_maps(table_name, meta, pid, rows, types, db_name=None):
+    """Zone maps de la partition `pid` (après écriture du fichier), si activées pour la table."""
+    if not meta.get("zone_maps"):
+        return
+    zones = _load_zones(table_name, db_name)
+    path = _data_file(table_name, pid, db_name)
+    zones.setdefault("partitions", {})[_partition_key(pid)] = _build_zone_part(rows, types, path)
+    _save_zones(table_name, zones, db_name)
+
+
+def _forget_zone_column(table_name, col, new_name=None):
+    """alter_table : infos de la colonne supprimées (ou renommées), les fichiers ne changeant pas."""
+    zones = _load_zones(table_name)
+    if not zones.get("partitions"):
+        return
+    for part in zones["partitions"].values():
+        for seg in part["segments"]:
+            info = seg["columns"].pop(col, None)
+            if info is not None and new_name is not None:
+                seg["columns"][new_name] = info
+    _save_zones(table_name, zones)
+
+
+def _segment_may_match(node, seg, schema_map, params=()):
+    """False si aucune ligne du segment ne peut satisfaire `node` (True dans le doute)."""
+    kind = node[0]
+    if kind == "and":
+        return all(_segment_may_match(n, seg, schema_map, params) for n in node[1])
+    if kind == "or":
+        return any(_segment_may_match(n, seg, schema_map, params) for n in node[1])
+    if kind == "not" or kind == "like":
+        return True
+    info = seg["columns"].get(node[1])
+    if info is None:
+        return True
+    if kind == "isnull":
+        return info["nulls"] < seg["rows"] if node[2] else info["nulls"] > 0
+    col_type = schema_map.get(node[1], "str")
+
+    def key(value):
+        v = _index_operand(value, col_type, params)
+        if col_type in _TEMPORAL_TYPES and not isinstance(v, date):
+            return None
+        return _zone_key(v, col_type)
+
+    def may_equal(k):
+        if not (info["min"] <= k <= info["max"]):
+            return False
+        if "values" in info:
+            return k in info["values"]
+        if "bloom" in info:
+            return _bloom_contains(info["bloom"], k)
+        return True
+
+    try:
+        if kind == "cmp":
+            op, k = node[2], key(node[3])
+            if k is None or op == "!=":
+                return True
+            if "min" not in info:
+                return False  # que des NULL (ou valeurs non convertibles)
+            if op == "=":
+                return may_equal(k)
+            if op == ">":
+                return info["max"] > k
+            if op == ">=":
+                return info["max"] >= k
+            if op == "<":
+                return info["min"] < k
+            return info["min"] <= k
+        if kind == "between" and not node[4]:
+            lo, hi = key(node[2]), key(node[3])
+            if lo is None or hi is None:
+                return True
+            return "min" in info and lo <= info["max"] and hi >= info["min"]
+        if kind == "in" and not node[3]:
+            keys = [key(v) for v in node[2]]
+            if any(k is None for k in keys):
+                return True
+            return "min" in info and any(may_equal(k) for k in keys)
+    except TypeError:
+        return True
+    return True
+
+
+def _zone_positions(table_name, tree, meta, schema_map, pids, params=()):
+    """
+    {pid: positions des segments retenus | None (partition lue en entier)} d'après les zone maps,
+    ou None si elles ne servent pas (désactivées, périmées, ou trop peu de lignes écartées).
+    """
+    if not meta.get("zone_maps") or tree is None:
+        return None
+    parts = _load_zones(table_name).get("partitions", {})
+    selection = {}
+    total = kept = 0
+    for pid in pids:
+        part = parts.get(_partition_key(pid))
+        if part is None or part["stamp"] != _file_stamp(_data_file(table_name, pid)):
+            selection[pid] = None
+            continue
+        positions = []
+        start = 0
+        for seg in part["segments"]:
+            if _segment_may_match(tree, seg, schema_map, params):
+                positions.extend(range(start, start + seg["rows"]))
+            start += seg["rows"]
+        total += start
+        kept += len(positions)
+        selection[pid] = positions
+    if total == 0 or kept > total * ZONE_MAPS["max_ratio"]:
+        return None
+    return selection
+
+
+def _parse_partition_spec(spec_txt, schema):
+    """
+    'hash(col) N' ou 'range(col) b1,b2,...' -> dict de partitionnement.
+    Lève ValueError si la spécification est invalide.
+    """
+    m = re.match(r'^(?P<kind>hash|range)\s*\(\s*(?P<col>[^\s()]+)\s*\)\s*(?P<arg>.*)$', spec_txt.strip(), flags=re.I)
+    if not m:
+        raise ValueError("syntaxe: partition by hash(col) N | partition by range(col) b1,b2,...")
+    kind, col, arg = m.group("kind").lower(), m.group("col"), m.group("arg").strip()
+    types = _schema_types(schema)
+    if col not in types:
+        raise ValueError(f"colonne de partitionnement '{col}' absente du schéma")
+    if types[col] in ("list", "dict"):
+        raise ValueError("impossible de partitionner sur une colonne list/dict")
+    if kind == "hash":
+        try:
+            count = int(arg)
+        except ValueError:
+            raise ValueError("nombre de partitions attendu après hash(col)")
+        if count < 1:
+            raise ValueError("au moins une partition est requise")
+        return {"kind": "hash", "column": col, "count": count}
+    if not arg:
+        raise ValueError("bornes attendues après range(col), ex: range(age) 18,65")
+    bounds = [convert_input_to_type(b.strip(), types[col]) for b in arg.split(",") if b.strip()]
+    if any(b is None for b in bounds) or bounds != sorted(bounds) or len(set(bounds)) != len(bounds):
+        raise ValueError("les bornes doivent être distinctes et croissantes")
+    return {"kind": "range", "column": col, "bounds": [serializable_value(b) for b in bounds]}
+
+
+def _describe_partition(meta):
+    part = meta.get("partition")
+    if not part:
+        return None
+    if part["kind"] == "hash":
+        return f"hash({part['column']}) {part['count']}"
+    return f"range({part['column']}) " + ",".join(str(b) for b in part["bounds"])
+
+
+###   Base de donnée   ###
+
+# Creation de base de donnée
+def create_db(db_name):
+    global current_db
+    path = os.path.join(DB_ROOT, db_name)
+    if os.path.exists(path):
+        _fail(f"La base '{db_name}' existe déjà.")
+    else:
+        os.makedirs(path)
+        flush_writes()
+        checkpoint()
+        current_db = db_name
+        print(f"Base de données '{db_name}' créée avec succès.")
+
+# Utilise une base de donnée
+def use_db(db_name):
+    global current_db
+    path = os.path.join(DB_ROOT, db_name)
+    if os.path.exists(path) and os.path.isdir(path):
+        flush_writes()
+        checkpoint()
+        current_db = db_name
+        print(f"Vous utilisez maintenant la base '{db_name}'.")
+        state = _replica_state(db_name)
+        if state:
+            print(f"Réplique en lecture seule de '{state['primary']}' : les changements reçus sont appliqués en continu.")
+            _start_replica_thread()
+    else:
+        _fail(f"La base '{db_name}' n'existe pas.")
+
+# List les bases de données
+def list_dbs():
+    entries = os.listdir(DB_ROOT) if os.path.isdir(DB_ROOT) else []
+    dbs = [d for d in entries if os.path.isdir(os.path.join(DB_ROOT, d)) and not d.startswith(".")]
+    if not dbs:
+        print("Aucune base de données trouvée.")
+    else:
+        print("Bases de données disponibles :")
+        for db in dbs:
+            print(f" - {db}")
+
+# Suppression 
+def delete_db(db_name):
+    path = os.path.join(DB_ROOT, db_name)
+    if not os.path.exists(path):
+        _fail(f"La base '{db_name}' n'existe pas.")
+        return
+
+        # permission : suppression de la base
+    # on exige un admin/droit drop_db sur la base cible
+    if not require_permission(db_name, "drop_db"):
+        return
+
+
+    confirm = _ask(f"Voulez-vous vraiment supprimer '{db_name}' ? (oui/non) : ").strip().lower()
+    if confirm == "oui":
+        _discard_pending(db_name=db_name)
+        import shutil
+        shutil.rmtree(path)
+        _db_settings_cache.pop(db_name, None)
+        _catalog_cache.pop(db_name, None)
+        global current_db
+        if current_db == db_name:
+            # si utilisée
+            current_db = None  
+        print(f"Base de données '{db_name}' supprimée.")
+    else:
+        print("Suppression annulée.")
+
+
+###########################
+
+###     Partie concernant les tables   ###
+
+# Création de table (columns : schema déjà défini, cf. parse_schema_input — pas de prompt)
+def create_table(table_name, partition_spec=None, columns=None):
+    if not ensure_db_selected():
+        return
+
+    if not require_permission(current_db, "create_table"):
+        return
+
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+
+    if os.path.exists(schema_path):
+        _fail(f"⚠ La table '{table_name}' existe déjà.")
+        return
+
+    schema = list(columns or [])
+    auto_inc_present = False
+
+    if columns is None:
+        print("\n=== Création de la table ===")
+    while columns is None:
+        col_name = _ask("Nom de la colonne (ou vide pour terminer) : ").strip()
+        if not col_name:
+            break
+
+        # Type de donnée
+        col_type = _ask("Type (int, float, str, bool, date, datetime, list, dict) : ").strip().lower()
+        if col_type not in COLUMN_TYPES:
+            print("Type invalide !")
+            continue
+
+        not_null = _ask("NOT NULL ? (o/n) : ").strip().lower() == "o"
+        unique = _ask("UNIQUE ? (o/n) : ").strip().lower() == "o"
+        auto_increment = False
+        #primary_key = False
+        default_val = None
+
+        if col_type == "int":
+            auto_increment = _ask("AUTO_INCREMENT ? (o/n) : ").strip().lower() == "o"
+            if auto_increment:
+                if auto_inc_present:
+                    print("Une seule colonne AUTO_INCREMENT est autorisée par table.")
+                    auto_increment = False
+                else:
+                    auto_inc_present = True
+
+        # primary_key = input("PRIMARY KEY ? (o/n) : ").strip().lower() == "o"
+
+        default_input = _ask("Valeur par défaut (laisser vide si aucune) : ").strip()
+        if default_input:
+            try:
+                default_val = serializable_value(convert_input_to_type(default_input, col_type))
+            except Exception:
+                print("Valeur par défaut invalide — ignorée.")
+                default_val = None
+
+        schema.append({
+            "name": col_name,
+            "type": col_type,
+            "not_null": not_null,
+            "unique": unique,
+            "auto_increment": auto_increment,
+            "default": default_val,
+            #            "primary_key": primary_key
+        })
+
+    if not schema:
+        _fail("Aucun champ défini — table non créée.")
+        return
+
+    # partitionnement (optionnel)
+    meta = {}
+    if partition_spec:
+        try:
+            meta["partition"] = _parse_partition_spec(partition_spec, schema)
+        except ValueError as e:
+            _fail(f"Partitionnement invalide ({e}) — table non créée.")
+            return
+
+    # Sauvegarde du schéma
+    with _open_for_write(schema_path) as f:
+        json.dump(schema, f, indent=2)
+    if meta:
+        _save_table_meta(table_name, meta)
+    for pid in _partition_ids(meta):
+        _save_partition(table_name, meta, pid, [])
+
+    _journal_table(table_name)
+    print(f"Table '{table_name}' créée avec succès.")
+    if meta:
+        print(f"Partitionnement : {_describe_partition(meta)} ({len(_partition_ids(meta))} fichiers de données).")
+
+
+# Lister les tables
+def list_tables():
+    if not ensure_db_selected():
+        return
+
+        # permission : lecture/listage des tables
+    if not require_permission(current_db, "read"):
+        return
+
+
+    tables = _load_catalog()["tables"]
+    if not tables:
+        print("Aucune table trouvée dans la base sélectionnée.")
+    else:
+        print(f"Tables dans la base '{current_db}':")
+        for t in sorted(tables):
+            print(f" - {t}" + (" (vue matérialisée)" if tables[t]["kind"] == "view" else ""))
+
+
+# Suppression 
+def delete_table(table_name):
+    if not ensure_db_selected():
+        return
+
+        # permission : suppression de table
+    if not require_permission(current_db, "drop_table"):
+        return
+
+
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+    data_path = os.path.join(DB_ROOT, current_db, f"{table_name}_data.json")
+
+    if not os.path.exists(schema_path) and not os.path.exists(data_path) and not os.path.exists(_table_file(table_name, "meta.json")):
+        _fail(f"La table '{table_name}' n'existe pas dans la base '{current_db}'.")
+        return
+
+    views = _load_table_meta(table_name).get("views", [])
+    if views:
+        _fail(f"Impossible : vues matérialisées dépendantes {views} — supprimez-les d'abord.")
+        return
+
+    confirm = _ask(f"Supprimer la table '{table_name}' (schema + données) ? (oui/non) : ").strip().lower()
+    if confirm not in ("oui", "o", "yes", "y"):
+        print("Suppression annulée.")
+        return
+
+    _discard_pending(table_name)
+    meta = _load_table_meta(table_name)
+    try:
+        if os.path.exists(schema_path):
+            os.remove(schema_path)
+        for pid in _partition_ids(meta):
+            if os.path.exists(_data_file(table_name, pid)):
+                os.remove(_data_file(table_name, pid))
+        for kind in _INDEX_KINDS:
+            for col in _indexed_columns(meta, kind):
+                _drop_index_file(table_name, col, kind)
+        if os.path.exists(_zones_file(table_name)):
+            os.remove(_zones_file(table_name))
+        if os.path.exists(_table_file(table_name, "meta.json")):
+            os.remove(_table_file(table_name, "meta.json"))
+        if _is_view(table_name):
+            base = _load_view(table_name)["base"]
+            os.remove(_table_file(table_name, "view.json"))
+            base_meta = _load_table_meta(base)
+            if table_name in base_meta.get("views", []):
+                base_meta["views"].remove(table_name)
+                _save_table_meta(base, base_meta)
+                _journal_table(base)
+        _catalog_drop(table_name)
+        _journal_append("drop", table_name)
+        print(f"Table '{table_name}' supprimée de la base '{current_db}'.")
+    except Exception as e:
+        _fail("Erreur lors de la suppression :", e)
+
+
+# Description du table
+def describe_table(table_name):
+    if not ensure_db_selected():
+        return
+
+        # permission : lecture des métadonnées
+    if not require_permission(current_db, "read"):
+        return
+
+
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+
+    if not os.path.exists(schema_path):
+        _fail(f"La table '{table_name}' n'existe pas (pas de schema).")
+        return
+
+    try:
+        with open(schema_path, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+    except Exception as e:
+        _fail("Impossible de lire le schema :", e)
+        return
+
+    meta = _load_table_meta(table_name)
+    # nombre de lignes, taille : catalogue (les données ne sont pas lues)
+    entry = _load_catalog()["tables"].get(table_name)
+    if entry is None:
+        _catalog_update(table_name, meta)
+        entry = _load_catalog()["tables"][table_name]
+    nrows = entry["rows"]
+
+    # affichage
+    print(f"Description de la table '{table_name}' dans la base '{current_db}':")
+
+    # Colonnes avec types et contraintes
+    cols = []
+    if isinstance(schema, list):
+        for c in schema:
+            if isinstance(c, dict) and "name" in c and "type" in c:
+                pieces = [f"{c['name']}:{c['type']}"]
+                # contraintes optionnelles
+                if c.get("not_null"):
+                    pieces.append("NOT NULL")
+                if c.get("unique"):
+                    pieces.append("UNIQUE")
+                if c.get("auto_increment"):
+                    pieces.append("AUTO_INCREMENT")
+                if "default" in c and c.get("default") is not None:
+                    pieces.append(f"DEFAULT={c.get('default')}")
+                cols.append(" ".join(pieces))
+            elif isinstance(c, str):
+                # compatibilité: chaine seule -> type par défaut str
+                cols.append(f"{c}:str")
+    elif isinstance(schema, dict):
+        for k, v in schema.items():
+            cols.append(f"{k}:{v}")
+
+    print(f" - Colonnes ({len(cols)}):")
+    if cols:
+        for item in cols:
+            print(f"    - {item}")
+    else:
+        print("    (aucune)")
+
+    if meta.get("partition"):
+        print(f" - Partitionnement : {_describe_partition(meta)}")
+    if _schema_version(meta) > 1:
+        print(f" - Version du schéma : {_schema_version(meta)}")
+    if meta.get("indexes"):
+        print(f" - Index : {', '.join(meta['indexes'])}")
+    if meta.get("trigram_indexes"):
+        print(f" - Index trigrammes : {', '.join(meta['trigram_indexes'])}")
+    if meta.get("zone_maps"):
+        nsegs = sum(len(p["segments"]) for p in _load_zones(table_name).get("partitions", {}).values())
+        print(f" - Zone maps : {nsegs} segment(s)")
+    if meta.get("compression"):
+        print(f" - Compression : {_describe_compression(meta)}")
+    if meta.get("dictionaries"):
+        enc = ", ".join(f"{col} ({len(values)} valeurs)" for col, values in meta["dictionaries"].items())
+        print(f" - Encodage par dictionnaire : {enc}")
+
+    # nombre de lignes
+    print(f" - Nombre de lignes : {nrows}")
+    print(f" - Taille des données : {entry['size']} octets (modifiée le {entry['modified']})")
+
+    # Exemples 
+    #if nrows == 0:
+    #    print(" - Table vide — aucun exemple à afficher.")
+    #else:
+    #    print(" - Exemples (premières 5 lignes) :")
+    #    for i, row in enumerate(data[:5], start=1):
+    #        print(f"   {i}. {row}")
+
+
+# Modifier le table (supprimer/ajouter/modifier)
+def alter_table(table_name):
+    if not ensure_db_selected():
+        return
+
+        # permission : modifier le schéma de la table
+    if not require_permission(current_db, "alter_table"):
+        return
+    if _reject_view_write(table_name):
+        return
+
+
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+
+    if not os.path.exists(schema_path):
+        _fail(f"La table '{table_name}' n'existe pas.")
+        return
+
+    # Lire le schema (les données ne sont pas réécrites : changement enregistré dans le meta,
+    # appliqué à la lecture de chaque ligne ; 'rewrite <table>' pour l'appliquer physiquement)
+    with open(schema_path, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    flush_writes(table_name)  # écritures différées de l'ancien état d'abord
+    meta = _load_table_meta(table_name)
+    parts = None  # partitions chargées seulement si une réécriture est nécessaire
+    part_col = meta.get("partition", {}).get("column")
+
+    # Afficher le schéma actuel (nom, type, contraintes)
+    print("Schéma actuel :")
+    for col in schema:
+        desc = f"{col.get('name')} ({col.get('type')})"
+        flags = []
+        if col.get("not_null"): flags.append("NOT NULL")
+        if col.get("unique"): flags.append("UNIQUE")
+        if col.get("auto_increment"): flags.append("AUTO_INCREMENT")
+        if "default" in col and col.get("default") is not None: flags.append(f"DEFAULT={col.get('default')}")
+        if flags:
+            desc += " [" + ", ".join(flags) + "]"
+        print(f" - {desc}")
+
+    print("\nActions disponibles :")
+    print("1. Ajouter une colonne")
+    print("2. Supprimer une colonne")
+    print("3. Modifier le type d'une colonne")
+    print("4. Renommer une colonne")
+    choice = _ask("Choisir une action (1/2/3/4) : ").strip()
+
+    valid_types = {"str", "int", "float", "bool", "date", "datetime", "list", "dict"}
+
+    # Helper : vérifier s'il existe déjà une colonne auto_increment
+    def has_auto_increment(sch):
+        return any(c.get("auto_increment") for c in sch)
+
+    # ajout  
+    if choice == "1":
+        new_col_name = _ask("Nom de la nouvelle colonne : ").strip()
+        if any(c["name"] == new_col_name for c in schema):
+            _fail(f"Une colonne '{new_col_name}' existe déjà.")
+            return
+
+        new_col_type = _ask("Type de la colonne : ").strip().lower()
+        if new_col_type not in valid_types:
+            _fail(f"Type invalide '{new_col_type}', abandon.")
+            return
+
+        not_null = _ask("NOT NULL ? (o/n) : ").strip().lower() == "o"
+        unique = _ask("UNIQUE ? (o/n) : ").strip().lower() == "o"
+        auto_increment = False
+        default_val = None
+
+        if new_col_type == "int":
+            auto_increment = _ask("AUTO_INCREMENT ? (o/n) : ").strip().lower() == "o"
+            if auto_increment and has_auto_increment(schema):
+                print("⚠ Une colonne AUTO_INCREMENT existe déjà. AUTO_INCREMENT annulé pour cette colonne.")
+                auto_increment = False
+
+        default_input = _ask("Valeur par défaut (laisser vide si aucune) : ").strip()
+        if default_input != "":
+            try:
+                default_val = convert_input_to_type(default_input, new_col_type)
+                default_val = serializable_value(default_val)
+            except Exception:
+                print("Valeur par défaut invalide — ignorée.")
+                default_val = None
+
+        # ajouter au schema
+        new_col = {
+            "name": new_col_name,
+            "type": new_col_type,
+            "not_null": not_null,
+            "unique": unique,
+            "auto_increment": auto_increment,
+            "default": default_val
+        }
+        schema.append(new_col)
+        _record_schema_change(meta, {"op": "add", "column": new_col_name, "default": default_val})
+
+        # si il existe , ajouter le max (AUTO_INCREMENT : valeurs distinctes -> réécriture nécessaire)
+        if auto_increment:
+            parts = _load_partitions(table_name, meta)
+            data = [row for _, part_rows in parts for row in part_rows]
+
+            existing_vals = [row.get(new_col_name) for row in data if row.get(new_col_name) is not None]
+            max_val = 0
+
+            # recherche de max 
+            for v in existing_vals:
+                try:
+                    iv = int(v)
+                    if iv > max_val:
+                        max_val = iv
+                except Exception:
+                    pass
+
+            # assigner auto-incr
+            next_val = max_val + 1
+            for row in data:
+                if new_col_name not in row or row.get(new_col_name) is None:
+                    row[new_col_name] = serializable_value(next_val)
+                    next_val += 1
+
+        print(f"Colonne '{new_col_name}' ajoutée (type {new_col_type}).")
+
+    # Suppression 
+    elif choice == "2":
+        del_col_name = _ask("Nom de la colonne à supprimer : ").strip()
+        if not any(c["name"] == del_col_name for c in schema):
+            _fail(f"Colonne '{del_col_name}' introuvable.")
+            return
+        if del_col_name == part_col:
+            _fail(f"Impossible : '{del_col_name}' est la colonne de partitionnement.")
+            return
+        schema = [c for c in schema if c["name"] != del_col_name]
+        _record_schema_change(meta, {"op": "drop", "column": del_col_name})
+        meta.get("dictionaries", {}).pop(del_col_name, None)
+        _forget_zone_column(table_name, del_col_name)
+        for kind in _INDEX_KINDS:
+            if del_col_name in _indexed_columns(meta, kind):
+                meta[_INDEX_KINDS[kind][0]].remove(del_col_name)
+                _drop_index_file(table_name, del_col_name, kind)
+        print(f"Colonne '{del_col_name}' supprimée.")
+
+    # modification 
+    elif choice == "3":
+        col_name = _ask("Nom de la colonne à modifier : ").strip()
+        col = next((c for c in schema if c["name"] == col_name), None)
+        if not col:
+            _fail(f"Colonne '{col_name}' introuvable.")
+            return
+
+        new_type = _ask(f"Nouveau type pour '{col_name}' : ").strip().lower()
+        if new_type not in valid_types:
+            _fail(f"Type invalide '{new_type}', abandon.")
+            return
+
+        if col_name == part_col:
+            _fail(f"Impossible : '{col_name}' est la colonne de partitionnement.")
+            return
+
+        # si colonne auto_increment 
+        if col.get("auto_increment") and new_type != "int":
+            _fail("Impossible : colonne AUTO_INCREMENT doit rester de type int. Abandon.")
+            return
+
+        # conversion à la lecture (valeur non convertible -> None)
+        _record_schema_change(meta, {"op": "retype", "column": col_name, "type": new_type})
+        if new_type != "str":
+            meta.get("dictionaries", {}).pop(col_name, None)
+        _forget_zone_column(table_name, col_name)
+        if col_name in meta.get("indexes", []):
+            # clés de l'ancien type : index périmé jusqu'à la prochaine écriture
+            _save_index(table_name, col_name, {"column": col_name, "partitions": {}})
+            print(f"Index sur '{col_name}' à reconstruire ('rewrite {table_name}').")
+        if col_name in meta.get("trigram_indexes", []) and new_type != "str":
+            meta["trigram_indexes"].remove(col_name)
+            _drop_index_file(table_name, col_name, "trigram")
+            print(f"Index trigrammes sur '{col_name}' supprimé (colonne non str).")
+        if col.get("unique"):
+            print("Colonne UNIQUE : les doublons éventuels après conversion seront mis à None par 'rewrite'.")
+
+        # mise à jour 
+        col["type"] = new_type
+        print(f"Type de '{col_name}' modifié en '{new_type}'.")
+
+    # Renommer 
+    elif choice == "4":
+        old_name = _ask("Nom de la colonne à renommer : ").strip()
+        new_name = _ask("Nouveau nom : ").strip()
+        if not any(c["name"] == old_name for c in schema):
+            _fail(f"Colonne '{old_name}' introuvable.")
+            return
+        if any(c["name"] == new_name for c in schema):
+            _fail(f"Une colonne '{new_name}' existe déjà.")
+            return
+
+        # Modifier dans le schéma
+        for c in schema:
+            if c["name"] == old_name:
+                c["name"] = new_name
+                break
+
+        # Modifier dans les données (à la lecture)
+        _record_schema_change(meta, {"op": "rename", "from": old_name, "to": new_name})
+        if old_name in meta.get("dictionaries", {}):
+            meta["dictionaries"][new_name] = meta["dictionaries"].pop(old_name)
+        _forget_zone_column(table_name, old_name, new_name)
+        for kind, (meta_key, _) in _INDEX_KINDS.items():
+            if old_name in meta.get(meta_key, []):
+                meta[meta_key][meta[meta_key].index(old_name)] = new_name
+                index = _load_index(table_name, old_name, kind)
+                index["column"] = new_name
+                _save_index(table_name, new_name, index, kind)
+                _drop_index_file(table_name, old_name, kind)
+        if old_name == part_col:
+            meta["partition"]["column"] = new_name
+
+        print(f"Colonne '{old_name}' renommée en '{new_name}'.")
+
+    else:
+        _fail("Action invalide.")
+        return
+
+    # Sauvegarde
+    try:
+        with _open_for_write(schema_path) as f:
+            json.dump(schema, f, indent=4, ensure_ascii=False)
+        _save_table_meta(table_name, meta)
+        for pid, part_rows in parts or []:
+            _save_partition(table_name, meta, pid, part_rows)
+        _catalog_update(table_name, meta)
+    except Exception as e:
+        _fail("Erreur lors de la sauvegarde :", e)
+        return
+
+    _refresh_dependent_views(table_name)
+    _journal_table(table_name)
+    print("Fin de modification.")
+
+
+# Réécriture physique : applique les changements de schéma en attente à toutes les lignes
+def rewrite_table(table_name):
+    if not ensure_db_selected():
+        return
+    if not require_permission(current_db, "alter_table"):
+        return
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+    if not os.path.exists(schema_path):
+        _fail(f"La table '{table_name}' n'existe pas.")
+        return
+    with open(schema_path, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    flush_writes(table_name)  # écritures différées de l'ancien état d'abord
+    meta = _load_table_meta(table_name)
+
+    try:
+        parts = _load_partitions(table_name, meta)
+    except Exception as e:
+        _fail("Impossible de lire les données :", e)
+        return
+
+    # UNIQUE : doublons apparus après un changement de type -> None
+    for col in schema:
+        if not (isinstance(col, dict) and col.get("unique")):
+            continue
+        seen = set()
+        for _, part_rows in parts:
+            for row in part_rows:
+                v = row.get(col["name"])
+                if v is None:
+                    continue
+                key = json.dumps(v, sort_keys=True)
+                if key in seen:
+                    print(f"Valeur dupliquée '{v}' dans '{col['name']}' — mise à None.")
+                    row[col["name"]] = None
+                else:
+                    seen.add(key)
+
+    try:
+        for pid, part_rows in parts:
+            _save_partition(table_name, meta, pid, part_rows)
+    except Exception as e:
+        _fail("Erreur lors de la sauvegarde :", e)
+        return
+    _journal_table(table_name)
+    nrows = sum(len(part_rows) for _, part_rows in parts)
+    print(f"Table '{table_name}' réécrite au schéma v{_schema_version(meta)} ({nrows} ligne(s)).")
+
+
+# Statistiques par colonne ; active l'encodage par dictionnaire des colonnes str peu variées
+def analyze_table(table_name):
+    if not ensure_db_selected():
+        return
+    if not require_permission(current_db, "alter_table"):
+        return
+    if _reject_view_write(table_name):
+        return
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+    if not os.path.exists(schema_path):
+        _fail(f"La table '{table_name}' n'existe pas.")
+        return
+    with open(schema_path, "r", encoding="utf-8") as f:
+        schema_map = _schema_types(json.load(f))
+    flush_writes(table_name)  # écritures différées de l'ancien état d'abord
+    meta = _load_table_meta(table_name)
+
+    try:
+        parts = _load_partitions(table_name, meta)
+    except Exception as e:
+        _fail("Impossible de lire les données :", e)
+        return
+
+    nrows = sum(len(part_rows) for _, part_rows in parts)
+    stats = {}
+    old_dicts = meta.get("dictionaries", {})
+    dictionaries = {}
+    for col, col_type in schema_map.items():
+        distinct = set()
+        nulls = 0
+        for _, part_rows in parts:
+            for row in part_rows:
+                v = row.get(col)
+                if v is None:
+                    nulls += 1
+                else:
+                    distinct.add(json.dumps(v, sort_keys=True))
+        stats[col] = {"distinct": len(distinct), "nulls": nulls}
+        non_null = nrows - nulls
+        if (col_type == "str" and non_null > 0
+                and len(distinct) <= DICTIONARY_ENCODING["max_values"]
+                and len(distinct) <= non_null * DICTIONARY_ENCODING["max_ratio"]):
+            # dictionnaire existant conservé (codes stables), complété à l'écriture
+            dictionaries[col] = old_dicts.get(col, [])
+    meta["stats"] = {"rows": nrows, "columns": stats}
+    meta["zone_maps"] = True  # min/max + filtre de Bloom par segment, tenus à jour à chaque écriture
+    if dictionaries:
+        meta["dictionaries"] = dictionaries
+    else:
+        meta.pop("dictionaries", None)
+
+    try:
+        _save_table_meta(table_name, meta)
+        for pid, part_rows in parts:
+            _save_partition(table_name, meta, pid, part_rows)
+    except Exception as e:
+        _fail("Erreur lors de la sauvegarde :", e)
+        return
+    _journal_table(table_name)
+
+    print(f"Table '{table_name}' analysée ({nrows} ligne(s)) :")
+    for col, st in stats.items():
+        flag = " [dictionnaire]" if col in dictionaries else ""
+        print(f"    - {col} : {st['distinct']} valeur(s) distincte(s), {st['nulls']} nulle(s){flag}")
+    nsegs = sum(len(p["segments"]) for p in _load_zones(table_name).get("partitions", {}).values())
+    print(f"Zone maps : {nsegs} segment(s) de {ZONE_MAPS['segment_rows']} lignes au plus.")
+
+
+# Index sur une colonne : trié (=, <, <=, >, >=, between, in, like 'abc%')
+# ou trigrammes (kind="trigram", colonnes str : like '%abc%')
+def create_index(table_name, col_name, kind="sorted"):
+    if not ensure_db_selected():
+        return
+    if not require_permission(current_db, "alter_table"):
+        return
+    if _reject_view_write(table_name):
+        return
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+    if not os.path.exists(schema_path):
+        _fail(f"La table '{table_name}' n'existe pas.")
+        return
+    with open(schema_path, "r", encoding="utf-8") as f:
+        schema_map = _schema_types(json.load(f))
+    if col_name not in schema_map:
+        _fail(f"Colonne '{col_name}' inexistante.")
+        return
+    if schema_map[col_name] in ("list", "dict"):
+        _fail("Impossible d'indexer une colonne list/dict.")
+        return
+    if kind == "trigram" and schema_map[col_name] != "str":
+        _fail("Index trigrammes : colonne str uniquement.")
+        return
+    flush_writes(table_name)  # écritures différées de l'ancien état d'abord
+    meta = _load_table_meta(table_name)
+    if col_name in _indexed_columns(meta, kind):
+        _fail(f"Un index existe déjà sur '{col_name}'.")
+        return
+
+    try:
+        parts = _load_partitions(table_name, meta)
+    except Exception as e:
+        _fail("Impossible de lire les données :", e)
+        return
+    meta.setdefault(_INDEX_KINDS[kind][0], []).append(col_name)
+    try:
+        _save_table_meta(table_name, meta)
+        # réécriture au format compact (lecture ligne par ligne) + construction de l'index
+        for pid, part_rows in parts:
+            _save_partition(table_name, meta, pid, part_rows)
+    except Exception as e:
+        _fail("Erreur lors de la création de l'index :", e)
+        return
+    _journal_table(table_name)
+    nrows = sum(len(part_rows) for _, part_rows in parts)
+    label = "Index trigrammes" if kind == "trigram" else "Index"
+    print(f"{label} créé sur '{table_name}.{col_name}' ({nrows} ligne(s)).")
+
+
+def drop_index(table_name, col_name, kind="sorted"):
+    if not ensure_db_selected():
+        return
+    if not require_permission(current_db, "alter_table"):
+        return
+    flush_writes(table_name)  # écritures différées de l'ancien état d'abord
+    meta = _load_table_meta(table_name)
+    if col_name not in _indexed_columns(meta, kind):
+        _fail(f"Aucun index sur '{table_name}.{col_name}'.")
+        return
+    meta[_INDEX_KINDS[kind][0]].remove(col_name)
+    _save_table_meta(table_name, meta)
+    _drop_index_file(table_name, col_name, kind)
+    _catalog_update(table_name, meta)
+    _journal_table(table_name)
+    print(f"Index sur '{table_name}.{col_name}' supprimé.")
+
+
+# Compression des fichiers de données de la table (codec zlib / lzma par blocs, ou none)
+def compress_table(table_name, codec, level=None):
+    if not ensure_db_selected():
+        return
+    if not require_permission(current_db, "alter_table"):
+        return
+    if _reject_view_write(table_name):
+        return
+    if not os.path.exists(_table_file(table_name, "schema.json")):
+        _fail(f"La table '{table_name}' n'existe pas.")
+        return
+    codec = codec.lower()
+    if codec != "none" and codec not in COMPRESSION_CODECS:
+        _fail(f"Codec inconnu '{codec}' (zlib, lzma ou none).")
+        return
+    try:
+        level = 6 if level is None else int(level)
+        if not 0 <= level <= 9:
+            raise ValueError
+    except ValueError:
+        _fail("Niveau de compression entre 0 et 9 attendu.")
+        return
+    flush_writes(table_name)  # écritures différées de l'ancien état d'abord
+    meta = _load_table_meta(table_name)
+
+    try:
+        parts = _load_partitions(table_name, meta)
+    except Exception as e:
+        _fail("Impossible de lire les données :", e)
+        return
+    before = sum(os.path.getsize(_data_file(table_name, pid)) for pid, _ in parts if os.path.exists(_data_file(table_name, pid)))
+    if codec == "none":
+        meta.pop("compression", None)
+    else:
+        meta["compression"] = {"codec": codec, "level": level}
+    try:
+        _save_table_meta(table_name, meta)
+        for pid, part_rows in parts:
+            _save_partition(table_name, meta, pid, part_rows)
+    except Exception as e:
+        _fail("Erreur lors de la réécriture :", e)
+        return
+    flush_writes(table_name)  # tailles mesurées sur les fichiers écrits
+    _journal_table(table_name)
+    after = sum(os.path.getsize(_data_file(table_name, pid)) for pid, _ in parts)
+    print(f"Table '{table_name}' : {before} -> {after} octets ({_describe_compression(meta)}).")
+
+
+def _describe_compression(meta):
+    comp = meta.get("compression")
+    return f"{comp['codec']}, niveau {comp['level']}" if comp else "non compressée"
+
+
+###   Pour gestion de données 
+
+# Vérification de l'unicité 
+def is_unique_violation(col_name, candidate_serialized, data):
+        for row in data:
+            existing = row.get(col_name, None)
+            if existing is None and candidate_serialized is None:
+                return True
+            if existing == candidate_serialized:
+                return True
+        return False
+
+# Insertion dans une table 
+def insert_data(table_name):
+    if not ensure_db_selected():
+        return
+
+        # permission : écriture/insertion dans la table
+    if not require_permission(current_db, "write"):
+        return
+    if _reject_view_write(table_name):
+        return
+
+
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+
+    if not os.path.exists(schema_path):
+        _fail(f"La table '{table_name}' n'existe pas.")
+        return
+
+    # Charger le schéma
+    try:
+        with open(schema_path, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+    except Exception as e:
+        _fail("Impossible de lire le schema :", e)
+        return
+
+    # Charger les données (toutes les partitions : unicité et AUTO_INCREMENT) ; lignes existantes non modifiées
+    meta = _load_table_meta(table_name)
+    try:
+        parts = _load_partitions(table_name, meta, shared=True)
+    except Exception:
+        parts = [(pid, []) for pid in _partition_ids(meta)]
+    data = [row for _, part_rows in parts for row in part_rows]
+
+    schema_map = {}
+    for col in schema:
+        if isinstance(col, dict):
+            schema_map[col["name"]] = col
+        else:
+            schema_map[str(col)] = {"name": str(col), "type": "str"}
+
+    
+
+    new_record = {}
+
+    # auto incrémenter: get max 
+    auto_inc_cols = [c["name"] for c in schema if isinstance(c, dict) and c.get("auto_increment")]
+    auto_inc_next = {}
+    for col_name in auto_inc_cols:
         max_val = 0
         for row in data:
             v = row.get(col_name)
@@ -767,272 +3804,1929 @@ def insert_data(table_name):
                 continue
         auto_inc_next[col_name] = max_val + 1
 
-    # Itérer sur colonnes selon l'ordre du schema
-    for col in schema:
-        # compatibilité
-        if isinstance(col, str):
-            col_name = col
-            col_type = "str"
-            col_constraints = {}
+    # Itérer sur colonnes selon l'ordre du schema
+    for col in schema:
+        # compatibilité
+        if isinstance(col, str):
+            col_name = col
+            col_type = "str"
+            col_constraints = {}
+        else:
+            col_name = col.get("name")
+            col_type = col.get("type", "str")
+            col_constraints = col  
+
+        # Si auto_increment -> assigner automatiquement (pas de prompt)
+        if col_constraints.get("auto_increment"):
+            val = auto_inc_next.get(col_name, 1)
+            new_record[col_name] = serializable_value(val)
+            auto_inc_next[col_name] = val + 1
+            print(f"{col_name} (AUTO_INCREMENT) = {val}")
+            continue
+
+        # boucle variable 
+        while True:
+            default_display = ""
+            if "default" in col_constraints and col_constraints.get("default") is not None:
+                default_display = f" [default: {col_constraints.get('default')}]"
+            raw = _ask(f"{col_name} ({col_type}){default_display} = ").strip()
+
+            # Si vide et default fourni -> utiliser default
+            if raw == "" and "default" in col_constraints and col_constraints.get("default") is not None:
+                try:
+                    default_raw = col_constraints.get("default")
+                    converted_default = default_raw
+                    if not isinstance(default_raw, (int, float, bool, list, dict)):
+                        converted_default = convert_input_to_type(str(default_raw), col_type)
+                    new_val = serializable_value(converted_default)
+                except Exception:
+                    new_val = default_raw
+                candidate_serialized = new_val
+
+            elif raw == "":
+                candidate_serialized = None
+            else:
+                try:
+                    conv = convert_input_to_type(raw, col_type)
+                    candidate_serialized = serializable_value(conv)
+                except ValueError as ve:
+                    print(f"Valeur invalide pour {col_name} (type {col_type}) : {ve}")
+                    print("Réessaye (ou laisse vide pour NULL).")
+                    continue
+
+            # Vérifier NOT NULL
+            if col_constraints.get("not_null") and (candidate_serialized is None or candidate_serialized == ""):
+                print(f"Violation: colonne '{col_name}' est NOT NULL — une valeur est requise.")
+                if "default" in col_constraints and col_constraints.get("default") is not None:
+                    use_def = _ask("Utiliser la valeur DEFAULT ? (o/n) : ").strip().lower()
+                    if use_def == "o":
+                        try:
+                            default_raw = col_constraints.get("default")
+                            converted_default = default_raw
+                            if not isinstance(default_raw, (int, float, bool, list, dict)):
+                                converted_default = convert_input_to_type(str(default_raw), col_type)
+                            candidate_serialized = serializable_value(converted_default)
+                        except Exception:
+                            candidate_serialized = None
+                        if candidate_serialized is None:
+                            print("DEFAULT non applicable, réessaye.")
+                            continue
+                    else:
+                        continue
+                else:
+                    continue
+
+            # Vérifier UNIQUE
+            if col_constraints.get("unique") and candidate_serialized is not None:
+                if is_unique_violation(col_name, candidate_serialized, data):
+                    print(f"Violation UNIQUE: la valeur '{candidate_serialized}' existe déjà dans '{col_name}'.")
+                    retry = _ask("Entrer une autre valeur ? (o/n) : ").strip().lower()
+                    if retry == "o":
+                        continue
+                    else:
+                        _fail("Insertion annulée.")
+                        return  
+            new_record[col_name] = candidate_serialized
+            break
+
+    # enregistrement : seule la partition concernée est réécrite
+    pid = _partition_of_row(meta, _schema_types(schema), new_record)
+    part_rows = list(dict(parts).get(pid, []))
+    part_rows.append(new_record)
+
+    # Sauvegarder
+    try:
+        _save_partition(table_name, meta, pid, part_rows)
+        print("Donnée insérée avec succès.")
+    except Exception as e:
+        _fail("Erreur lors de la sauvegarde :", e)
+        return
+    _notify_row_changes(table_name, [], [new_record])
+
+
+def _record_value(col, raw):
+    """
+    Valeur stockée d'une colonne pour une insertion sans prompt (mêmes règles que insert_data) :
+    chaîne convertie selon le type, vide / None -> DEFAULT puis NULL. ValueError si invalide.
+    """
+    col_type = col.get("type", "str")
+    if raw is None or raw == "":
+        default_raw = col.get("default")
+        if default_raw is not None:
+            if isinstance(default_raw, (int, float, bool, list, dict)):
+                return default_raw
+            return serializable_value(convert_input_to_type(str(default_raw), col_type))
+        value = None if raw is None else serializable_value(convert_input_to_type("", col_type))
+    elif isinstance(raw, str):
+        value = serializable_value(convert_input_to_type(raw, col_type))
+    else:
+        value = serializable_value(raw)
+    if col.get("not_null") and (value is None or value == ""):
+        raise ValueError(f"colonne '{col['name']}' NOT NULL — une valeur est requise")
+    return value
+
+
+# Insertion en masse sans prompt : API (benchmarks, scripts)
+def insert_rows(table_name, records):
+    """
+    Insère une liste d'enregistrements {colonne: valeur} (chaînes converties selon le schéma,
+    colonnes absentes -> DEFAULT / NULL, AUTO_INCREMENT attribué). Tout ou rien : au premier
+    enregistrement invalide rien n'est écrit. Chaque partition touchée est réécrite une fois.
+    Retourne le nombre de lignes insérées, None en cas d'erreur.
+    """
+    if not ensure_db_selected():
+        return
+    if not require_permission(current_db, "write"):
+        return
+    if _reject_view_write(table_name):
+        return
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+    if not os.path.exists(schema_path):
+        _fail(f"La table '{table_name}' n'existe pas.")
+        return
+    try:
+        with open(schema_path, "r", encoding="utf-8") as f:
+            schema = [c if isinstance(c, dict) else {"name": str(c), "type": "str"} for c in json.load(f)]
+    except Exception as e:
+        _fail("Impossible de lire le schema :", e)
+        return
+
+    meta = _load_table_meta(table_name)
+    try:
+        parts = _load_partitions(table_name, meta, shared=True)
+    except Exception as e:
+        _fail("Impossible de lire les données :", e)
+        return
+    data = [row for _, part_rows in parts for row in part_rows]
+
+    # AUTO_INCREMENT : suite du max existant ; UNIQUE : valeurs déjà présentes
+    auto_inc_next = {}
+    for col in schema:
+        if col.get("auto_increment"):
+            max_val = 0
+            for row in data:
+                try:
+                    max_val = max(max_val, int(row.get(col["name"])))
+                except (TypeError, ValueError):
+                    continue
+            auto_inc_next[col["name"]] = max_val + 1
+    seen = {}
+    for col in schema:
+        if col.get("unique"):
+            try:
+                seen[col["name"]] = {row.get(col["name"]) for row in data}
+            except TypeError:
+                seen[col["name"]] = None  # list / dict : vérification ligne à ligne
+
+    new_records = []
+    for n, values in enumerate(records, start=1):
+        record = {}
+        try:
+            for col in schema:
+                name = col["name"]
+                if col.get("auto_increment"):
+                    record[name] = auto_inc_next[name]
+                    auto_inc_next[name] += 1
+                    continue
+                value = _record_value(col, values.get(name))
+                if col.get("unique") and value is not None:
+                    known = seen[name]
+                    if known is None:
+                        taken = is_unique_violation(name, value, data + new_records)
+                    else:
+                        taken = value in known
+                        known.add(value)
+                    if taken:
+                        raise ValueError(f"violation UNIQUE, '{value}' existe déjà dans '{name}'")
+                record[name] = value
+        except (ValueError, TypeError) as e:
+            _fail(f"Enregistrement {n} invalide ({e}) — aucune ligne insérée.")
+            return
+        new_records.append(record)
+
+    # une réécriture par partition touchée
+    types = _schema_types(schema)
+    current = dict(parts)
+    touched = {}
+    for record in new_records:
+        pid = _partition_of_row(meta, types, record)
+        if pid not in touched:
+            touched[pid] = list(current.get(pid, []))
+        touched[pid].append(record)
+    try:
+        for pid, part_rows in touched.items():
+            _save_partition(table_name, meta, pid, part_rows)
+    except Exception as e:
+        _fail("Erreur lors de la sauvegarde :", e)
+        return
+    _notify_row_changes(table_name, [], new_records)
+    print(f"{len(new_records)} ligne(s) insérée(s) dans '{table_name}'.")
+    return len(new_records)
+
+
+
+# Affichage de tables 
+def select_table(table_name, columns=None):
+    if not ensure_db_selected():
+        return
+
+        # permission : lecture des données
+    if not require_permission(current_db, "read"):
+        return
+
+
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+
+    if not os.path.exists(schema_path):
+        _fail(f"La table '{table_name}' n'existe pas.")
+        return
+
+    # charge les données 
+    with open(schema_path, "r", encoding="utf-8") as f:
+        schema = json.load(f)
+    data = _load_rows(table_name)
+
+    all_columns = [col["name"] for col in schema]
+
+    # Si aucune
+    if not columns or columns == ["*"]:
+        columns = all_columns
+    else:
+        # Vérifier que les colonnes existent
+        for col in columns:
+            if col not in all_columns:
+                _fail(f"Colonne '{col}' inexistante dans la table '{table_name}'.")
+                return
+
+    # Affichage formaté
+    print(f"\nRésultat de select {', '.join(columns)} from {table_name} :")
+    if not data:
+        print("(aucune ligne)")
+        return
+
+    _stat_add("rows_scanned", len(data))
+    _stat_add("rows_matched", len(data))
+    _stat_set("access_path", "scan complet")
+    with _timed_stat("format_s"):
+        # Largeurs automatiques pour un affichage tabulaire
+        col_widths = {col: max(len(col), max((len(str(row.get(col, ''))) for row in data), default=0)) for col in columns}
+
+        # Ligne d’en-tête
+        header = " | ".join(col.ljust(col_widths[col]) for col in columns)
+        print("-" * len(header))
+        print(header)
+        print("-" * len(header))
+
+        # Lignes de données
+        for row in data:
+            line = " | ".join(str(row.get(col, "")).ljust(col_widths[col]) for col in columns)
+            print(line)
+
+        print("-" * len(header))
+        print(f"({len(data)} ligne{'s' if len(data) > 1 else ''})\n")
+
+    
+# recherche
+def search_table(table_name, columns=None, where_clause=None, group_by=None):
+    # analyse de conditions 
+    tree = None
+    if where_clause and where_clause.strip():
+        try:
+            with _timed_stat("parse_s"):
+                tree = _parse_where_clause(where_clause.strip())
+        except ValueError as e:
+            _fail(f"Impossible de parser la clause WHERE ({e}).")
+            print("Syntaxe: col op valeur, and/or/not, (...), col in (v1, v2), col between a and b, col is [not] null")
+            return
+    return _run_search(table_name, columns, tree, group_by=group_by)
+
+
+def _run_search(table_name, columns, tree, plan=None, params=(), group_by=None):
+    """
+    Exécute une recherche déjà analysée (tree = arbre WHERE ou None) et affiche le résultat.
+    Si `plan` (requête préparée) est fourni, le prédicat compilé y est mis en cache
+    et seuls les paramètres sont re-liés. Retourne la liste des lignes trouvées.
+    """
+    result = _search_rows(table_name, columns, tree, plan, params, group_by)
+    if result is None:
+        return
+    columns, matched = result
+
+    # affichage tabulaire (comme select_table)
+    # print(f"\nRésultat de search {','.join(columns)} FROM {table_name}" + (f" WHERE {where_clause}" if where_clause else "") + " :")
+    if not matched:
+        print("(aucune ligne)")
+        return matched
+
+    with _timed_stat("format_s"):
+        col_widths = {col: max(len(col), max((len(str(r.get(col, ""))) for r in matched), default=0)) for col in columns}
+        header = " | ".join(col.ljust(col_widths[col]) for col in columns)
+        print("-" * len(header))
+        print(header)
+        print("-" * len(header))
+        for row in matched:
+            line = " | ".join(str(row.get(col, "")).ljust(col_widths[col]) for col in columns)
+            print(line)
+        print("-" * len(header))
+        print(f"({len(matched)} ligne{'s' if len(matched) > 1 else ''})\n")
+    return matched
+
+
+# ---------- Export : export <table | search ...> to <fichier> [format jsonl|csv] ----------
+EXPORT_FORMATS = ("jsonl", "csv")
+EXPORT_BUFFER = 1 << 20  # octets du tampon d'écriture
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def export_rows(source, path, fmt=None):
+    """
+    Écrit le résultat de `source` ('<table>' ou 'search <cols> from <table> [where ...] [group by ...]')
+    dans `path`, au fil du scan : pas de liste intermédiaire ni de calcul de largeurs.
+    Format jsonl (une ligne JSON par enregistrement) ou csv (en-tête + valeurs), déduit de
+    l'extension à défaut. Retourne le nombre de lignes écrites.
+    """
+    fmt = (fmt or os.path.splitext(path)[1].lstrip(".") or "jsonl").lower()
+    if fmt not in EXPORT_FORMATS:
+        _fail(f"Format d'export inconnu '{fmt}' ({', '.join(EXPORT_FORMATS)}).")
+        return
+    words = source.split(None, 1)
+    if words and words[0].lower() == "search":
+        parsed = _parse_search_command(words[1] if len(words) > 1 else "")
+        if not parsed:
+            _fail("Syntaxe: export search <col1,col2|*> from <table> [where <cond>] [group by <cols>] to <fichier> [format jsonl|csv]")
+            return
+        columns, table_name, where_txt, group_by = parsed
+    elif len(words) == 1 and re.match(r'^[A-Za-z0-9_]+$', source):
+        columns, table_name, where_txt, group_by = ["*"], source, "", []
+    else:
+        _fail("Syntaxe: export <table> | export search ... to <fichier> [format jsonl|csv]")
+        return
+    tree = None
+    if where_txt:
+        try:
+            with _timed_stat("parse_s"):
+                tree = _parse_where_clause(where_txt)
+        except ValueError as e:
+            _fail(f"Impossible de parser la clause WHERE ({e}).")
+            return
+    result = _search_rows(table_name, columns, tree, group_by=group_by, stream=True)
+    if result is None:
+        return
+    columns, rows = result
+
+    count = 0
+    try:
+        with _open_for_write(path, buffering=EXPORT_BUFFER) as f:
+            if fmt == "csv":
+                import csv
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for row in rows:
+                    writer.writerow([_csv_value(row.get(col)) for col in columns])
+                    count += 1
+            else:
+                encode = json.JSONEncoder(ensure_ascii=False).encode
+                for row in rows:
+                    f.write(encode(row))
+                    f.write("\n")
+                    count += 1
+    except OSError as e:
+        _fail(f"Impossible d'écrire '{path}' : {e}")
+        return
+    except Exception as e:
+        _fail("Impossible de lire les données :", e)
+        return
+    print(f"{count} ligne(s) exportée(s) vers '{path}' ({fmt}).")
+    return count
+
+
+def _search_rows(table_name, columns, tree, plan=None, params=(), group_by=None, stream=False):
+    """
+    Partie calcul de la recherche (sans affichage).
+    Retourne (colonnes du résultat, lignes) ou None en cas d'erreur (message déjà affiché).
+    stream=True (hors agrégats) : les lignes sont un itérateur, une partition lue à la fois.
+    """
+    if not ensure_db_selected():
+        return
+
+        # permission : lecture des données (filter/search)
+    if not require_permission(current_db, "read"):
+        return
+
+
+    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
+
+    if not os.path.exists(schema_path):
+        _fail(f"La table '{table_name}' n'existe pas.")
+        return
+
+    try:
+        with open(schema_path, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+    except Exception as e:
+        _fail("Impossible de lire le schema :", e)
+        return
+
+    if not isinstance(schema, list):
+        _fail("Schema invalide.")
+        return
+
+    schema_cols = [c["name"] if isinstance(c, dict) else str(c) for c in schema]
+    
+    schema_map = {}
+    for c in schema:
+        if isinstance(c, dict):
+            schema_map[c["name"]] = c.get("type", "str")
         else:
-            col_name = col.get("name")
-            col_type = col.get("type", "str")
-            col_constraints = col  
+            schema_map[str(c)] = "str"
 
-        # Si auto_increment -> assigner automatiquement (pas de prompt)
-        if col_constraints.get("auto_increment"):
-            val = auto_inc_next.get(col_name, 1)
-            new_record[col_name] = serializable_value(val)
-            auto_inc_next[col_name] = val + 1
-            print(f"{col_name} (AUTO_INCREMENT) = {val}")
+    # colonnes à afficher (colonnes simples et/ou agrégats)
+    all_columns = schema_cols
+    if not columns or columns == ["*"]:
+        columns = all_columns
+    try:
+        items = _parse_select_items(columns, schema_map, group_by)
+    except ValueError as e:
+        _fail(f"{e} (table '{table_name}').")
+        return
+    aggregated = _is_aggregate_query(items, group_by)
+    scan_columns = _needed_columns(items, group_by) if aggregated else columns
+
+    meta = _load_table_meta(table_name)
+    encodings = _column_encodings(meta, schema_map)
+
+    # compilation (réutilisée par une requête préparée tant que le schéma et les dictionnaires ne changent pas)
+    cache_key = (current_db, tuple(schema_map.items()), tuple((c, len(e)) for c, e in encodings.items()))
+    compiled = plan["compiled"].get(cache_key) if plan else None
+    if compiled is None:
+        binders = []
+        try:
+            predicate = _compile_where(tree, schema_map, binders, encodings) if tree else (lambda row: True)
+        except ValueError as e:
+            _fail(f"Clause WHERE invalide ({e}).")
+            return
+        compiled = (predicate, binders)
+        if plan:
+            plan["compiled"][cache_key] = compiled
+    predicate, binders = compiled
+    try:
+        for bind in binders:
+            bind(params)
+    except ValueError as e:
+        _fail(f"Paramètre invalide ({e}).")
+        return
+
+    # élagage : seules les partitions compatibles avec la clause WHERE sont lues
+    pids = _prune_partitions(tree, meta, schema_map, params)
+
+    # filtrage des lignes (en parallèle au-delà du seuil configuré)
+    group_key = None
+    try:
+        # index, sinon zone maps : seules les lignes candidates sont lues (le prédicat complet est réappliqué)
+        # (écritures en attente : fichiers, index et zone maps pas encore à jour, lecture en mémoire)
+        data = None
+        pending = _has_pending_writes(table_name)
+        used = []
+        selection = None if pending else _index_positions(table_name, tree, meta, schema_map, pids, params, used)
+        access = ", ".join(used) if selection is not None else None
+        if selection is None and not pending:
+            selection = _zone_positions(table_name, tree, meta, schema_map, pids, params)
+            access = "zone maps" if selection is not None else None
+        if selection is not None:
+            data = _read_selected_rows(table_name, meta, pids, selection)
+        if stream and not aggregated:
+            access = access if data is not None else "mémoire (écritures en attente)" if pending else "scan complet (flux)"
+            nparts = len(_partition_ids(meta))
+            _stat_set("access_path", access + (f", {len(pids)}/{nparts} partitions" if len(pids) < nparts else ""))
+            return columns, _iter_matches(table_name, meta, pids, data, predicate, columns)
+        counts = _scan_row_counts(table_name, pids)
+        parallel = data is None and not pending and _use_parallel_scan(sum(counts))
+        if data is None and not parallel:
+            data = [row for _, part_rows in _load_partitions(table_name, meta, pids, shared=True) for row in part_rows]
+        chunked = not parallel and _use_chunked_scan(len(data))
+        if parallel or chunked:
+            access = "scan parallèle" if access is None else access + ", scan parallèle"
+        elif access is None:
+            access = "mémoire (écritures en attente)" if pending else "scan complet"
+        nparts = len(_partition_ids(meta))
+        _stat_set("access_path", access + (f", {len(pids)}/{nparts} partitions" if len(pids) < nparts else ""))
+        if parallel:
+            # segments d'environ chunk_size lignes : chaque processus lit lui-même sa plage du fichier
+            size = max(1, int(PARALLEL_SCAN["chunk_size"]))
+            tasks = []
+            for pid, n in zip(pids, counts):
+                path = _data_file(table_name, pid)
+                tasks.extend((path, segment) for segment in _data_segments(path, -(-n // size)))
+            matched = _scan_rows(tasks, scan_columns, predicate, tree, schema_map, params, chunked=False, meta=meta)
+        else:
+            if aggregated and not chunked:
+                # pas de projection : les groupes sont calculés sur les lignes stockées (codes)
+                with _timed_stat("filter_s"):
+                    matched = [row for row in data if predicate(row)]
+                if any(g in encodings for g in group_by or []):
+                    group_key = _encoded_group_key(group_by, schema_map, encodings)
+            else:
+                matched = _scan_rows(data, scan_columns, predicate, tree, schema_map, params)
+    except Exception as e:
+        _fail("Impossible de lire les données :", e)
+        return
+    _stat_add("rows_scanned", len(data) if data is not None else sum(counts))
+    _stat_add("rows_matched", len(matched))
+
+    if aggregated:
+        groups = _aggregate_rows(matched, items, group_by or [], schema_map, group_key)
+        return [it["name"] for it in items], _groups_to_rows(groups, items, group_by or [])
+    return columns, matched
+
+
+def _iter_matches(table_name, meta, pids, rows, predicate, columns):
+    """Lignes retenues, projetées, dans l'ordre (rows : candidates déjà lues, sinon partitions pids)."""
+    if rows is not None:
+        parts = [rows]
+    else:
+        parts = (part_rows for _, part_rows in _iter_partitions(table_name, meta, pids, shared=True))
+    for part_rows in parts:
+        matched = 0
+        for row in part_rows:
+            if predicate(row):
+                matched += 1
+                yield {col: row.get(col) for col in columns}
+        _stat_add("rows_scanned", len(part_rows))
+        _stat_add("rows_matched", matched)
+
+
+# ---------- Agrégats : count(*), count(col), sum, avg, min, max [group by col1,col2] ----------
+_AGG_FUNCS = ("count", "sum", "avg", "min", "max")
+
+
+def _parse_select_items(columns, schema_map, group_by=None):
+    """
+    ["nom", "count(*)", "avg(age)"] -> [{"name", "kind": "col"|"agg", "func", "col"}].
+    Lève ValueError si une colonne est inconnue ou si la requête agrégée est incohérente.
+    """
+    items = []
+    for txt in columns:
+        m = re.match(r'^(?P<func>[A-Za-z]+)\((?P<arg>[^()]*)\)$', txt.strip())
+        if txt in schema_map:
+            # colonne existante, même si son nom ressemble à un agrégat (colonnes d'une vue agrégée)
+            items.append({"name": txt, "kind": "col", "col": txt})
+        elif m and m.group("func").lower() in _AGG_FUNCS:
+            func, arg = m.group("func").lower(), m.group("arg").strip()
+            if arg == "*" and func != "count":
+                raise ValueError(f"{func}(*) invalide")
+            if arg != "*" and arg not in schema_map:
+                raise ValueError(f"Colonne '{arg}' inexistante")
+            if func in ("sum", "avg") and arg != "*" and schema_map[arg] not in ("int", "float", "bool"):
+                raise ValueError(f"{func}() demande une colonne numérique ('{arg}' est {schema_map[arg]})")
+            items.append({"name": f"{func}({arg})", "kind": "agg", "func": func, "col": None if arg == "*" else arg})
+        else:
+            raise ValueError(f"Colonne '{txt}' inexistante")
+    for g in group_by or []:
+        if g not in schema_map:
+            raise ValueError(f"Colonne '{g}' inexistante (group by)")
+    if _is_aggregate_query(items, group_by):
+        for it in items:
+            if it["kind"] == "col" and it["col"] not in (group_by or []):
+                raise ValueError(f"'{it['col']}' doit figurer dans group by")
+    return items
+
+
+def _is_aggregate_query(items, group_by):
+    return bool(group_by) or any(it["kind"] == "agg" for it in items)
+
+
+def _needed_columns(items, group_by):
+    cols = list(group_by or [])
+    for it in items:
+        if it["col"] and it["col"] not in cols:
+            cols.append(it["col"])
+    return cols
+
+
+def _group_key(row, group_by, schema_map):
+    return json.dumps([serializable_value(_coerce_value(row.get(g), schema_map[g])) for g in group_by], ensure_ascii=False)
+
+
+def _new_group(row, items, group_by, schema_map):
+    return {
+        "key": [serializable_value(_coerce_value(row.get(g), schema_map[g])) for g in group_by],
+        "n": 0,
+        "acc": [{"n": 0, "sum": 0, "min": None, "max": None} if it["kind"] == "agg" else None for it in items],
+    }
+
+
+def _group_add(state, row, items, schema_map):
+    state["n"] += 1
+    for it, acc in zip(items, state["acc"]):
+        if acc is None or it["col"] is None:
+            continue
+        v = _coerce_value(row.get(it["col"]), schema_map[it["col"]])
+        if v is None:
+            continue
+        acc["n"] += 1
+        if it["func"] in ("sum", "avg"):
+            acc["sum"] += v
+        elif it["func"] in ("min", "max"):
+            try:
+                cur_min = _coerce_value(acc["min"], schema_map[it["col"]])
+                cur_max = _coerce_value(acc["max"], schema_map[it["col"]])
+                if cur_min is None or v < cur_min:
+                    acc["min"] = serializable_value(v)
+                if cur_max is None or v > cur_max:
+                    acc["max"] = serializable_value(v)
+            except TypeError:
+                pass
+
+
+def _group_remove(state, row, items, schema_map):
+    """Retire une ligne du groupe ; retourne False si min/max doit être recalculé depuis la table."""
+    exact = True
+    state["n"] -= 1
+    for it, acc in zip(items, state["acc"]):
+        if acc is None or it["col"] is None:
+            continue
+        v = _coerce_value(row.get(it["col"]), schema_map[it["col"]])
+        if v is None:
             continue
+        acc["n"] -= 1
+        if it["func"] in ("sum", "avg"):
+            acc["sum"] -= v
+        elif it["func"] in ("min", "max"):
+            bound = _coerce_value(acc[it["func"]], schema_map[it["col"]])
+            if bound is None or v == bound:
+                exact = False
+    return exact
 
-        # boucle variable 
-        while True:
-            default_display = ""
-            if "default" in col_constraints and col_constraints.get("default") is not None:
-                default_display = f" [default: {col_constraints.get('default')}]"
-            raw = input(f"{col_name} ({col_type}){default_display} = ").strip()
 
-            # Si vide et default fourni -> utiliser default
-            if raw == "" and "default" in col_constraints and col_constraints.get("default") is not None:
-                try:
-                    default_raw = col_constraints.get("default")
-                    converted_default = default_raw
-                    if not isinstance(default_raw, (int, float, bool, list, dict)):
-                        converted_default = convert_input_to_type(str(default_raw), col_type)
-                    new_val = serializable_value(converted_default)
-                except Exception:
-                    new_val = default_raw
-                candidate_serialized = new_val
+def _encoded_group_key(group_by, schema_map, encodings):
+    """
+    Clé de groupe sur les valeurs stockées : tuple de codes entiers pour les colonnes
+    encodées (ni décodage ni json par ligne), valeur convertie pour les autres.
+    """
+    def key(row):
+        out = []
+        for g in group_by:
+            enc = encodings.get(g)
+            if enc is None:
+                out.append(serializable_value(_coerce_value(row.get(g), schema_map[g])))
+                continue
+            v = _stored_value(row, g)
+            if type(v) is str:
+                v = enc.get(v, v)  # valeur modifiée en mémoire : même groupe que son code
+            out.append(v)
+        return tuple(out)
+    return key
 
-            elif raw == "":
-                candidate_serialized = None
+
+def _aggregate_rows(rows, items, group_by, schema_map, key_func=None):
+    """
+    Groupes {clé: état} calculés sur `rows` (déjà filtrées).
+    key_func : clé de regroupement (par défaut _group_key, clé json stable utilisée par les vues).
+    """
+    groups = {}
+    for row in rows:
+        key = key_func(row) if key_func else _group_key(row, group_by, schema_map)
+        state = groups.get(key)
+        if state is None:
+            state = groups[key] = _new_group(row, items, group_by, schema_map)
+        _group_add(state, row, items, schema_map)
+    if not group_by and not groups:
+        # agrégat global sur zéro ligne : une ligne (count = 0)
+        groups[_group_key({}, [], schema_map)] = _new_group({}, items, [], schema_map)
+    return groups
+
+
+def _groups_to_rows(groups, items, group_by):
+    """États de groupes -> lignes du résultat (colonnes = noms des items)."""
+    out = []
+    for state in groups.values():
+        keys = dict(zip(group_by, state["key"]))
+        row = {}
+        for it, acc in zip(items, state["acc"]):
+            if it["kind"] == "col":
+                row[it["name"]] = keys.get(it["col"])
+                continue
+            func = it["func"]
+            if func == "count":
+                row[it["name"]] = state["n"] if it["col"] is None else acc["n"]
+            elif func == "sum":
+                row[it["name"]] = acc["sum"] if acc["n"] else None
+            elif func == "avg":
+                row[it["name"]] = acc["sum"] / acc["n"] if acc["n"] else None
             else:
-                try:
-                    conv = convert_input_to_type(raw, col_type)
-                    candidate_serialized = serializable_value(conv)
-                except ValueError as ve:
-                    print(f"Valeur invalide pour {col_name} (type {col_type}) : {ve}")
-                    print("Réessaye (ou laisse vide pour NULL).")
-                    continue
+                row[it["name"]] = acc[func] if acc["n"] else None
+        out.append(row)
+    return out
+
+
+# ---------- Scan parallèle ----------
+# mode : "auto" (parallèle si nb lignes >= threshold), "on" (toujours), "off" (jamais)
+# Les fichiers sont découpés en segments d'environ chunk_size lignes (plages de lignes du format
+# compact, groupes de blocs du format compressé) : chaque processus lit lui-même son segment,
+# seules les lignes retenues reviennent au processus principal. Les lignes déjà en mémoire
+# (index, écritures en attente) ne sont envoyées par blocs aux processus qu'en mode "on" :
+# leur sérialisation coûte plus que le filtrage, sauf prédicats très coûteux.
+PARALLEL_SCAN: Dict[str, Any] = {
+    "mode": "auto",
+    "workers": os.cpu_count() or 1,
+    "chunk_size": 50000,
+    "threshold": 200000,
+}
+_scan_pool = None  # ProcessPoolExecutor créé au premier scan parallèle
+
+
+def _project(rows, columns):
+    return [{col: row.get(col) for col in columns} for row in rows]
+
+
+def _scan_chunk(task):
+    """Exécuté dans un processus fils : filtre + projette un bloc de lignes (ou un segment de fichier)."""
+    rows, tree, schema_map, params, columns, meta = task
+    if isinstance(rows, tuple):
+        rows = _read_segment(rows[0], rows[1], meta)
+    binders = []
+    encodings = _column_encodings(meta, schema_map)
+    predicate = _compile_where(tree, schema_map, binders, encodings) if tree else (lambda row: True)
+    for bind in binders:
+        bind(params)
+    return _project([row for row in rows if predicate(row)], columns)
+
+
+def _get_scan_pool():
+    global _scan_pool
+    if _scan_pool is None:
+        from concurrent.futures import ProcessPoolExecutor
+        _scan_pool = ProcessPoolExecutor(max_workers=max(1, int(PARALLEL_SCAN["workers"])))
+    return _scan_pool
+
+
+def shutdown_scan_pool():
+    global _scan_pool
+    if _scan_pool is not None:
+        _scan_pool.shutdown(wait=True)
+        _scan_pool = None
+
+
+def _use_parallel_scan(nrows):
+    mode = PARALLEL_SCAN["mode"]
+    if mode == "off" or (PARALLEL_SCAN["workers"] <= 1 and mode != "on"):
+        return False
+    if mode == "on":
+        return nrows > 0
+    return nrows >= PARALLEL_SCAN["threshold"]
 
-            # Vérifier NOT NULL
-            if col_constraints.get("not_null") and (candidate_serialized is None or candidate_serialized == ""):
-                print(f"Violation: colonne '{col_name}' est NOT NULL — une valeur est requise.")
-                if "default" in col_constraints and col_constraints.get("default") is not None:
-                    use_def = input("Utiliser la valeur DEFAULT ? (o/n) : ").strip().lower()
-                    if use_def == "o":
-                        try:
-                            default_raw = col_constraints.get("default")
-                            converted_default = default_raw
-                            if not isinstance(default_raw, (int, float, bool, list, dict)):
-                                converted_default = convert_input_to_type(str(default_raw), col_type)
-                            candidate_serialized = serializable_value(converted_default)
-                        except Exception:
-                            candidate_serialized = None
-                        if candidate_serialized is None:
-                            print("DEFAULT non applicable, réessaye.")
-                            continue
-                    else:
-                        continue
-                else:
-                    continue
 
-            # Vérifier UNIQUE
-            if col_constraints.get("unique") and candidate_serialized is not None:
-                if is_unique_violation(col_name, candidate_serialized):
-                    print(f"Violation UNIQUE: la valeur '{candidate_serialized}' existe déjà dans '{col_name}'.")
-                    retry = input("Entrer une autre valeur ? (o/n) : ").strip().lower()
-                    if retry == "o":
-                        continue
-                    else:
-                        print("Insertion annulée.")
-                        return  
-            new_record[col_name] = candidate_serialized
-            break
+def _use_chunked_scan(nrows):
+    """Lignes en mémoire envoyées par blocs aux processus : seulement en mode "on"."""
+    return PARALLEL_SCAN["mode"] == "on" and _use_parallel_scan(nrows)
 
-    # enregistrement
-    data.append(new_record)
 
-    # Sauvegarder
+def _scan_rows(data, columns, predicate, tree, schema_map, params=(), chunked=True, meta=None):
+    """
+    Filtre `data` et projette sur `columns`, dans l'ordre d'origine.
+    chunked=True : `data` est une liste de lignes, découpée en blocs de chunk_size lignes
+    répartis sur un pool de processus en mode "on" seulement (voir _use_chunked_scan) ;
+    chaque fils recompile l'arbre WHERE (les closures ne sont pas transmissibles).
+    chunked=False : `data` est une liste de (fichier, segment) (voir _data_segments), lus par les fils.
+    """
+    if chunked and not _use_chunked_scan(len(data)):
+        with _timed_stat("filter_s"):
+            matched = [row for row in data if predicate(row)]
+        return _project(matched, columns)
+
+    if chunked:
+        size = max(1, int(PARALLEL_SCAN["chunk_size"]))
+        blocks = [data[i:i + size] for i in range(0, len(data), size)]
+    else:
+        blocks = data
+        for path in dict.fromkeys(path for path, _ in data):
+            _stat_read(path)  # lus par les processus fils
+    tasks = [(block, tree, schema_map, list(params), columns, meta or {}) for block in blocks]
     try:
-        with open(data_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-        print("Donnée insérée avec succès.")
+        # map() rend les résultats dans l'ordre des blocs (filtrage mesuré lecture comprise)
+        with _timed_stat("filter_s"):
+            results = _get_scan_pool().map(_scan_chunk, tasks)
+            matched = []
+            for part in results:
+                matched.extend(part)
+        return matched
     except Exception as e:
-        print("Erreur lors de la sauvegarde :", e)
+        print(f"Scan parallèle indisponible ({e}) — scan séquentiel.")
+        shutdown_scan_pool()
+        if not chunked:
+            data = [row for path, segment in data for row in _read_segment(path, segment, meta)]
+        return _project([row for row in data if predicate(row)], columns)
+
+
+def set_parallel_scan(args: List[str]) -> bool:
+    """parallel [on|off|auto] [workers=N] [chunk=N] [threshold=N]"""
+    keys = {"workers": "workers", "chunk": "chunk_size", "chunk_size": "chunk_size", "threshold": "threshold"}
+    for arg in args:
+        if arg.lower() in ("on", "off", "auto"):
+            PARALLEL_SCAN["mode"] = arg.lower()
+            continue
+        name, _, value = arg.partition("=")
+        if name.lower() not in keys:
+            _fail(f"Option inconnue '{arg}'.")
+            return False
+        try:
+            ivalue = int(value)
+            if ivalue < 1:
+                raise ValueError
+        except ValueError:
+            _fail(f"Valeur entière positive attendue pour '{name}'.")
+            return False
+        key = keys[name.lower()]
+        if key == "workers" and ivalue != PARALLEL_SCAN["workers"]:
+            shutdown_scan_pool()
+        PARALLEL_SCAN[key] = ivalue
+    print("Scan parallèle : " + ", ".join(f"{k}={v}" for k, v in PARALLEL_SCAN.items()))
+    return True
 
 
+# ---------- Vues matérialisées ----------
+# <vue>_view.json   : définition {"base", "query", "columns", "where", "group_by", "state"}
+# <vue>_schema.json / <vue>_data.json : résultat, lisible comme une table (select / search)
+# La table de base liste ses vues dans <base>_meta.json ("views") : chaque insert/update
+# applique le delta des lignes modifiées au lieu de recalculer la vue.
 
-# Affichage de tables 
-def select_table(table_name, columns=None):
+def _is_view(table_name, db_name=None):
+    return os.path.exists(_table_file(table_name, "view.json", db_name))
+
+
+def _load_view(name, db_name=None):
+    with open(_table_file(name, "view.json", db_name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_view(name, view, db_name=None):
+    with _open_for_write(_table_file(name, "view.json", db_name), level=_durability(db_name)) as f:
+        json.dump(view, f, indent=4, ensure_ascii=False)
+
+
+def _reject_view_write(table_name):
+    if _is_view(table_name):
+        _fail(f"'{table_name}' est une vue matérialisée (lecture seule) — utilisez 'refresh {table_name}'.")
+        return True
+    return False
+
+
+def _view_context(view, db_name=None):
+    """(schema_map de la base, items, group_by, prédicat, agrégée ?) pour une vue."""
+    base_schema_map = _table_types(view["base"], db_name)
+    columns = view["columns"]
+    if columns == ["*"]:
+        columns = list(base_schema_map)
+    group_by = view.get("group_by") or []
+    items = _parse_select_items(columns, base_schema_map, group_by)
+    predicate = _build_where_predicate(view.get("where"), base_schema_map)
+    return base_schema_map, items, group_by, predicate, _is_aggregate_query(items, group_by)
+
+
+def _key_columns(schema):
+    """Colonnes identifiant une ligne : la première colonne unique / auto_increment, sinon toutes."""
+    for col in schema:
+        if col.get("unique") or col.get("auto_increment"):
+            return [col["name"]]
+    return [col["name"] for col in schema]
+
+
+def _row_identity(columns):
+    """Fonction ligne -> clé hachable sur `columns` (valeurs list / dict sérialisées)."""
+    def identity(row):
+        return tuple(json.dumps(v, sort_keys=True) if isinstance(v, (list, dict)) else v
+                     for v in (row.get(c) for c in columns))
+    return identity
+
+
+def _write_view_result(name, view, items, base_schema_map, rows, db_name=None):
+    schema = []
+    for it in items:
+        if it["kind"] == "col":
+            typ = base_schema_map[it["col"]]
+        elif it["func"] == "count":
+            typ = "int"
+        elif it["func"] == "avg":
+            typ = "float"
+        else:
+            typ = base_schema_map[it["col"]]
+        schema.append({"name": it["name"], "type": typ, "not_null": False, "unique": False,
+                       "auto_increment": False, "default": None})
+    schema_path = _table_file(name, "schema.json", db_name)
+    level = _durability(db_name)
+    try:
+        with open(schema_path, "r", encoding="utf-8") as f:
+            unchanged = json.load(f) == schema
+    except (OSError, ValueError):
+        unchanged = False
+    if not unchanged:  # le schéma ne change qu'avec la définition de la vue ou de sa base
+        with _open_for_write(schema_path, level=level) as f:
+            json.dump(schema, f, indent=4, ensure_ascii=False)
+    _write_data_file(_data_file(name, None, db_name), rows, [it["name"] for it in items], level=level)
+    _save_view(name, view, db_name)
+    _catalog_update(name, {}, {None: len(rows)}, db_name)
+
+
+def _rebuild_view(name, view):
+    """Recalcul complet de la vue depuis la table de base."""
+    base_schema_map, items, group_by, predicate, aggregated = _view_context(view)
+    matched = [row for row in _load_rows(view["base"]) if predicate(row)]
+    if aggregated:
+        groups = _aggregate_rows(matched, items, group_by, base_schema_map)
+        view["state"] = groups
+        rows = _groups_to_rows(groups, items, group_by)
+    else:
+        view["state"] = None
+        rows = _project(matched, [it["col"] for it in items])
+    _write_view_result(name, view, items, base_schema_map, rows)
+    return len(rows)
+
+
+def create_materialized_view(name, query_txt):
+    if not ensure_db_selected():
+        return False
+    if not require_permission(current_db, "create_table"):
+        return False
+    if os.path.exists(_table_file(name, "schema.json")):
+        _fail(f"⚠ La table ou vue '{name}' existe déjà.")
+        return False
+    m = re.match(r'(?i:search)\s+(?P<rest>.+)$', query_txt.strip())
+    parsed = _parse_search_command(m.group("rest")) if m else None
+    if not parsed:
+        _fail("Syntaxe: create materialized view <nom> as search <cols> from <table> [where <cond>] [group by <cols>]")
+        return False
+    cols, base, where_txt, group_by = parsed
+    if not os.path.exists(_table_file(base, "schema.json")):
+        _fail(f"La table '{base}' n'existe pas.")
+        return False
+    if _is_view(base):
+        _fail("Une vue matérialisée ne peut pas être construite sur une autre vue.")
+        return False
+    view = {"base": base, "query": query_txt.strip(), "columns": cols, "where": where_txt,
+            "group_by": group_by, "state": None}
+    try:
+        if where_txt and _count_params(_parse_where_clause(where_txt)):
+            raise ValueError("paramètre '?' interdit dans une vue")
+        nrows = _rebuild_view(name, view)
+    except Exception as e:
+        _fail(f"Vue invalide ({e}).")
+        for suffix in ("view.json", "schema.json", "data.json"):
+            if os.path.exists(_table_file(name, suffix)):
+                os.remove(_table_file(name, suffix))
+        return False
+    meta = _load_table_meta(base)
+    views = meta.setdefault("views", [])
+    if name not in views:
+        views.append(name)
+    _save_table_meta(base, meta)
+    _journal_table(base)  # la base et ses vues, dont la nouvelle
+    print(f"Vue matérialisée '{name}' créée ({nrows} ligne(s)).")
+    return True
+
+
+def refresh_materialized_view(name):
     if not ensure_db_selected():
+        return False
+    if not require_permission(current_db, "read") or _reject_replica_write(current_db):
+        return False
+    if not _is_view(name):
+        _fail(f"'{name}' n'est pas une vue matérialisée.")
+        return False
+    try:
+        nrows = _rebuild_view(name, _load_view(name))
+    except Exception as e:
+        _fail(f"Impossible de rafraîchir la vue '{name}' : {e}")
+        return False
+    _journal_table(name)
+    print(f"Vue '{name}' rafraîchie ({nrows} ligne(s)).")
+    return True
+
+
+def _apply_view_delta(name, removed, added, db_name=None):
+    """Applique à la vue les lignes retirées / ajoutées de la table de base."""
+    view = _load_view(name, db_name)
+    base_schema_map, items, group_by, predicate, aggregated = _view_context(view, db_name)
+    removed = [row for row in removed if predicate(row)]
+    added = [row for row in added if predicate(row)]
+    if not removed and not added:
         return
 
-        # permission : lecture des données
-    if not require_permission(current_db, "read"):
-        return
+    if not aggregated:
+        cols = [it["col"] for it in items]
+        path = _data_file(name, None, db_name)
+        rows = _read_data_file(path)
+        if removed:
+            # lignes de la vue indexées une fois par delta sur l'identité de la ligne de base
+            key_cols = _key_columns(_table_schema(view["base"], db_name))
+            identity = _row_identity(key_cols if set(key_cols) <= set(cols) else cols)
+            positions = {}
+            for pos, row in enumerate(rows):
+                positions.setdefault(identity(row), []).append(pos)
+            dropped = set()
+            for old in removed:
+                found = positions.get(identity(old))
+                if found:
+                    dropped.add(found.pop())
+            rows = [row for pos, row in enumerate(rows) if pos not in dropped]
+        rows.extend(_project(added, cols))
+        _write_data_file(path, rows, cols, level=_durability(db_name))
+        _catalog_update(name, {}, {None: len(rows)}, db_name)
+        return
+
+    groups = view["state"]
+    stale = set()
+    for row in removed:
+        key = _group_key(row, group_by, base_schema_map)
+        state = groups.get(key)
+        if state is None or not _group_remove(state, row, items, base_schema_map):
+            stale.add(key)
+    for row in added:
+        key = _group_key(row, group_by, base_schema_map)
+        state = groups.get(key)
+        if state is None:
+            state = groups[key] = _new_group(row, items, group_by, base_schema_map)
+        _group_add(state, row, items, base_schema_map)
+    if stale:
+        # min/max retiré : seuls les groupes concernés sont recalculés depuis la base
+        for key in stale:
+            groups.pop(key, None)
+        for row in _load_rows(view["base"], db_name=db_name):
+            if not predicate(row):
+                continue
+            key = _group_key(row, group_by, base_schema_map)
+            if key in stale:
+                state = groups.get(key)
+                if state is None:
+                    state = groups[key] = _new_group(row, items, group_by, base_schema_map)
+                _group_add(state, row, items, base_schema_map)
+    if group_by:
+        for key in [k for k, st in groups.items() if st["n"] <= 0]:
+            del groups[key]
+    elif not groups:
+        groups[_group_key({}, [], base_schema_map)] = _new_group({}, items, [], base_schema_map)
+    _write_view_result(name, view, items, base_schema_map, _groups_to_rows(groups, items, group_by), db_name)
+
+
+def _notify_row_changes(table_name, removed, added, db_name=None):
+    """Point d'entrée unique des changements de lignes (insert / update) : journal, vues."""
+    if _journal_enabled(db_name) and removed:
+        _journal_append("update", table_name, db_name,
+                        old=[_plain_row(r) for r in removed], new=[_plain_row(r) for r in added])
+    elif _journal_enabled(db_name):
+        _journal_append("insert", table_name, db_name, rows=[_plain_row(r) for r in added])
+    for name in _load_table_meta(table_name, db_name).get("views", []):
+        try:
+            _apply_view_delta(name, removed, added, db_name)
+        except Exception as e:
+            print(f"⚠ Vue '{name}' non maintenue ({e}) — 'refresh {name}' nécessaire.")
+
+
+def _refresh_dependent_views(table_name):
+    """Après un changement de schéma de la base : recalcul complet des vues."""
+    for name in _load_table_meta(table_name).get("views", []):
+        try:
+            _rebuild_view(name, _load_view(name))
+        except Exception as e:
+            print(f"⚠ Vue '{name}' invalide après modification de '{table_name}' ({e}).")
+
+
+# ---------- Journal des changements (restauration à une date) ----------
+# databases/<db>/_changes.jsonl : une entrée JSON par ligne, {"seq", "at", "op", "table", ...}
+#   insert : "rows" ; update : "old" / "new" (valeurs décodées, dans le même ordre)
+#   table  : état de la table après une commande de structure (create_table, alter_table, index,
+#            rewrite, analyze, compress, vues) ; ses fichiers sont liés dans _changes/<seq>/
+#   drop   : table supprimée ; restore : base restaurée à la date "to"
+# Les numéros ne sont jamais réutilisés : après une restauration à une date, la suite reprend
+# après ceux de la branche abandonnée (ses sauvegardes ne sont plus choisies par restore).
+# Actif à partir de la première sauvegarde de la base ("journal" dans _database.json).
+JOURNAL_FILE = "_changes.jsonl"
+JOURNAL_DIR = "_changes"
+_journal_seq: Dict[str, int] = {}  # base -> dernier numéro écrit
+_replaying = False  # rejeu en cours : rien n'est journalisé
+
+
+def _plain_row(row):
+    return dict(row.items())
+
+
+def _journal_enabled(db_name=None):
+    db_name = db_name or current_db
+    return bool(db_name) and not _replaying and bool(_db_settings(db_name).get("journal"))
+
 
+def _journal_file(db_name=None):
+    return os.path.join(DB_ROOT, db_name or current_db, JOURNAL_FILE)
 
-    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
-    data_path = os.path.join(DB_ROOT, current_db, f"{table_name}_data.json")
 
-    if not os.path.exists(schema_path):
-        print(f"La table '{table_name}' n'existe pas.")
+def _read_journal(path):
+    """Entrées du journal `path`, dans l'ordre (une dernière ligne incomplète est ignorée)."""
+    if not os.path.exists(path):
         return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
 
-    # charge les données 
-    with open(schema_path, "r", encoding="utf-8") as f:
-        schema = json.load(f)
-    with open(data_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
-    all_columns = [col["name"] for col in schema]
+def _journal_tail_seq(path):
+    """Numéro de la dernière entrée complète du journal `path` (0 s'il est vide ou absent)."""
+    seq = 0
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                # chaque ligne commence par {"seq": N, : pas besoin de décoder les lignes
+                head = line[:32].split(",", 1)[0]
+                if head.startswith('{"seq": ') and line.endswith("\n"):
+                    seq = int(head[8:])
+    return seq
+
+
+def _last_journal_seq(db_name):
+    seq = _journal_seq.get(db_name)
+    if seq is None:
+        seq = _journal_seq[db_name] = _journal_tail_seq(_journal_file(db_name))
+    return seq
+
+
+def _journal_append(op, table_name, db_name=None, **fields):
+    """Ajoute une entrée au journal de la base (courante par défaut) ; retourne son numéro (None si inactif)."""
+    db_name = db_name or current_db
+    if not _journal_enabled(db_name):
+        return None
+    seq = _last_journal_seq(db_name) + 1
+    entry = {"seq": seq, "at": datetime.now().isoformat(timespec="microseconds"), "op": op, "table": table_name}
+    entry.update(fields)
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    path = _journal_file(db_name)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line)
+        if _durability(db_name) == "full":
+            f.flush()
+            os.fsync(f.fileno())
+    if _durability(db_name) == "normal":
+        _unsynced_paths.add(path)
+    _stat_add("bytes_written", len(line))
+    _journal_seq[db_name] = seq
+    if _db_settings(db_name).get("replicas"):
+        _ship_entries(db_name, line)
+    return seq
+
+
+def _table_files(table_name, db_name=None):
+    """Fichiers existants de la table : schema, méta, définition de vue, données, index, zone maps."""
+    meta = _load_table_meta(table_name, db_name)
+    paths = [_table_file(table_name, suffix, db_name) for suffix in ("schema.json", "meta.json", "view.json")]
+    paths += [_data_file(table_name, pid, db_name) for pid in _partition_ids(meta)]
+    paths += [_index_file(table_name, col, kind, db_name)
+              for kind in _INDEX_KINDS for col in _indexed_columns(meta, kind)]
+    paths.append(_zones_file(table_name, db_name))
+    return [p for p in paths if os.path.exists(p)]
+
+
+def _link_or_copy(src, dst):
+    """Lien physique (les fichiers de données ne sont jamais réécrits sur place), copie à défaut."""
+    try:
+        os.link(src, dst)
+        return True
+    except OSError:
+        import shutil
+        shutil.copy2(src, dst)
+        return False
 
-    # Si aucune
-    if not columns or columns == ["*"]:
-        columns = all_columns
-    else:
-        # Vérifier que les colonnes existent
-        for col in columns:
-            if col not in all_columns:
-                print(f"Colonne '{col}' inexistante dans la table '{table_name}'.")
-                return
 
-    # Affichage formaté
-    print(f"\nRésultat de select {', '.join(columns)} from {table_name} :")
-    if not data:
-        print("(aucune ligne)")
+def _journal_table(table_name):
+    """Après une commande de structure : état de la table (et de ses vues) dans le journal."""
+    if not _journal_enabled():
         return
+    flush_writes(table_name)
+    for name in [table_name] + _load_table_meta(table_name).get("views", []):
+        files = _table_files(name)
+        if not files:
+            _journal_append("drop", name)
+            continue
+        dest = os.path.join(DB_ROOT, current_db, JOURNAL_DIR, str(_last_journal_seq(current_db) + 1))
+        os.makedirs(dest, exist_ok=True)
+        for path in files:
+            _link_or_copy(path, os.path.join(dest, os.path.basename(path)))
+        _journal_append("table", name, files=[os.path.basename(p) for p in files])
+
+
+def _replay_rows(table_name, old, new, db_name=None):
+    """Rejoue un insert (old vide) ou un update : chaque ancienne ligne est retrouvée par égalité."""
+    meta = _load_table_meta(table_name, db_name)
+    schema = _table_schema(table_name, db_name)
+    types = _schema_types(schema)
+    parts = {pid: rows for pid, rows in _load_partitions(table_name, meta, db_name=db_name)}
+    positions = {}
+    if old:
+        # lignes indexées une fois par entrée sur leur clé (colonne unique, sinon la ligne entière)
+        identity = _row_identity(_key_columns(schema))
+        for pid, rows in parts.items():
+            for idx, row in enumerate(rows):
+                positions.setdefault(identity(row), []).append((pid, idx))
+    touched = set()
+    for before, after in itertools.zip_longest(old, new):
+        pid = _partition_of_row(meta, types, after) if after is not None else None
+        if before is not None:
+            candidates = positions.get(identity(before), [])
+            found = next((c for c in candidates if _plain_row(parts[c[0]][c[1]]) == before), None)
+            if found is None:
+                raise ValueError(f"ligne introuvable dans '{table_name}' : {before}")
+            candidates.remove(found)
+            old_pid, idx = found
+            touched.add(old_pid)
+            if after is not None and old_pid == pid:
+                parts[pid][idx] = after  # même partition : la ligne garde sa place
+                continue
+            parts[old_pid][idx] = None  # retirée à l'écriture : les positions restent valables
+        if after is not None:
+            parts.setdefault(pid, []).append(after)
+            touched.add(pid)
+    for pid in touched:
+        _save_partition(table_name, meta, pid, [row for row in parts[pid] if row is not None], db_name)
+    _notify_row_changes(table_name, old, new, db_name)
+
 
-    # Largeurs automatiques pour un affichage tabulaire
-    col_widths = {col: max(len(col), max((len(str(row.get(col, ''))) for row in data), default=0)) for col in columns}
+def _apply_journal_entry(entry, source_dir, db_name=None):
+    """
+    Rejoue une entrée sur la base `db_name` (courante par défaut) ; source_dir : base d'origine
+    (fichiers de _changes/<seq>/).
+    """
+    db_name = db_name or current_db
+    op, table_name = entry["op"], entry.get("table")
+    if op == "insert":
+        _replay_rows(table_name, [], entry["rows"], db_name)
+    elif op == "update":
+        _replay_rows(table_name, entry["old"], entry["new"], db_name)
+    elif op in ("table", "drop"):
+        for path in _table_files(table_name, db_name):
+            os.remove(path)
+        if op == "drop":
+            _catalog_drop(table_name, db_name)
+            return
+        src = os.path.join(source_dir, JOURNAL_DIR, str(entry["seq"]))
+        for name in entry["files"]:
+            _link_or_copy(os.path.join(src, name), os.path.join(DB_ROOT, db_name, name))
+        _catalog_update(table_name, db_name=db_name)
 
-    # Ligne d’en-tête
-    header = " | ".join(col.ljust(col_widths[col]) for col in columns)
-    print("-" * len(header))
-    print(header)
-    print("-" * len(header))
 
-    # Lignes de données
-    for row in data:
-        line = " | ".join(str(row.get(col, "")).ljust(col_widths[col]) for col in columns)
-        print(line)
+# ---------- Sauvegardes : backup <db> <dest> / restore <db> [--at <date>] [from <dest>] ----------
+# <dest>/<AAAAMMJJ-HHMMSS-ffffff>/ : copie de databases/<db> + manifest.json (écrit en dernier).
+# Un fichier identique à la sauvegarde précédente (même inode, taille, date) y est lié, pas copié.
+BACKUP_MANIFEST = "manifest.json"
 
-    print("-" * len(header))
-    print(f"({len(data)} ligne{'s' if len(data) > 1 else ''})\n")
 
-    
-# recherche
-def search_table(table_name, columns=None, where_clause=None):
-    if not ensure_db_selected():
+def _save_db_settings(db_name, **changes):
+    settings = dict(_db_settings(db_name), **changes)
+    if settings == _db_settings(db_name) and os.path.exists(_db_settings_file(db_name)):
         return
+    with _open_for_write(_db_settings_file(db_name), level="full") as f:
+        json.dump(settings, f, indent=4, ensure_ascii=False)
+    _db_settings_cache[db_name] = settings
+
+
+def _list_backups(dest):
+    """[(date, répertoire, manifeste)] des sauvegardes complètes de `dest`, de la plus ancienne à la plus récente."""
+    backups = []
+    if not os.path.isdir(dest):
+        return backups
+    for name in sorted(os.listdir(dest)):
+        path = os.path.join(dest, name)
+        try:
+            with open(os.path.join(path, BACKUP_MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            backups.append((datetime.fromisoformat(manifest["at"]), path, manifest))
+        except (OSError, ValueError, KeyError):
+            continue  # sauvegarde interrompue
+    backups.sort(key=lambda b: b[0])
+    return backups
+
+
+def backup_db(db_name, dest):
+    """Instantané cohérent de la base ; active son journal (restauration à une date)."""
+    src = os.path.join(DB_ROOT, db_name)
+    if not os.path.isdir(src):
+        _fail(f"La base '{db_name}' n'existe pas.")
+        return
+    if not require_permission(db_name, "admin"):
+        return
+    import shutil
+    if current_db == db_name:
+        flush_writes()
+    previous = _list_backups(dest)
+    prev_dir, prev_files = (previous[-1][1], previous[-1][2]["files"]) if previous else (None, {})
+    with _locked(_flush_lock, "flush"):  # pas d'écriture différée pendant la copie
+        dest = os.path.abspath(dest)
+        _save_db_settings(db_name, journal=True, backup_dir=dest)
+        now = datetime.now()
+        target = os.path.join(dest, now.strftime("%Y%m%d-%H%M%S-%f"))
+        files, linked, copied, copied_bytes = {}, 0, 0, 0
+        try:
+            for root, _, names in os.walk(src):
+                for name in names:
+                    path = os.path.join(root, name)
+                    rel = os.path.relpath(path, src)
+                    if name.endswith(".tmp"):
+                        continue
+                    st = os.stat(path)
+                    files[rel] = [st.st_size, st.st_mtime_ns, st.st_ino]
+                    out = os.path.join(target, rel)
+                    os.makedirs(os.path.dirname(out), exist_ok=True)
+                    # le journal est complété sur place : toujours copié
+                    if prev_files.get(rel) == files[rel] and name != JOURNAL_FILE and _link_or_copy(os.path.join(prev_dir, rel), out):
+                        linked += 1
+                        continue
+                    shutil.copy2(path, out)
+                    copied += 1
+                    copied_bytes += st.st_size
+            manifest = {"db": db_name, "at": now.isoformat(timespec="microseconds"),
+                        "seq": _last_journal_seq(db_name), "files": files}
+            with _open_for_write(os.path.join(target, BACKUP_MANIFEST), level="full") as f:
+                json.dump(manifest, f, indent=1, ensure_ascii=False)
+        except OSError as e:
+            _fail(f"Sauvegarde impossible ({e}).")
+            return
+    print(f"Sauvegarde '{target}' : {copied} fichier(s) copié(s) ({copied_bytes / 1024:.0f} Kio), {linked} lié(s) à la précédente.")
+    return target
 
-        # permission : lecture des données (filter/search)
-    if not require_permission(current_db, "read"):
+
+def restore_db(db_name, at=None, dest=None):
+    """
+    Reconstruit la base à la date `at` (dernier état connu par défaut) : dernière sauvegarde
+    antérieure, puis rejeu du journal jusqu'à `at`. L'état remplacé est supprimé.
+    """
+    global _replaying
+    if not require_permission(db_name, "admin"):
+        return
+    live = os.path.join(DB_ROOT, db_name)
+    dest = dest or (_db_settings(db_name).get("backup_dir") if os.path.isdir(live) else None)
+    if not dest:
+        _fail(f"Aucune sauvegarde connue pour '{db_name}' — précisez 'from <répertoire>'.")
+        return
+    try:
+        target = datetime.fromisoformat(at) if at else None
+    except ValueError:
+        _fail(f"Date invalide '{at}' (AAAA-MM-JJ[THH:MM[:SS]] attendu).")
+        return
+    candidates = [b for b in _list_backups(dest) if b[2].get("db") == db_name and (target is None or b[0] <= target)]
+    live_journal = os.path.join(live, JOURNAL_FILE)
+    journal = list(_read_journal(live_journal)) if os.path.exists(live_journal) else None
+    if journal is not None:
+        # sauvegarde d'une branche abandonnée par une restauration à une date : son numéro
+        # n'est plus dans le journal, rejouer la suite sur elle mélangerait deux historiques
+        known = {e["seq"] for e in journal}
+        candidates = [b for b in candidates if not b[2]["seq"] or b[2]["seq"] in known]
+    if not candidates:
+        _fail(f"Aucune sauvegarde de '{db_name}' antérieure à {at} dans '{dest}'." if at else f"Aucune sauvegarde de '{db_name}' dans '{dest}'.")
         return
+    snap_at, snap_dir, manifest = candidates[-1]
+    replicas = _db_settings(db_name).get("replicas", []) if os.path.isdir(live) else []
+
+    flush_writes()  # toutes les bases : le flusher ne doit plus rien écrire pendant la bascule
+    _discard_pending(db_name=db_name)
+    # historique : journal de la base (il contient celui de la sauvegarde), sinon celui de la sauvegarde
+    source_dir = live if journal is not None else snap_dir
+    if journal is None:
+        journal = list(_read_journal(os.path.join(snap_dir, JOURNAL_FILE)))
+    history = [e for e in journal if target is None or datetime.fromisoformat(e["at"]) <= target]
+    replay = [e for e in history if e["seq"] > manifest["seq"]]
+
+    staging_name = f".{db_name}.restore"
+    staging = os.path.join(DB_ROOT, staging_name)
+    import shutil
+    shutil.rmtree(staging, ignore_errors=True)
+    writeback = WRITEBACK["enabled"]
+    try:
+        for rel in manifest["files"]:
+            out = os.path.join(staging, rel)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            if os.path.basename(rel) == JOURNAL_FILE:
+                continue  # réécrit ci-dessous
+            _link_or_copy(os.path.join(snap_dir, rel), out)
+        with open(os.path.join(staging, JOURNAL_FILE), "w", encoding="utf-8") as f:
+            for e in history:
+                f.write(json.dumps(e, ensure_ascii=False) + "\n")
+        for e in replay:
+            if e["op"] == "table":
+                os.makedirs(os.path.join(staging, JOURNAL_DIR, str(e["seq"])), exist_ok=True)
+                for name in e["files"]:
+                    out = os.path.join(staging, JOURNAL_DIR, str(e["seq"]), name)
+                    if not os.path.exists(out):
+                        _link_or_copy(os.path.join(source_dir, JOURNAL_DIR, str(e["seq"]), name), out)
+        _replaying = True
+        WRITEBACK["enabled"] = False
+        for e in replay:
+            _apply_journal_entry(e, source_dir, staging_name)
+    except Exception as e:
+        shutil.rmtree(staging, ignore_errors=True)
+        _fail(f"Restauration impossible ({e}) — base inchangée.")
+        return
+    finally:
+        _replaying = False
+        WRITEBACK["enabled"] = writeback
+        for cache in (_catalog_cache, _db_settings_cache, _journal_seq):
+            cache.pop(staging_name, None)
+            cache.pop(db_name, None)
+    if _db_settings(staging_name).get("replicas"):
+        _save_db_settings(staging_name, replicas=[])  # réexpédiés après la bascule
+    # numéros jamais réutilisés : la suite continue après ceux de la branche abandonnée
+    _journal_seq[staging_name] = max([e["seq"] for e in journal] + [_last_journal_seq(staging_name)])
+    _journal_append("restore", None, staging_name, to=(target or datetime.now()).isoformat(timespec="microseconds"),
+                    backup=os.path.basename(snap_dir))
+    checkpoint()
+
+    # bascule : l'ancien état est renommé puis supprimé
+    old = os.path.join(DB_ROOT, f".{db_name}.old")
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.isdir(live):
+        os.replace(live, old)
+    os.replace(staging, live)
+    shutil.rmtree(old, ignore_errors=True)
+    for cache in (_catalog_cache, _db_settings_cache, _journal_seq):
+        cache.pop(staging_name, None)
+        cache.pop(db_name, None)
+    for plan in prepared_statements.values():
+        plan["compiled"].clear()  # dictionnaires des colonnes encodées éventuellement différents
+    if replicas:
+        # le journal restauré diverge de celui des suiveurs : ils repartent de la nouvelle base
+        _save_db_settings(db_name, journal=True, replicas=replicas)
+        for root in replicas:
+            _seed_replica(db_name, root)
+    print(f"Base '{db_name}' restaurée" + (f" au {at}" if at else "") +
+          f" : sauvegarde du {snap_at.isoformat(sep=' ', timespec='seconds')} + {len(replay)} changement(s) rejoué(s).")
+    return True
 
 
-    schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
-    data_path = os.path.join(DB_ROOT, current_db, f"{table_name}_data.json")
+# ---------- Réplication : replica add|remove <db> <racine> / replica status [db] ----------
+# Le primaire expédie chaque entrée de son journal (et les fichiers de _changes/<seq>/) dans
+# <racine>/<db> de chacun de ses suiveurs ("replicas" de son _database.json).
+# Un suiveur est lu par un autre processus lancé à côté de <racine> : la base y est en lecture
+# seule et _replica.json garde la position appliquée. Les entrées reçues sont rejouées avant
+# chaque commande et toutes les REPLICA["interval"] secondes tant que la base est sélectionnée.
+REPLICA_STATE = "_replica.json"
+REPLICA_LOCK = "_replica.lock"
+REPLICA: Dict[str, Any] = {"interval": 0.5}
+_replica_cache: Dict[str, Any] = {}    # base -> (empreinte de _replica.json, état)
+_replica_shipped: Dict[Any, int] = {}  # (base, racine) -> dernier numéro expédié
+_replica_errors: Dict[Any, str] = {}   # (base, racine) -> dernière erreur d'expédition
+_replica_failures: Dict[str, str] = {}  # base suiveuse -> erreur de rejeu
+_replica_thread = None
+_command_lock = threading.RLock()      # une commande (ou un rattrapage de réplique) à la fois
+
+
+def _ship_entries(db_name, line=None):
+    """Expédie aux suiveurs de la base les entrées qu'ils n'ont pas reçues (`line` : la dernière écrite)."""
+    last = _last_journal_seq(db_name)
+    for root in _db_settings(db_name).get("replicas", []):
+        key, target = (db_name, root), os.path.join(root, db_name)
+        try:
+            shipped = _replica_shipped.get(key)
+            if shipped is None:
+                shipped = _journal_tail_seq(os.path.join(target, JOURNAL_FILE))
+            _replica_shipped[key] = shipped
+            if shipped >= last:
+                continue
+            if line is not None and shipped == last - 1:
+                entries = [(json.loads(line), line)]
+            else:  # expédition précédente en échec : relue dans le journal du primaire
+                entries = [(e, json.dumps(e, ensure_ascii=False) + "\n")
+                           for e in _read_journal(_journal_file(db_name)) if e["seq"] > shipped]
+            if not os.path.isdir(target):
+                raise OSError(f"répertoire '{target}' introuvable")
+            with open(os.path.join(target, JOURNAL_FILE), "a", encoding="utf-8") as f:
+                for entry, text in entries:
+                    if entry["op"] == "table":  # fichiers d'abord : le suiveur ne voit jamais l'entrée sans eux
+                        src = os.path.join(DB_ROOT, db_name, JOURNAL_DIR, str(entry["seq"]))
+                        dst = os.path.join(target, JOURNAL_DIR, str(entry["seq"]))
+                        os.makedirs(dst, exist_ok=True)
+                        for name in entry["files"]:
+                            if not os.path.exists(os.path.join(dst, name)):
+                                _link_or_copy(os.path.join(src, name), os.path.join(dst, name))
+                    f.write(text)
+                f.flush()
+                if _durability(db_name) == "full":
+                    os.fsync(f.fileno())
+            _replica_shipped[key] = entries[-1][0]["seq"] if entries else shipped
+            _replica_errors.pop(key, None)
+        except OSError as e:
+            _replica_shipped.pop(key, None)  # position relue sur le suiveur au prochain essai
+            if key not in _replica_errors:
+                print(f"Réplique '{target}' non alimentée ({e}) : nouvel essai à la prochaine écriture.")
+            _replica_errors[key] = str(e)
+
+
+def _seed_replica(db_name, root):
+    """Copie initiale de la base dans <root>/<db> (fichiers liés si possible) ; retourne le nombre de fichiers."""
+    import shutil
+    src = os.path.join(DB_ROOT, db_name)
+    target = os.path.join(root, db_name)
+    staging = os.path.join(root, f".{db_name}.seed")
+    if current_db == db_name:
+        flush_writes()
+    shutil.rmtree(staging, ignore_errors=True)
+    count = 0
+    with _locked(_flush_lock, "flush"):
+        for dirpath, _, names in os.walk(src):
+            for name in names:
+                if name.endswith(".tmp") or name in (REPLICA_STATE, REPLICA_LOCK, "_database.json"):
+                    continue
+                path = os.path.join(dirpath, name)
+                out = os.path.join(staging, os.path.relpath(path, src))
+                os.makedirs(os.path.dirname(out), exist_ok=True)
+                if name == JOURNAL_FILE:
+                    shutil.copy2(path, out)  # complété sur place : jamais lié
+                else:
+                    _link_or_copy(path, out)
+                count += 1
+        os.makedirs(staging, exist_ok=True)
+        settings = {k: v for k, v in _db_settings(db_name).items() if k not in ("replicas", "backup_dir")}
+        with _open_for_write(os.path.join(staging, "_database.json"), level="full") as f:
+            json.dump(settings, f, indent=4, ensure_ascii=False)
+        journal = os.path.join(staging, JOURNAL_FILE)
+        state = {"primary": os.path.abspath(src), "db": db_name,
+                 "seeded_at": datetime.now().isoformat(timespec="seconds"),
+                 "applied_seq": _journal_tail_seq(journal),
+                 "offset": os.path.getsize(journal) if os.path.exists(journal) else 0}
+        with _open_for_write(os.path.join(staging, REPLICA_STATE), level="full") as f:
+            json.dump(state, f, indent=4, ensure_ascii=False)
+    old = os.path.join(root, f".{db_name}.old")
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.isdir(target):
+        os.replace(target, old)
+    os.replace(staging, target)
+    shutil.rmtree(old, ignore_errors=True)
+    # mêmes comptes et droits pour lire le suiveur (fichier existant conservé)
+    users = os.path.join(root, os.path.basename(USERS_PATH))
+    if os.path.exists(USERS_PATH) and not os.path.exists(users):
+        shutil.copy2(USERS_PATH, users)
+    _replica_shipped[(db_name, root)] = state["applied_seq"]
+    _replica_errors.pop((db_name, root), None)
+    return count
+
+
+def _replica_state(db_name):
+    """État de suiveur de la base (None pour une base ordinaire)."""
+    if not db_name:
+        return None
+    path = os.path.join(DB_ROOT, db_name, REPLICA_STATE)
+    stamp = _file_stamp(path)
+    cached = _replica_cache.get(db_name)
+    if cached and cached[0] == stamp:
+        return cached[1]
+    state = None
+    if stamp is not None:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            pass
+    _replica_cache[db_name] = (stamp, state)
+    return state
 
-    if not os.path.exists(schema_path):
-        print(f"La table '{table_name}' n'existe pas.")
+
+def _save_replica_state(db_name, state):
+    path = os.path.join(DB_ROOT, db_name, REPLICA_STATE)
+    with _open_for_write(path) as f:
+        json.dump(state, f, indent=4, ensure_ascii=False)
+    _replica_cache[db_name] = (_file_stamp(path), state)
+
+
+def _reject_replica_write(db_name):
+    state = None if _replaying else _replica_state(db_name)
+    if state:
+        _fail(f"La base '{db_name}' est une réplique en lecture seule de '{state['primary']}'.")
+        return True
+    return False
+
+
+@contextlib.contextmanager
+def _replica_file_lock(db_name):
+    """Verrou entre processus : un seul lecteur de la réplique rejoue les entrées reçues."""
+    try:
+        import fcntl
+    except ImportError:  # Windows : un seul processus par réplique
+        yield
         return
+    with open(os.path.join(DB_ROOT, db_name, REPLICA_LOCK), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _catch_up_replica(db_name):
+    """Rejoue sur la réplique les entrées reçues depuis la dernière position ; retourne leur nombre."""
+    global _replaying
+    state = _replica_state(db_name)
+    path = os.path.join(DB_ROOT, db_name, JOURNAL_FILE)
+    if not state or (_file_stamp(path) or [0, 0])[1] <= state["offset"]:
+        return 0
+    applied = 0
+    with _replica_file_lock(db_name):
+        state = _replica_state(db_name)  # un autre processus a pu avancer entre-temps
+        with open(path, "rb") as f:
+            f.seek(state["offset"])
+            lines = f.read().split(b"\n")[:-1]  # la dernière ligne est incomplète (ou vide)
+        writeback = WRITEBACK["enabled"]
+        _replaying = True
+        WRITEBACK["enabled"] = False
+        try:
+            for raw in lines:
+                entry = json.loads(raw)
+                if entry["seq"] != state["applied_seq"] + 1:
+                    raise ValueError(f"entrée {entry['seq']} reçue, {state['applied_seq'] + 1} attendue")
+                if entry["op"] != "restore":  # le primaire réamorce ses suiveurs après une restauration
+                    _apply_journal_entry(entry, os.path.join(DB_ROOT, db_name), db_name)
+                state = dict(state, applied_seq=entry["seq"], offset=state["offset"] + len(raw) + 1,
+                             applied_at=entry["at"])
+                _save_replica_state(db_name, state)
+                applied += 1
+            _replica_failures.pop(db_name, None)
+        except Exception as e:
+            if _replica_failures.get(db_name) != str(e):
+                print(f"Réplique '{db_name}' arrêtée après l'entrée {state['applied_seq']} ({e}) "
+                      f"— relancez 'replica add' sur le primaire.")
+            _replica_failures[db_name] = str(e)
+        finally:
+            _replaying = False
+            WRITEBACK["enabled"] = writeback
+    return applied
 
+
+def _replica_loop():
+    while True:
+        time.sleep(REPLICA["interval"])
+        db_name = current_db
+        if db_name and _replica_state(db_name):
+            with _locked(_command_lock, "command"):
+                if current_db == db_name:
+                    _catch_up_replica(db_name)
+
+
+def _start_replica_thread():
+    global _replica_thread
+    if _replica_thread is None:
+        _replica_thread = threading.Thread(target=_replica_loop, name="replica", daemon=True)
+        _replica_thread.start()
+
+
+def _replica_lag(state, journal_path, last_seq):
+    """(entrées non appliquées, âge en secondes de la plus ancienne — None si pas encore reçue)."""
+    behind = max(0, last_seq - state["applied_seq"])
+    if not behind:
+        return 0, 0.0
     try:
-        with open(schema_path, "r", encoding="utf-8") as f:
-            schema = json.load(f)
-    except Exception as e:
-        print("Impossible de lire le schema :", e)
+        with open(journal_path, "rb") as f:
+            f.seek(state["offset"])
+            at = datetime.fromisoformat(json.loads(f.readline())["at"])
+    except (OSError, ValueError, KeyError):
+        return behind, None
+    return behind, (datetime.now() - at).total_seconds()
+
+
+def _format_lag(behind, seconds):
+    if not behind:
+        return "à jour"
+    return f"{behind} entrée(s), " + (f"{seconds:.1f} s" if seconds is not None else "non reçue(s)")
+
+
+def replica_add(db_name, root):
+    """Déclare <root>/<db> suiveur de la base : copie initiale puis expédition du journal."""
+    if not os.path.isdir(os.path.join(DB_ROOT, db_name)):
+        _fail(f"La base '{db_name}' n'existe pas.")
+        return
+    if not require_permission(db_name, "admin"):
+        return
+    root = os.path.abspath(root)
+    if root == os.path.abspath(DB_ROOT):
+        _fail("Le suiveur doit être un autre répertoire que celui des bases du primaire.")
+        return
+    replicas = list(_db_settings(db_name).get("replicas", []))
+    if root in replicas:
+        _fail(f"'{root}' suit déjà la base '{db_name}'.")
+        return
+    target = os.path.join(root, db_name)
+    if os.path.exists(target) and not os.path.exists(os.path.join(target, REPLICA_STATE)):
+        _fail(f"'{target}' existe déjà et n'est pas une réplique.")
         return
     try:
-        with open(data_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        print("Impossible de lire les données :", e)
+        os.makedirs(root, exist_ok=True)
+        _save_db_settings(db_name, journal=True, replicas=replicas + [root])
+        count = _seed_replica(db_name, root)
+    except OSError as e:
+        _save_db_settings(db_name, replicas=replicas)
+        _fail(f"Réplique impossible ({e}).")
         return
+    print(f"Réplique '{target}' amorcée ({count} fichier(s)) : le journal de '{db_name}' y est expédié à chaque écriture.")
 
-    if not isinstance(schema, list):
-        print("Schema invalide.")
+
+def replica_remove(db_name, root):
+    if not require_permission(db_name, "admin"):
+        return
+    root = os.path.abspath(root)
+    replicas = _db_settings(db_name).get("replicas", [])
+    if root not in replicas:
+        _fail(f"'{root}' ne suit pas la base '{db_name}'.")
+        return
+    _save_db_settings(db_name, replicas=[r for r in replicas if r != root])
+    _replica_shipped.pop((db_name, root), None)
+    _replica_errors.pop((db_name, root), None)
+    print(f"Expédition vers '{root}' arrêtée. La réplique garde ses données en lecture seule "
+          f"(supprimez {os.path.join(root, db_name, REPLICA_STATE)} pour l'utiliser en écriture).")
+
+
+def replica_status(db_name=None):
+    """Retard de la réplique courante, ou de chacun des suiveurs d'un primaire."""
+    db_name = db_name or current_db
+    if not db_name:
+        _fail("Aucune base sélectionnée. Utilisez 'use <db>' ou 'replica status <db>'.")
+        return
+    if not os.path.isdir(os.path.join(DB_ROOT, db_name)):
+        _fail(f"La base '{db_name}' n'existe pas.")
         return
+    if not require_permission(db_name, "read"):
+        return
+    state = _replica_state(db_name)
+    if state:
+        received = _journal_tail_seq(os.path.join(DB_ROOT, db_name, JOURNAL_FILE))
+        primary_journal = os.path.join(state["primary"], JOURNAL_FILE)
+        primary_seq = _journal_tail_seq(primary_journal) if os.path.isdir(state["primary"]) else None
+        behind, seconds = _replica_lag(state, os.path.join(DB_ROOT, db_name, JOURNAL_FILE),
+                                       max(received, primary_seq or 0))
+        print(f"Réplique en lecture seule de '{state['primary']}' (amorcée le {state['seeded_at']}).")
+        print(f"  appliquée : {state['applied_seq']}" + (f" (écrite le {state['applied_at']})" if state.get("applied_at") else "") +
+              f" | reçue : {received} | primaire : {primary_seq if primary_seq is not None else 'inaccessible'}")
+        print(f"  retard : {_format_lag(behind, seconds)}")
+        if db_name in _replica_failures:
+            print(f"  rejeu arrêté : {_replica_failures[db_name]}")
+        return
+    replicas = _db_settings(db_name).get("replicas", [])
+    if not replicas:
+        print(f"La base '{db_name}' n'a pas de suiveur et n'est pas une réplique.")
+        return
+    _ship_entries(db_name)  # nouvel essai pour les suiveurs en retard d'expédition
+    last = _last_journal_seq(db_name)
+    print(f"Primaire '{db_name}' : journal à l'entrée {last}, {len(replicas)} suiveur(s).")
+    for root in replicas:
+        target = os.path.join(root, db_name)
+        try:
+            with open(os.path.join(target, REPLICA_STATE), "r", encoding="utf-8") as f:
+                follower = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  {target} : inaccessible ({e})")
+            continue
+        behind, seconds = _replica_lag(follower, os.path.join(target, JOURNAL_FILE), last)
+        error = _replica_errors.get((db_name, root))
+        print(f"  {target} : appliquée {follower['applied_seq']}, expédiée {_replica_shipped.get((db_name, root), '?')}, "
+              f"retard {_format_lag(behind, seconds)}" + (f" | expédition en échec : {error}" if error else ""))
 
-    schema_cols = [c["name"] if isinstance(c, dict) else str(c) for c in schema]
-    
-    schema_map = {}
-    for c in schema:
-        if isinstance(c, dict):
-            schema_map[c["name"]] = c.get("type", "str")
-        else:
-            schema_map[str(c)] = "str"
 
-    # colonnes à afficher
-    all_columns = schema_cols
-    if not columns or columns == ["*"]:
-        columns = all_columns
-    else:
-        # vérifier existence
-        for col in columns:
-            if col not in all_columns:
-                print(f"Colonne '{col}' inexistante dans la table '{table_name}'.")
-                return
+# ---------- Requêtes préparées ----------
+prepared_statements: Dict[str, Dict[str, Any]] = {}  # nom -> plan
 
-    # analyse de conditions 
-    conditions = []
-    if where_clause and where_clause.strip():
-        parsed = _parse_where_clause(where_clause)
-        if parsed is None:
-            print("Impossible de parser la clause WHERE. Syntaxe attendue: col op value [and col2 op2 value2 ...]")
-            return
-        conditions = parsed
-
-    # filtrage des lignes
-    matched = []
-    for row in data:
-        ok = True
-        for (col, op, val_str) in conditions:
-            if col not in schema_map:
-                ok = False
-                break
-            if not _match_condition(row, schema_map, col, op, val_str):
-                ok = False
-                break
-        if ok:
-            matched.append(row)
+_SEARCH_RE = re.compile(r'\s*(?P<cols>[^ ]+)\s+from\s+(?P<table>[A-Za-z0-9_]+)(?:\s+where\s+(?P<where>.+?))?(?:\s+group\s+by\s+(?P<group>[^ ]+))?\s*$', flags=re.I)
 
-    # affichage tabulaire (comme select_table)
-    # print(f"\nRésultat de search {','.join(columns)} FROM {table_name}" + (f" WHERE {where_clause}" if where_clause else "") + " :")
-    if not matched:
-        print("(aucune ligne)")
-        return
 
-    col_widths = {col: max(len(col), max((len(str(r.get(col, ""))) for r in matched), default=0)) for col in columns}
-    header = " | ".join(col.ljust(col_widths[col]) for col in columns)
-    print("-" * len(header))
-    print(header)
-    print("-" * len(header))
-    for row in matched:
-        line = " | ".join(str(row.get(col, "")).ljust(col_widths[col]) for col in columns)
-        print(line)
-    print("-" * len(header))
-    print(f"({len(matched)} ligne{'s' if len(matched) > 1 else ''})\n")
+def _parse_search_command(rest):
+    """Analyse '<cols> from <table> [where ...] [group by c1,c2]' -> (colonnes, table, where, group_by) ou None."""
+    m = _SEARCH_RE.match(rest)
+    if not m:
+        return None
+    cols_txt = m.group("cols")
+    cols = [c.strip() for c in cols_txt.split(",")] if cols_txt != "*" else ["*"]
+    group_by = [g.strip() for g in m.group("group").split(",") if g.strip()] if m.group("group") else []
+    return cols, m.group("table"), (m.group("where") or "").strip(), group_by
+
+
+def prepare(name: str, query_txt: str) -> Optional[Dict[str, Any]]:
+    """
+    Prépare 'search <cols> from <table> [where ... ?]' sous le nom `name`.
+    L'analyse est faite une fois ; execute() ne fait que lier les paramètres.
+    """
+    query_txt = query_txt.strip()
+    m = re.match(r'(?i:search)\s+(?P<rest>.+)$', query_txt)
+    parsed = _parse_search_command(m.group("rest")) if m else None
+    if not parsed:
+        _fail("Syntaxe: prepare <nom> as search <col1,col2|*> from <table> [where <cond avec ?>]")
+        return None
+    cols, table, where_txt, group_by = parsed
+    try:
+        with _timed_stat("parse_s"):
+            tree = _parse_where_clause(where_txt) if where_txt else None
+    except ValueError as e:
+        _fail(f"Impossible de parser la clause WHERE ({e}).")
+        return None
+    plan = {
+        "name": name,
+        "text": query_txt,
+        "table": table,
+        "columns": cols,
+        "group_by": group_by,
+        "tree": tree,
+        "nparams": _count_params(tree),
+        "compiled": {},  # (base, schéma) -> (prédicat, binders)
+    }
+    prepared_statements[name] = plan
+    print(f"Requête '{name}' préparée ({plan['nparams']} paramètre(s)).")
+    return plan
+
+
+def execute(name: str, params=()):
+    """Exécute la requête préparée `name` avec les valeurs `params` (une par '?')."""
+    plan = prepared_statements.get(name)
+    if plan is None:
+        _fail(f"Requête préparée '{name}' introuvable.")
+        return None
+    params = list(params)
+    if len(params) != plan["nparams"]:
+        _fail(f"'{name}' attend {plan['nparams']} paramètre(s), {len(params)} fourni(s).")
+        return None
+    return _run_search(plan["table"], plan["columns"], plan["tree"], plan=plan, params=params, group_by=plan["group_by"])
+
+
+def deallocate(name: str) -> bool:
+    if prepared_statements.pop(name, None) is None:
+        _fail(f"Requête préparée '{name}' introuvable.")
+        return False
+    print(f"Requête '{name}' supprimée.")
+    return True
+
 
-# modification de valeur
-def alter_on_tables(table_name, where_clause):
+def _parse_execute_params(params_txt):
+    """'10, 'a b', null' -> ['10', 'a b', None]"""
+    params = []
+    tokens = _tokenize_where(params_txt) if params_txt.strip() else []
+    expect_value = True
+    for kind, value in tokens:
+        if expect_value and kind in ("str", "word"):
+            params.append(value)
+        elif expect_value and kind == "kw" and value == "null":
+            params.append(None)
+        elif expect_value and kind == "kw":
+            params.append(value)
+        elif not expect_value and (kind, value) == ("punct", ","):
+            pass
+        else:
+            raise ValueError(f"paramètre inattendu '{value}'")
+        expect_value = not expect_value
+    if tokens and expect_value:
+        raise ValueError("valeur manquante après ','")
+    return params
+
+
+def _parse_assignments(txt):
+    """"nom='a b', age=30, ville=null" -> {'nom': 'a b', 'age': '30', 'ville': None}"""
+    values = {}
+    tokens = _tokenize_where(txt) if txt.strip() else []
+    pos = 0
+    while pos < len(tokens):
+        chunk = tokens[pos:pos + 3]
+        if len(chunk) < 3 or chunk[0][0] != "word" or chunk[1] != ("op", "="):
+            raise ValueError("colonne=valeur attendu")
+        kind, value = chunk[2]
+        if kind == "kw" and value == "null":
+            value = None
+        elif kind not in ("str", "word", "kw"):
+            raise ValueError(f"valeur attendue pour '{chunk[0][1]}'")
+        values[chunk[0][1]] = value
+        pos += 3
+        if pos < len(tokens):
+            if tokens[pos] != ("punct", ",") or pos + 1 == len(tokens):
+                raise ValueError(f"',' attendu après '{chunk[0][1]}'")
+            pos += 1
+    if not values:
+        raise ValueError("aucune valeur")
+    return values
+
+
+# modification de valeur (assignments : {colonne: valeur brute} de 'update ... set', sans prompt)
+def alter_on_tables(table_name, where_clause, assignments=None):
     if not ensure_db_selected():
         return
 
         # permission : modification des données (bulk update)
     if not require_permission(current_db, "write"):
         return
+    if _reject_view_write(table_name):
+        return
 
 
     schema_path = os.path.join(DB_ROOT, current_db, f"{table_name}_schema.json")
-    data_path = os.path.join(DB_ROOT, current_db, f"{table_name}_data.json")
 
     if not os.path.exists(schema_path):
-        print(f"La table '{table_name}' n'existe pas.")
+        _fail(f"La table '{table_name}' n'existe pas.")
         return
 
     # Charger schema et données
@@ -1040,17 +5734,22 @@ def alter_on_tables(table_name, where_clause):
         with open(schema_path, "r", encoding="utf-8") as f:
             schema = json.load(f)
     except Exception as e:
-        print("Impossible de lire le schema :", e)
+        _fail("Impossible de lire le schema :", e)
         return
+    meta = _load_table_meta(table_name)
     try:
-        with open(data_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if not isinstance(data, list):
-                print("Format de données invalide.")
-                return
+        parts = _load_partitions(table_name, meta)
     except Exception as e:
-        print("Impossible de lire les données :", e)
+        _fail("Impossible de lire les données :", e)
         return
+    # lignes à plat + partition d'origine de chaque ligne
+    data = []
+    owner = []
+    for pid, part_rows in parts:
+        data.extend(part_rows)
+        owner.extend([pid] * len(part_rows))
+    changed_rows = set()
+    old_versions = {}  # index -> ligne avant modification (maintenance des vues)
 
     schema_map = {}
     schema_order = []
@@ -1062,32 +5761,49 @@ def alter_on_tables(table_name, where_clause):
             schema_map[str(c)] = {"name": str(c), "type": "str"}
             schema_order.append(str(c))
 
+    # update ... set : valeurs converties une fois, appliquées à toutes les lignes trouvées
+    new_values = None
+    if assignments is not None:
+        new_values = {}
+        for col_name, raw in assignments.items():
+            col_def = schema_map.get(col_name)
+            if col_def is None:
+                _fail(f"Colonne '{col_name}' inexistante dans la table '{table_name}'.")
+                return
+            if col_def.get("auto_increment"):
+                _fail(f"{col_name} est AUTO_INCREMENT — modification interdite.")
+                return
+            try:
+                new_values[col_name] = None if raw is None else serializable_value(convert_input_to_type(raw, col_def.get("type", "str")))
+            except Exception as e:
+                _fail(f"Valeur invalide pour {col_name} (type {col_def.get('type', 'str')}) : {e}")
+                return
+            if col_def.get("not_null") and new_values[col_name] in (None, ""):
+                _fail(f"Violation NOT NULL pour '{col_name}' — aucune ligne modifiée.")
+                return
+
     # condition de where 
     if where_clause and where_clause.strip():
-        conds = _parse_where_clause(where_clause)
-        if conds is None:
-            print("Impossible de parser la clause WHERE. Syntaxe invalide.")
+        try:
+            with _timed_stat("parse_s"):
+                predicate = _build_where_predicate(where_clause, {k: v.get("type","str") for k,v in schema_map.items()})
+        except ValueError as e:
+            _fail(f"Impossible de parser la clause WHERE ({e}).")
             return
     else:
-        ok = input("Aucune condition fournie — modifier toutes les lignes ? (oui/non) : ").strip().lower()
-        if ok not in ("oui","o","yes","y"):
-            print("Annulé.")
-            return
-        conds = []
+        if new_values is None:
+            ok = _ask("Aucune condition fournie — modifier toutes les lignes ? (oui/non) : ").strip().lower()
+            if ok not in ("oui","o","yes","y"):
+                _fail("Annulé.")
+                return
+        predicate = lambda row: True
 
     # Trouver indices des lignes correspondantes
-    matched_indices = []
-    for idx, row in enumerate(data):
-        ok = True
-        for col, op, val in conds:
-            if col not in schema_map:
-                ok = False
-                break
-            if not _match_condition(row, {k: v.get("type","str") for k,v in schema_map.items()}, col, op, val):
-                ok = False
-                break
-        if ok:
-            matched_indices.append(idx)
+    with _timed_stat("filter_s"):
+        matched_indices = [idx for idx, row in enumerate(data) if predicate(row)]
+    _stat_add("rows_scanned", len(data))
+    _stat_add("rows_matched", len(matched_indices))
+    _stat_set("access_path", "scan complet")
 
     if not matched_indices:
         print("Aucune ligne trouvée pour la condition donnée.")
@@ -1109,6 +5825,16 @@ def alter_on_tables(table_name, where_clause):
     # Pour chaque ligne correspondante, proposer modifications
     for i, row_idx in enumerate(matched_indices, start=1):
         row = data[row_idx]
+        if new_values is not None:
+            before = dict(row)
+            for col_name, candidate in new_values.items():
+                if schema_map[col_name].get("unique") and unique_conflict(col_name, candidate, row_idx):
+                    _fail(f"Violation UNIQUE: la valeur {candidate} existe déjà dans '{col_name}' — aucune ligne modifiée.")
+                    return
+                row[col_name] = candidate
+            old_versions[row_idx] = before
+            changed_rows.add(row_idx)
+            continue
         print("\n" + "="*40)
         print(f"Ligne {i} (index interne {row_idx}):")
         
@@ -1117,13 +5843,13 @@ def alter_on_tables(table_name, where_clause):
         print("="*40)
 
         # Confirmation de modification 
-        mod = input("Modifier cette ligne ? 'n' pour passer à la suivante ou quitter. (o/n) : ").strip().lower()
+        mod = _ask("Modifier cette ligne ? 'n' pour passer à la suivante ou quitter. (o/n) : ").strip().lower()
         if mod not in ("o","oui","y","yes","1"):
             print("Passé.")
             continue
 
         # Choix : modification 
-        cols_choice = input("Modifier (all = toutes colonnes, liste séparée par ,) : ").strip()
+        cols_choice = _ask("Modifier (all = toutes colonnes, liste séparée par ,) : ").strip()
         if cols_choice.lower() in ("all","*","allcols"):
             cols_to_edit = [c for c in schema_order]
         else:
@@ -1137,6 +5863,7 @@ def alter_on_tables(table_name, where_clause):
 
         # Pour chaque colonne demandée, faire le prompt et validation
         row_changed = False
+        before = dict(row)
         for col_name in cols_to_edit:
             col_def = schema_map[col_name]
             col_type = col_def.get("type","str")
@@ -1147,7 +5874,7 @@ def alter_on_tables(table_name, where_clause):
 
             current_val = row.get(col_name)
             print(f"Valeur actuelle de {col_name} ({col_type}) : {current_val}")
-            new_raw = input(f"Nouveau {col_name} (laisser vide pour ne pas changer, 'NULL' pour None): ").strip()
+            new_raw = _ask(f"Nouveau {col_name} (laisser vide pour ne pas changer, 'NULL' pour None): ").strip()
 
             if new_raw == "":
                 continue
@@ -1178,40 +5905,63 @@ def alter_on_tables(table_name, where_clause):
 
         if row_changed:
             # écrire la mise à jour dans data (déjà modifié in-place)
+            if row_idx not in changed_rows:
+                old_versions[row_idx] = before
+            changed_rows.add(row_idx)
             print("Ligne mise à jour.")
         else:
             print("Aucune modification appliquée à cette ligne.")
 
-    # Après toutes les modifications, sauvegarder
+    if not changed_rows:
+        print("\nAucune modification — rien à sauvegarder.")
+        return
+
+    # Partitions touchées (une ligne dont la clé de partition change est déplacée)
+    types = {k: v.get("type", "str") for k, v in schema_map.items()}
+    dirty = set()
+    for idx in changed_rows:
+        dirty.add(owner[idx])
+        owner[idx] = _partition_of_row(meta, types, data[idx])
+        dirty.add(owner[idx])
+
+    # Après toutes les modifications, sauvegarder (seulement les partitions modifiées)
     try:
-        with open(data_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+        for pid in sorted(dirty, key=lambda p: -1 if p is None else p):
+            _save_partition(table_name, meta, pid, [row for row, o in zip(data, owner) if o == pid])
         print("\nSauvegarde terminée. Modifications enregistrées.")
     except Exception as e:
-        print("Erreur lors de la sauvegarde :", e)
+        _fail("Erreur lors de la sauvegarde :", e)
+        return
+    changed = sorted(changed_rows)
+    _notify_row_changes(table_name, [old_versions[i] for i in changed], [data[i] for i in changed])
 
 
 # ---------- Gestion des utilisateurs & droits (stockage : databases/users.json) ----------
 def write_json_atomic(path: str, obj):
     """
-    Écriture atomique : écrire dans un fichier .tmp puis os.replace
+    Écriture atomique : écrire dans un fichier .tmp puis os.replace (toujours avec fsync)
     """
-    tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as fh:
+    with _open_for_write(path, level="full") as fh:
         json.dump(obj, fh, indent=2, ensure_ascii=False)
-        fh.flush()
-        os.fsync(fh.fileno())
-    os.replace(tmp, path)
+
+_users_cache: Dict[str, Any] = {}  # chemin -> (empreinte du fichier, utilisateurs)
+
 
 def load_users() -> Dict[str, Any]:
-    """Charge la table users depuis USERS_PATH (retourne {} si absent)."""
-    if not os.path.exists(USERS_PATH):
+    """Charge la table users depuis USERS_PATH (retourne {} si absent) ; copie modifiable."""
+    stamp = _file_stamp(USERS_PATH)
+    if stamp is None:
         return {}
+    cached = _users_cache.get(USERS_PATH)
+    _cache_access("users", cached is not None and cached[0] == stamp)
+    if cached is not None and cached[0] == stamp:
+        return copy.deepcopy(cached[1])
     try:
         with open(USERS_PATH, "r", encoding="utf-8") as f:
             data = json.load(f)
             if isinstance(data, dict):
-                return data
+                _users_cache[USERS_PATH] = (stamp, data)
+                return copy.deepcopy(data)
     except Exception:
         pass
     return {}
@@ -1223,6 +5973,7 @@ def save_users(users: Dict[str, Any]):
 
 def _hash_password(password: str) -> str:
     """Hash simple SHA-256 (pour prototype). Utilise sel+KDF en prod."""
+    import hashlib
     return hashlib.sha256(password.encode("utf-8")).hexdigest()
 
 # -------- CRUD Utilisateurs --------
@@ -1233,7 +5984,7 @@ def create_user(username: str, password: str, attrs: Optional[Dict[str, Any]] =
     """
     users = load_users()
     if username in users:
-        print(f"Utilisateur '{username}' existe déjà.")
+        _fail(f"Utilisateur '{username}' existe déjà.")
         return False
     users[username] = {
         "password_hash": _hash_password(password),
@@ -1258,7 +6009,7 @@ def update_user_attrs(username: str, attrs: Dict[str, Any]) -> bool:
     users = load_users()
     u = users.get(username)
     if not u:
-        print(f"Utilisateur '{username}' introuvable.")
+        _fail(f"Utilisateur '{username}' introuvable.")
         return False
     u_attrs = u.get("attrs", {})
     u_attrs.update(attrs)
@@ -1273,7 +6024,7 @@ def update_user_password(username: str, new_password: str) -> bool:
     users = load_users()
     u = users.get(username)
     if not u:
-        print(f"Utilisateur '{username}' introuvable.")
+        _fail(f"Utilisateur '{username}' introuvable.")
         return False
     u["password_hash"] = _hash_password(new_password)
     users[username] = u
@@ -1285,7 +6036,7 @@ def delete_user(username: str) -> bool:
     """Supprime un utilisateur."""
     users = load_users()
     if username not in users:
-        print(f"Utilisateur '{username}' introuvable.")
+        _fail(f"Utilisateur '{username}' introuvable.")
         return False
     del users[username]
     save_users(users)
@@ -1305,7 +6056,7 @@ def grant_rights(username: str, db_name: str, rights: List[str]) -> bool:
 
     # Vérifier qu'un utilisateur est connecté
     if current_user is None:
-        print("Permission refusée : aucun utilisateur connecté.")
+        _fail("Permission refusée : aucun utilisateur connecté.")
         return False
 
     # Seul un administrateur (scope db_name ou global '*') peut accorder des droits
@@ -1313,16 +6064,16 @@ def grant_rights(username: str, db_name: str, rights: List[str]) -> bool:
     # autoriser si current_user a 'admin' sur db_name OU sur '*' (global admin)
     try:
         if not (check_permission(current_user, db_name, "admin") or check_permission(current_user, "*", "admin")):
-            print(f"Permission refusée : seul un administrateur peut accorder des droits sur '{db_name}'.")
+            _fail(f"Permission refusée : seul un administrateur peut accorder des droits sur '{db_name}'.")
             return False
     except Exception:
-        print("Permission refusée (erreur lors de la vérification des permissions).")
+        _fail("Permission refusée (erreur lors de la vérification des permissions).")
         return False
 
     users = load_users()
     u = users.get(username)
     if not u:
-        print(f"Utilisateur '{username}' introuvable.")
+        _fail(f"Utilisateur '{username}' introuvable.")
         return False
     rmap = u.setdefault("rights", {})
     cur = set(rmap.get(db_name, []))
@@ -1338,7 +6089,7 @@ def revoke_rights(username: str, db_name: str, rights: List[str]) -> bool:
     users = load_users()
     u = users.get(username)
     if not u:
-        print(f"Utilisateur '{username}' introuvable.")
+        _fail(f"Utilisateur '{username}' introuvable.")
         return False
     rmap = u.setdefault("rights", {})
     cur = set(rmap.get(db_name, []))
@@ -1393,8 +6144,8 @@ def set_current_user(username: Optional[str]):
 
 # -------- Utilitaires CLI (optionnels) --------
 def cli_create_user():
-    name = input("username = ").strip()
-    pwd = input("password = ").strip()
+    name = _ask("username = ").strip()
+    pwd = _ask("password = ").strip()
     create_user(name, pwd)
 
 def cli_list_users():
@@ -1410,17 +6161,19 @@ def require_permission(db_name, perm):
     # si tu veux permettre l'administration sans login, adapte ici
     global current_user
     if current_user is None:
-        print("Permission refusée : aucun utilisateur connecté.")
+        _fail("Permission refusée : aucun utilisateur connecté.")
         return False
     # check_permission doit exister dans ton code (défini précédemment)
     try:
         ok = check_permission(current_user, db_name, perm)
     except Exception:
         # si check_permission absent ou erreur, refuser par sécurité
-        print("Permission refusée (erreur de vérification).")
+        _fail("Permission refusée (erreur de vérification).")
         return False
     if not ok:
-        print(f"Permission refusée : l'utilisateur '{current_user}' n'a pas le droit '{perm}' sur la base '{db_name}'.")
+        _fail(f"Permission refusée : l'utilisateur '{current_user}' n'a pas le droit '{perm}' sur la base '{db_name}'.")
+        return False
+    if perm != "read" and _reject_replica_write(db_name):
         return False
     return True
 
@@ -1436,7 +6189,7 @@ def change_user_password(target_username: str, new_password: str = None) -> bool
     global current_user
 
     if current_user is None:
-        print("Action refusée : aucun utilisateur connecté.")
+        _fail("Action refusée : aucun utilisateur connecté.")
         return False
 
     # autorisation : soit self, soit admin global
@@ -1449,19 +6202,19 @@ def change_user_password(target_username: str, new_password: str = None) -> bool
         is_admin = False
 
     if not (is_self or is_admin):
-        print("Permission refusée : vous n'êtes pas autorisé à changer le mot de passe de cet utilisateur.")
+        _fail("Permission refusée : vous n'êtes pas autorisé à changer le mot de passe de cet utilisateur.")
         return False
 
     # demander le mot de passe si non fourni
     if new_password is None:
         # demander deux fois pour confirmation
-        p1 = input("Nouveau mot de passe : ").strip()
-        p2 = input("Confirmer le nouveau mot de passe : ").strip()
+        p1 = _ask("Nouveau mot de passe : ").strip()
+        p2 = _ask("Confirmer le nouveau mot de passe : ").strip()
         if p1 != p2:
-            print("Les mots de passe ne correspondent pas. Abandon.")
+            _fail("Les mots de passe ne correspondent pas. Abandon.")
             return False
         if p1 == "":
-            print("Mot de passe vide non autorisé. Abandon.")
+            _fail("Mot de passe vide non autorisé. Abandon.")
             return False
         new_password = p1
 
@@ -1469,7 +6222,7 @@ def change_user_password(target_username: str, new_password: str = None) -> bool
     users = load_users()
     u = users.get(target_username)
     if not u:
-        print(f"Utilisateur '{target_username}' introuvable.")
+        _fail(f"Utilisateur '{target_username}' introuvable.")
         return False
 
     u["password_hash"] = _hash_password(new_password)
@@ -1487,9 +6240,9 @@ def cli_change_password():
     """
     global current_user
     if current_user is None:
-        print("Aucun utilisateur connecté. Connectez-vous ou contactez un administrateur.")
+        _fail("Aucun utilisateur connecté. Connectez-vous ou contactez un administrateur.")
         return
-    target = input("Utilisateur à mettre à jour (laisser vide = vous) : ").strip()
+    target = _ask("Utilisateur à mettre à jour (laisser vide = vous) : ").strip()
     if not target:
         target = current_user
     change_user_password(target)
@@ -1501,8 +6254,10 @@ def help():
     print("Commandes disponibles :")
     print(" create_db <nom>")
     print(" use <nom>")
-    print(" create_table <nom>")
+    print(" create_table <nom> [partition by hash(col) N | partition by range(col) b1,b2,...]")
+    print(" create_table <nom> (col:type [not null] [unique] [auto_increment] [default v], ...) [partition by ...]")
     print(" insert <table>")
+    print(" insert <table> col=valeur, col='texte', ...   -> insertion sans prompt")
     print(" select <col1,col2,...> from <table>  ")
     print(" select * from <table>")
     print(" show_db")
@@ -1512,8 +6267,38 @@ def help():
     print(" describe_table <nom>")
     print(" exit")
     print(" alter_table <nom> ")
-    print(" search <col1,col2|*> from <table> [where <cond>]")
+    print(" rewrite <table>                   -> applique physiquement les changements de schéma (alter_table)")
+    print(" analyze <table>                   -> statistiques, zone maps par segment, encodage par dictionnaire des str peu variées")
+    print(" create_index <table> <col> [trigram] -> index trié (=, <, >, between, in, like 'abc%')")
+    print("                                      ou trigrammes sur une colonne str (like '%abc%')")
+    print(" drop_index <table> <col> [trigram]   -> supprime l'index")
+    print(" compress <table> <zlib|lzma|none> [niveau] -> fichiers de données compressés par blocs")
+    print(" durability [off|normal|full]      -> écritures atomiques de la base : sans fsync / fsync au checkpoint / fsync à chaque écriture")
+    print(" checkpoint                        -> synchronise sur disque les écritures en attente de fsync")
+    print(" writeback [on|off] [delay=S] [max_rows=N] [min_free_mb=N] -> écritures différées par un thread (vidées à use / exit)")
+    print(" flush                             -> écrit tout de suite les tables modifiées en attente")
+    print(" timing [on|off]                   -> temps (analyse, filtrage, affichage), octets lus/écrits, lignes après chaque commande")
+    print(" slowlog [top=N] | threshold=<ms>|off | clear -> requêtes lentes (databases/slow_queries.jsonl), pires en premier")
+    print(" metrics [serve [port] | stop]      -> métriques au format Prometheus (serve : http://127.0.0.1:9464/metrics)")
+    print(" profile [top=N] [save=f.prof] <commande ...> -> exécute la commande sous cProfile / tracemalloc")
+    print(" search <col1,col2|*> from <table> [where <cond>] [group by <col1,col2>]")
+    print("           colonnes : col, count(*), count(col), sum(col), avg(col), min(col), max(col)")
+    print("           <cond> : col op valeur (=, !=, <, >, <=, >=, like), and / or / not, ( ... ),")
+    print("                    col [not] in (v1, v2), col [not] between a and b, col is [not] null, 'valeur avec espaces'")
+    print("                    like : motif entier, insensible à la casse, % = suite quelconque ('ra%', '%to', '%ak%')")
+    print(" export <table | search ...> to <fichier> [format jsonl|csv] -> export en flux du résultat")
+    print(" backup <db> <répertoire>         -> sauvegarde incrémentale (fichiers inchangés liés) ; active le journal")
+    print(" restore <db> [--at <date>] [from <répertoire>] -> état à une date : sauvegarde + rejeu du journal")
+    print(" replica add|remove <db> <racine> -> suiveur en lecture seule dans <racine>/<db> (journal expédié)")
+    print(" replica status [db]              -> retard de la réplique courante ou des suiveurs d'un primaire")
     print(" alter_on_tables <table> [where <cond>]")
+    print(" update <table> set col=valeur, ... [where <cond>]   -> modification sans prompt")
+    print(" prepare <nom> as search <cols> from <table> [where <cond avec ?>]")
+    print(" execute <nom> [v1, v2, ...]       -> exécute une requête préparée (une valeur par '?')")
+    print(" deallocate <nom>")
+    print(" parallel [on|off|auto] [workers=N] [chunk=N] [threshold=N]  -> scan parallèle des grosses tables")
+    print(" create materialized view <nom> as search <cols> from <table> [where <cond>] [group by <cols>]")
+    print(" refresh [materialized view] <nom>  -> recalcul complet d'une vue matérialisée")
     print(" user_create")
     print(" user_list")
     print(" user_delete <name>")
@@ -1528,139 +6313,399 @@ def help():
     print("           - admin          : droit administratif global (ou par base) — autorise tout, ainsi que la gestion des grants")
     print("           - manage_users   : (optionnel) création/suppression/modification d'utilisateurs (si tu veux séparer du 'admin') ")
     print(" user_revoke <user> <db> <right1,right2,...>")
-    print(" login <user>")
+    print(" login <user> [password]")
     print(" logout")
     print(" user_password [username]      -> change le mot de passe (soi-même ou, si admin, celui d’un autre)")
     print("======================")
 
 
 
-def prompt():
-    global current_db
-    print("Bienvenue sur Mini SGBD JSON. Tapez 'help' pour une aide.")
-    
-    while True:
-        prefix = current_db if current_db else "no-db"
-        cmd = input(f"{prefix}> ").strip().split()
+# ---------- Mode script : python main.py -f script.sql | -c "commande" ----------
+class BatchInputError(EOFError):
+    """Une commande attend une valeur que le script ne fournit pas."""
 
-        if not cmd:
-            continue
 
-        command = cmd[0]
-        args = cmd[1:]
+BATCH = {"active": False}
+_batch_answers = collections.deque()  # réponses en ligne ('> valeur') de la commande en cours
 
-        if command == "exit":
-            print("Fin de session.")
-            break
 
-        # Partie db
-        elif command == "create_db" and len(args) == 1:
-            create_db(args[0])
-        elif command == "show_db":
-            list_dbs()
-        elif command == "delete_db" and len(args) == 1:
-            delete_db(args[0])
-        elif command == "use" and len(args) == 1:
-            use_db(args[0])
-
-        # Partie table
-        elif command == "show_tables":
-            list_tables()
-        elif command == "delete_table" and len(args) == 1:
-            delete_table(args[0])
-        elif command == "describe_table" and len(args) >= 1:
-            describe_table(args[0])
-        elif command == "alter_table" and len(args) == 1:
-            alter_table(args[0])
-
-        elif command == "create_table" and len(args) == 1:
-            create_table(args[0])
-        elif command == "insert" and len(args) == 1:
-            insert_data(args[0])
-        elif command == "select" and len(args) >= 3:
+def _ask(label):
+    """input() des commandes ; en mode script, réponse suivante donnée en ligne, sinon échec."""
+    if not BATCH["active"]:
+        return input(label)
+    if not _batch_answers:
+        raise BatchInputError(f"valeur attendue pour « {label.strip()} »")
+    answer = _batch_answers.popleft()
+    secret = "password" in label or "mot de passe" in label
+    print(f"{label}{'*' * 8 if secret else answer}")
+    return answer
+
+
+def _parse_script(text, source):
+    """Texte d'un script -> [(source, ligne, commande, [réponses])] ; '#' et '--' : commentaires."""
+    commands = []
+    for lineno, raw in enumerate(text.splitlines(), start=1):
+        line = raw.strip()
+        if not line or line.startswith(("#", "--")):
+            continue
+        if line.startswith(">"):
+            if not commands:
+                raise ValueError(f"{source}:{lineno} : réponse sans commande")
+            commands[-1][3].append(line[1:].strip())
+        else:
+            commands.append((source, lineno, line, []))
+    return commands
+
+
+def run_script(sources, keep_going=False):
+    """
+    Exécute sans prompt les commandes de [(nom, texte)] : chaque valeur qu'une commande demande
+    est prise dans les lignes '> valeur' qui la suivent. Tout est analysé avant la première
+    commande ; arrêt au premier échec sauf keep_going. Retourne le nombre de commandes en échec.
+    """
+    try:
+        commands = [c for name, text in sources for c in _parse_script(text, name)]
+    except ValueError as e:
+        print(f"Script invalide — {e}.")
+        return 1
+    failures = 0
+    exited = False
+    BATCH["active"] = True
+    try:
+        for source, lineno, line, answers in commands:
+            _batch_answers.clear()
+            _batch_answers.extend(answers)
+            print(f"{current_db or 'no-db'}> {line}")
+            reason = None  # cause non encore affichée par la commande
             try:
-                if "from" not in args:
-                    print("Syntaxe : select <colonnes> from <table>")
-                    continue
+                exited = not run_command(line)
+                stats = _stats_history[-1]
+                failed = bool(stats["error"] or stats["invalid"])
+            except Exception as e:
+                failed, reason = True, f"erreur inattendue ({type(e).__name__}: {e})"
+            if not failed and _batch_answers:
+                failed, reason = True, f"{len(_batch_answers)} réponse(s) non utilisée(s)"
+            if failed:
+                failures += 1
+                print(f"{source}:{lineno} : échec de '{line}'" + (f" — {reason}" if reason else ""))
+                if not keep_going:
+                    break
+            if exited:
+                break
+    finally:
+        BATCH["active"] = False
+        _batch_answers.clear()
+        if not exited:
+            _shutdown()
+    return failures
+
+
+def main(argv=None):
+    """Point d'entrée : REPL sans argument, sinon exécution des scripts / commandes dans l'ordre donné."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mini SGBD JSON — REPL interactif ou exécution en lot.")
+    parser.add_argument("-f", "--file", dest="scripts", action="append", type=lambda v: ("-f", v),
+                        metavar="SCRIPT", help="fichier de commandes ('-' : entrée standard), répétable")
+    parser.add_argument("-c", "--command", dest="scripts", action="append", type=lambda v: ("-c", v),
+                        metavar="COMMANDE", help="commande(s) à exécuter, répétable")
+    parser.add_argument("-k", "--keep-going", action="store_true", help="continuer après une commande en échec")
+    args = parser.parse_args(argv)
+    if not args.scripts:
+        prompt()
+        return 0
+
+    sources = []
+    for kind, value in args.scripts:
+        if kind == "-c":
+            sources.append(("-c", value))
+            continue
+        try:
+            if value == "-":
+                sources.append(("<stdin>", sys.stdin.read()))
+            else:
+                with open(value, "r", encoding="utf-8") as f:
+                    sources.append((value, f.read()))
+        except OSError as e:
+            print(f"Impossible de lire le script '{value}' : {e}")
+            return 2
+    failures = run_script(sources, keep_going=args.keep_going)
+    if failures:
+        print(f"{failures} commande(s) en échec.")
+    return 1 if failures else 0
 
-                from_index = args.index("from")
-                cols = args[:from_index]
-                table = args[from_index + 1]
-                cols = " ".join(cols).replace(" ", "").split(",")
 
-                select_table(table, cols)
+def _shutdown():
+    """Fin de session : écritures différées, checkpoint, pool de scan, serveur de métriques."""
+    flush_writes()
+    checkpoint()
+    shutdown_scan_pool()
+    stop_metrics_server()
+
+
+def prompt():
+    print("Bienvenue sur Mini SGBD JSON. Tapez 'help' pour une aide.")
+
+    exited = False
+    try:
+        while True:
+            prefix = current_db if current_db else "no-db"
+            line = input(f"{prefix}> ").strip()
+            if not run_command(line):
+                exited = True  # 'exit' a déjà tout écrit
+                break
+    except (EOFError, KeyboardInterrupt):
+        print("\nFin de session.")
+    finally:
+        # Ctrl-D / Ctrl-C ou erreur : les écritures différées ne doivent pas être perdues
+        if not exited:
+            _shutdown()
+
+
+def run_command(line):
+    """Exécute une ligne de commande du REPL. Retourne False pour 'exit' (fin de session)."""
+    global _current_stats
+    cmd = line.split()
+    if not cmd:
+        return True
+    outer = _current_stats  # commande lancée par une autre (profile ...)
+    stats = _current_stats = _new_stats(line)
+    start = time.perf_counter()
+    try:
+        with _locked(_command_lock, "command"):
+            if cmd[0] != "replica" and _replica_state(current_db):
+                _catch_up_replica(current_db)
+            return _dispatch_command(line, cmd)
+    except BatchInputError as e:
+        _fail(f"Entrée manquante : {e} — donnez-la sur une ligne '> valeur' après la commande.")
+        return True
+    finally:
+        stats["total_s"] = time.perf_counter() - start
+        _current_stats = outer
+        _stats_history.append(stats)
+        for listener in list(_stats_listeners):
+            try:
+                listener(stats)
             except Exception as e:
-                print("Erreur de syntaxe ou d'exécution :", e)
-        elif command == "search":
-            rest = " ".join(args)
+                print(f"Relevé de commande non transmis ({e}).")
+        if TIMING["enabled"] and cmd[0] != "timing":
+            _print_stats(stats)
 
-            # regex de vérification 
-            m = re.match(r'\s*(?P<cols>[^ ]+)\s+from\s+(?P<table>[A-Za-z0-9_]+)(?:\s+where\s+(?P<where>.+))?$', rest, flags=re.I)
 
+def _dispatch_command(line, cmd):
+    command = cmd[0]
+    args = cmd[1:]
+    # reste brut de la ligne (conserve les espaces dans les valeurs entre quotes)
+    raw_rest = line[len(command):].strip()
+
+    if command == "exit":
+        _shutdown()
+        print("Fin de session.")
+        return False
+
+    # Partie db
+    elif command == "create_db" and len(args) == 1:
+        create_db(args[0])
+    elif command == "show_db":
+        list_dbs()
+    elif command == "delete_db" and len(args) == 1:
+        delete_db(args[0])
+    elif command == "use" and len(args) == 1:
+        use_db(args[0])
+
+    # Partie table
+    elif command == "show_tables":
+        list_tables()
+    elif command == "delete_table" and len(args) == 1:
+        delete_table(args[0])
+    elif command == "describe_table" and len(args) >= 1:
+        describe_table(args[0])
+    elif command == "alter_table" and len(args) == 1:
+        alter_table(args[0])
+    elif command == "rewrite" and len(args) == 1:
+        rewrite_table(args[0])
+    elif command == "analyze" and len(args) == 1:
+        analyze_table(args[0])
+    elif command == "durability" and len(args) <= 1:
+        set_durability(args[0] if args else None)
+    elif command == "checkpoint" and not args:
+        checkpoint(verbose=True)
+    elif command == "writeback":
+        set_writeback(args)
+    elif command == "profile":
+        profile_command(raw_rest)
+    elif command == "metrics":
+        metrics_command(args)
+    elif command == "slowlog":
+        slowlog(args)
+    elif command == "timing" and len(args) <= 1:
+        set_timing(args[0] if args else None)
+    elif command == "flush" and not args:
+        print(f"{flush_writes()} partition(s) écrite(s).")
+    elif command == "compress" and len(args) in (2, 3):
+        compress_table(args[0], args[1], args[2] if len(args) == 3 else None)
+    elif command in ("create_index", "drop_index") and len(args) in (2, 3):
+        if len(args) == 3 and args[2].lower() != "trigram":
+            _fail(f"Type d'index inconnu '{args[2]}' (trigram attendu).")
+            return True
+        kind = "trigram" if len(args) == 3 else "sorted"
+        (create_index if command == "create_index" else drop_index)(args[0], args[1], kind)
+
+    elif command == "create_table" and len(args) >= 1:
+        m = re.match(r'^(?P<table>[A-Za-z0-9_]+)(?:\s*\((?P<cols>.*?)\))?(?:\s+partition\s+by\s+(?P<spec>.+))?$', raw_rest, flags=re.I)
+        if not m:
+            _fail("Syntaxe: create_table <nom> [(col:type [not null] [unique] [auto_increment] [default v], ...)] [partition by hash(col) N | partition by range(col) b1,b2,...]")
+        else:
+            try:
+                columns = parse_schema_input(m.group("cols")) if m.group("cols") is not None else None
+            except ValueError as e:
+                _fail(f"Schéma invalide ({e}).")
+                return True
+            create_table(m.group("table"), m.group("spec"), columns)
+    elif command == "insert" and len(args) == 1:
+        insert_data(args[0])
+    elif command == "insert" and len(args) > 1:
+        try:
+            values = _parse_assignments(raw_rest[len(args[0]):])
+        except ValueError as e:
+            _fail(f"Valeurs invalides ({e}) — syntaxe : insert <table> col=valeur, col='texte', ...")
+            return True
+        insert_rows(args[0], [values])
+    elif command == "update":
+        m = re.match(r'(?P<table>[A-Za-z0-9_]+)\s+set\s+(?P<set>.+?)(?:\s+where\s+(?P<where>.+))?$', raw_rest, flags=re.I)
+        try:
             if not m:
-                print("Syntaxe: search <col1,col2|*> from <table> [where <cond>]")
-            else:
-                cols_txt = m.group("cols")
-                table = m.group("table")
-                where_txt = m.group("where") or ""
-                cols = [c.strip() for c in cols_txt.split(",")] if cols_txt != "*" else ["*"]
-                search_table(table, cols, where_txt)
-        elif command == "alter_on_table":
-            rest = " ".join(args)
-            
-            m = re.match(r'\s*(?P<table>[A-Za-z0-9_]+)(?:\s+where\s+(?P<where>.+))?$', rest, flags=re.I)
-            if not m:
-                print("Syntaxe: alter_on_tables <table> [where <cond>]")
-            else:
-                table = m.group("table")
-                where_txt = m.group("where") or ""
-                alter_on_tables(table, where_txt)
-
-        # Gestion d'utilisateur
-        elif command == "user_create":
-            cli_create_user()
-        elif command == "user_list":
-            cli_list_users()
-        elif command == "user_delete" and len(args)==1:
-            delete_user(args[0])
-        elif command == "user_grant" and len(args)==3:
-            user, db, rights_txt = args
-            rights = [r.strip() for r in rights_txt.split(",") if r.strip()]
-            grant_rights(user, db, rights)
-        elif command == "user_revoke" and len(args)==3:
-            user, db, rights_txt = args
-            rights = [r.strip() for r in rights_txt.split(",") if r.strip()]
-            revoke_rights(user, db, rights)
-        elif command == "login" and len(args)==1:
-            pwd = input("password = ")
-            if authenticate_user(args[0], pwd):
-                set_current_user(args[0])
-            else:
-                print("Authentification échouée.")
-        elif command == "logout":
-            set_current_user(None)
-
-            # --- Changer le mot de passe d’un utilisateur ---
-        elif command == "user_password":
-            # Si un nom d’utilisateur est donné, on l’utilise
-            if len(args) >= 1:
-                target = args[0]
-            else:
-                target = current_user
-    
-            if target is None:
-                print("❌ Aucun utilisateur connecté — veuillez vous connecter d’abord.")
-                continue
-    
-            change_user_password(target)
-        
+                raise ValueError("syntaxe")
+            assignments = _parse_assignments(m.group("set"))
+        except ValueError as e:
+            _fail(f"Syntaxe: update <table> set col=valeur, ... [where <cond>] ({e}).")
+            return True
+        alter_on_tables(m.group("table"), m.group("where") or "", assignments)
+    elif command == "select" and len(args) >= 3:
+        try:
+            if "from" not in args:
+                _fail("Syntaxe : select <colonnes> from <table>")
+                return True
+
+            from_index = args.index("from")
+            cols = args[:from_index]
+            table = args[from_index + 1]
+            cols = " ".join(cols).replace(" ", "").split(",")
+
+            select_table(table, cols)
+        except Exception as e:
+            _fail("Erreur de syntaxe ou d'exécution :", e)
+    elif command == "search":
+        # regex de vérification 
+        parsed = _parse_search_command(raw_rest)
+
+        if not parsed:
+            _fail("Syntaxe: search <col1,col2|*> from <table> [where <cond>] [group by <col1,col2>]")
+        else:
+            cols, table, where_txt, group_by = parsed
+            search_table(table, cols, where_txt, group_by)
+    elif command == "export":
+        m = re.match(r'(?P<source>.+?)\s+to\s+(?P<path>\S+)(?:\s+format\s+(?P<fmt>\S+))?$', raw_rest, flags=re.I)
+        if not m:
+            _fail("Syntaxe: export <table | search ...> to <fichier> [format jsonl|csv]")
+        else:
+            export_rows(m.group("source"), m.group("path"), m.group("fmt"))
+    elif command == "backup" and len(args) == 2:
+        backup_db(args[0], args[1])
+    elif command == "restore" and len(args) >= 1:
+        m = re.match(r'(?P<db>[A-Za-z0-9_]+)(?:\s+--at\s+(?P<at>.+?))?(?:\s+from\s+(?P<dest>\S+))?$', raw_rest, flags=re.I)
+        if not m:
+            _fail("Syntaxe: restore <db> [--at <AAAA-MM-JJ HH:MM:SS>] [from <répertoire>]")
+        else:
+            restore_db(m.group("db"), m.group("at"), m.group("dest"))
+    elif command == "replica" and len(args) == 3 and args[0] in ("add", "remove"):
+        (replica_add if args[0] == "add" else replica_remove)(args[1], args[2])
+    elif command == "replica" and 1 <= len(args) <= 2 and args[0] == "status":
+        replica_status(args[1] if len(args) == 2 else None)
+    elif command == "prepare":
+        m = re.match(r'(?P<name>[A-Za-z0-9_]+)\s+as\s+(?P<query>.+)$', raw_rest, flags=re.I)
+        if not m:
+            _fail("Syntaxe: prepare <nom> as search <col1,col2|*> from <table> [where <cond avec ?>]")
+        else:
+            prepare(m.group("name"), m.group("query"))
+    elif command == "execute" and len(args) >= 1:
+        try:
+            params = _parse_execute_params(raw_rest[len(args[0]):])
+        except ValueError as e:
+            _fail(f"Paramètres invalides ({e}).")
+            return True
+        execute(args[0], params)
+    elif command == "deallocate" and len(args) == 1:
+        deallocate(args[0])
+    elif command == "parallel":
+        set_parallel_scan(args)
+    elif command == "create" and [a.lower() for a in args[:2]] == ["materialized", "view"]:
+        m = re.match(r'(?i:materialized)\s+(?i:view)\s+(?P<name>[A-Za-z0-9_]+)\s+(?i:as)\s+(?P<query>.+)$', raw_rest)
+        if not m:
+            _fail("Syntaxe: create materialized view <nom> as search <cols> from <table> [where <cond>] [group by <cols>]")
+        else:
+            create_materialized_view(m.group("name"), m.group("query"))
+    elif command == "refresh" and len(args) >= 1:
+        # refresh <vue> | refresh materialized view <vue>
+        refresh_materialized_view(args[-1])
+    elif command == "alter_on_table":
+        rest = raw_rest
         
-        elif command == "help":
-            help()
+        m = re.match(r'\s*(?P<table>[A-Za-z0-9_]+)(?:\s+where\s+(?P<where>.+))?$', rest, flags=re.I)
+        if not m:
+            _fail("Syntaxe: alter_on_tables <table> [where <cond>]")
+        else:
+            table = m.group("table")
+            where_txt = m.group("where") or ""
+            alter_on_tables(table, where_txt)
+
+    # Gestion d'utilisateur
+    elif command == "user_create":
+        cli_create_user()
+    elif command == "user_list":
+        cli_list_users()
+    elif command == "user_delete" and len(args)==1:
+        delete_user(args[0])
+    elif command == "user_grant" and len(args)==3:
+        user, db, rights_txt = args
+        rights = [r.strip() for r in rights_txt.split(",") if r.strip()]
+        grant_rights(user, db, rights)
+    elif command == "user_revoke" and len(args)==3:
+        user, db, rights_txt = args
+        rights = [r.strip() for r in rights_txt.split(",") if r.strip()]
+        revoke_rights(user, db, rights)
+    elif command == "login" and len(args) in (1, 2):
+        pwd = args[1] if len(args) == 2 else _ask("password = ")
+        if authenticate_user(args[0], pwd):
+            set_current_user(args[0])
         else:
-            print("Commande invalide ou arguments manquants.")
+            _fail("Authentification échouée.")
+    elif command == "logout":
+        set_current_user(None)
+
+        # --- Changer le mot de passe d’un utilisateur ---
+    elif command == "user_password":
+        # Si un nom d’utilisateur est donné, on l’utilise
+        if len(args) >= 1:
+            target = args[0]
+        else:
+            target = current_user
+
+        if target is None:
+            _fail("❌ Aucun utilisateur connecté — veuillez vous connecter d’abord.")
+            return True
+
+        change_user_password(target)
+    
+    
+    elif command == "help":
+        help()
+    else:
+        _stat_set("invalid", True)  # métriques : compté sous "other"
+        _fail("Commande invalide ou arguments manquants.")
+    return True
 
 
 if __name__ == "__main__":
-    prompt()
+    sys.exit(main())
 
@@ -0,0 +1,80 @@
+"""Fixtures communes : bases dans un répertoire temporaire (DB_ROOT), utilisateur admin connecté."""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+
+# bases utilisables par les tests (droits de l'utilisateur admin)
+TEST_DBS = ("test", "other")
+PASSWORD = "pw"
+
+# réglages modifiés par les commandes : une copie par test
+_SETTINGS = ("TIMING", "SLOW_LOG", "WRITEBACK", "PARALLEL_SCAN", "ZONE_MAPS", "DICTIONARY_ENCODING", "REPLICA", "BATCH")
+# caches et états de module remis à zéro entre deux tests
+_STATE = ("_db_settings_cache", "_catalog_cache", "_index_cache", "_users_cache", "_journal_seq",
+          "_replica_cache", "_replica_shipped", "_replica_errors", "_replica_failures",
+          "_pending_writes", "prepared_statements", "_unsynced_paths", "_batch_answers")
+
+
+def write_users(root, dbs=TEST_DBS):
+    users = {"admin": {"password_hash": main._hash_password(PASSWORD), "attrs": {},
+                       "rights": {db: ["admin"] for db in dbs}}}
+    with open(os.path.join(root, "users.json"), "w", encoding="utf-8") as f:
+        json.dump(users, f)
+
+
+@pytest.fixture
+def db_root(tmp_path, monkeypatch):
+    """DB_ROOT temporaire, admin connecté, aucune base sélectionnée."""
+    root = tmp_path / "databases"
+    root.mkdir()
+    write_users(str(root))
+    monkeypatch.setattr(main, "DB_ROOT", str(root))
+    monkeypatch.setattr(main, "USERS_PATH", str(root / "users.json"))
+    monkeypatch.setattr(main, "current_db", None)
+    monkeypatch.setattr(main, "current_user", "admin")
+    for name in _SETTINGS:
+        monkeypatch.setattr(main, name, dict(getattr(main, name)))
+    for name in _STATE:
+        getattr(main, name).clear()
+    yield root
+    main._pending_writes.clear()
+    main._parse_where_clause.cache_clear()
+
+
+@pytest.fixture
+def sql(db_root, capsys):
+    """sql(script, ok=True) : exécute un script (syntaxe de -f) et retourne sa sortie."""
+    def run(text, ok=True):
+        capsys.readouterr()
+        failures = main.run_script([("test", text)])
+        out = capsys.readouterr().out
+        assert (failures == 0) == ok, out
+        return out
+    return run
+
+
+@pytest.fixture
+def db(sql):
+    """Base 'test' créée et sélectionnée."""
+    sql("create_db test\nuse test")
+    return sql
+
+
+def search(table, where=None, columns=("*",), group_by=None):
+    """Lignes retenues par une recherche, en dicts {colonne: valeur}."""
+    tree = main._parse_where_clause(where) if where else None
+    result = main._search_rows(table, list(columns), tree, group_by=group_by)
+    assert result is not None, "recherche en échec"
+    cols, rows = result
+    return [{c: row.get(c) for c in cols} for row in rows]
+
+
+def table_rows(table):
+    """Toutes les lignes de la table (valeurs décodées), partition par partition."""
+    meta = main._load_table_meta(table)
+    return [dict(row.items()) for _, rows in main._load_partitions(table, meta) for row in rows]
@@ -0,0 +1,110 @@
+import os
+
+import main
+from conftest import search, table_rows
+
+
+def _journal(db_name="test"):
+    return list(main._read_journal(main._journal_file(db_name)))
+
+
+def _ids(table="emp"):
+    return sorted(r["id"] for r in table_rows(table))
+
+
+def _setup(db, tmp_path):
+    dest = tmp_path / "sauvegardes"
+    db("create_table emp (id:int unique, nom:str)\ninsert emp id=1, nom='a'\n"
+       f"backup test {dest}")
+    return dest
+
+
+def _backups(dest):
+    return main._list_backups(str(dest))
+
+
+def test_restore_latest(db, tmp_path):
+    dest = _setup(db, tmp_path)
+    db("insert emp id=2, nom='b'\nupdate emp set nom='x' where id = 1")
+    before = table_rows("emp")
+    out = db("restore test")
+    assert "2 changement(s) rejoué(s)" in out
+    assert sorted(table_rows("emp"), key=lambda r: r["id"]) == sorted(before, key=lambda r: r["id"])
+    assert _journal()[-1]["op"] == "restore"
+
+
+def test_point_in_time(db, tmp_path):
+    _setup(db, tmp_path)
+    db("insert emp id=2, nom='b'\ninsert emp id=3, nom='c'")
+    entries = _journal()
+    at = [e for e in entries if e["op"] == "insert" and e["rows"][0]["id"] == 2][0]["at"]
+    db(f"restore test --at {at}")
+    assert _ids() == [1, 2]
+    marker = _journal()[-1]
+    assert marker["op"] == "restore" and marker["seq"] > max(e["seq"] for e in entries)
+
+
+def test_backup_after_point_in_time(db, tmp_path):
+    dest = _setup(db, tmp_path)
+    first_at = _backups(dest)[0][2]["at"]
+    db("insert emp id=2, nom='b'\ninsert emp id=3, nom='c'")
+    db(f"backup test {dest}")  # branche abandonnée par la restauration suivante
+    db(f"restore test --at {first_at}")
+    assert _ids() == [1]
+    db("insert emp id=4, nom='d'\ninsert emp id=5, nom='e'")
+    seqs = [e["seq"] for e in _journal()]
+    assert seqs == sorted(set(seqs))  # jamais réutilisés
+
+    db("restore test")  # la sauvegarde de la branche abandonnée est ignorée
+    assert _ids() == [1, 4, 5]
+
+    db(f"backup test {dest}\ninsert emp id=6, nom='f'\nrestore test")
+    assert _ids() == [1, 4, 5, 6]
+
+
+def test_restore_other_db_keeps_current(db, tmp_path):
+    dest = tmp_path / "sauvegardes"
+    db("create_table emp (id:int unique, nom:str, sal:int)\n"
+       "create materialized view v as search id,nom from emp where sal > 10\n"
+       "create materialized view total as search count(*),sum(sal) from emp\n"
+       f"backup test {dest}\n"
+       "insert emp id=1, nom='a', sal=20\ninsert emp id=2, nom='b', sal=5\n"
+       "update emp set sal=30 where id = 2\n"
+       "create_db other\nuse other")
+    db("restore test")
+    assert main.current_db == "other"
+    assert not os.listdir(os.path.join(main.DB_ROOT, "other"))
+    main.current_db = "test"
+    assert sorted(r["id"] for r in search("v")) == [1, 2]
+    assert search("total") == [{"count(*)": 2, "sum(sal)": 50}]
+
+
+def test_restore_flushes_pending_writes_of_other_db(db, tmp_path):
+    dest = tmp_path / "sauvegardes"
+    db(f"create_db other\nuse other\ncreate_table t (id:int)\nbackup other {dest}\n"
+       "use test\ncreate_table emp (id:int)\nwriteback on delay=60")
+    main.run_command("insert emp id=1")
+    assert main._pending_writes
+    main.run_command("restore other")
+    assert main._stats_history[-1]["error"] is None
+    assert not main._pending_writes
+    assert [r["id"] for r in main._read_data_file(main._data_file("emp"))] == [1]
+
+
+def test_replay_duplicate_rows_without_key(db, tmp_path):
+    dest = tmp_path / "sauvegardes"
+    db(f"create_table t (a:int, b:str)\nbackup test {dest}")
+    assert main.insert_rows("t", [{"a": "1", "b": "x"}] * 3 + [{"a": str(i), "b": "y"} for i in range(2, 200)]) == 201
+    db("update t set b='z' where a = 1\nupdate t set a=0 where b = 'y'")
+    before = sorted((r["a"], r["b"]) for r in table_rows("t"))
+    db("restore test")
+    assert sorted((r["a"], r["b"]) for r in table_rows("t")) == before
+
+
+def test_errors(db, tmp_path):
+    db("create_table emp (id:int)")
+    db("restore test", ok=False)  # aucune sauvegarde connue
+    db(f"restore test from {tmp_path / 'vide'}", ok=False)
+    db(f"backup test {tmp_path / 's'}\nrestore test --at hier", ok=False)
+    db("restore test --at 2000-01-01", ok=False)
+    db(f"backup absente {tmp_path / 's'}", ok=False)
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import main
+from conftest import PASSWORD, search, write_users
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_answers_and_failures(db):
+    out = db("create_table emp\n> id\n> int\n> n\n> o\n> n\n> \n> ")
+    assert "Table 'emp' créée avec succès." in out
+    db("insert emp\n> 1")
+    assert main.run_script([("s", "insert emp")]) == 1  # valeur manquante
+    assert main.run_script([("s", "show_tables\n> inutile")]) == 1  # réponse non utilisée
+    assert main.run_script([("s", "> orpheline")]) == 1
+    assert main.run_script([("s", "commande_inconnue\nshow_tables")]) == 1
+    assert main.run_script([("s", "commande_inconnue\ncommande_inconnue")], keep_going=True) == 2
+
+
+def test_temporal_defaults(db):
+    db("create_table ev (id:int auto_increment, d:date default 2024-01-01, t:datetime default '2024-01-01T08:30:00')\n"
+       "create_table ev2\n> d\n> date\n> n\n> n\n> 2024-02-01\n> \n"
+       "insert ev id=1\ninsert ev2\n> ")
+    assert main._table_schema("ev")[1]["default"] == "2024-01-01"
+    assert search("ev", "d = '2024-01-01' and t = '2024-01-01T08:30:00'")[0]["id"] == 1
+    assert [str(r["d"]) for r in search("ev2")] == ["2024-02-01"]
+
+
+def test_exit_stops(db, capsys):
+    assert main.run_script([("s", "# commentaire\nexit\ncommande_inconnue")]) == 0
+    assert "Fin de session." in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("command", [
+    "execute q 1, 2",
+    "execute absente",
+    "create_index emp id trigram",
+    "create_index emp nom",
+    "drop_index emp id",
+    "drop_index emp nom trigram",
+    "create materialized view w as search * from v",
+    "refresh emp",
+    "profile exit",
+])
+def test_errors_fail(db, command):
+    db("create_table emp (id:int, nom:str)\ninsert emp id=1, nom='a'\ncreate_index emp nom\n"
+       "create materialized view v as search * from emp\nprepare q as search * from emp where id = ?")
+    db(command, ok=False)
+
+
+def test_cli_exit_codes(tmp_path):
+    root = tmp_path / "databases"
+    root.mkdir()
+    write_users(str(root))
+
+    def run(*args):
+        return subprocess.run([sys.executable, os.path.join(ROOT, "main.py"), *args], cwd=str(tmp_path),
+                              capture_output=True, text=True, timeout=60)
+
+    ok = run("-c", f"login admin {PASSWORD}", "-c", "create_db test", "-c", "create_table t (id:int)",
+             "-c", "insert t id=1")
+    assert ok.returncode == 0, ok.stdout
+    script = tmp_path / "s.sql"
+    script.write_text(f"login admin {PASSWORD}\nuse test\ncreate_index t id\ncreate_index t id\nsearch * from t\n",
+                      encoding="utf-8")
+    failed = run("-f", str(script))
+    assert failed.returncode == 1
+    assert "s.sql:4 : échec de 'create_index t id'" in failed.stdout
+    assert "(1 ligne)" not in failed.stdout  # arrêt au premier échec
+    kept = run("-k", "-f", str(script))
+    assert kept.returncode == 1 and "(1 ligne)" in kept.stdout
+    assert run("-f", str(tmp_path / "absent.sql")).returncode == 2
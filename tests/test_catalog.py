@@ -0,0 +1,50 @@
+import os
+
+import main
+
+
+def _entry(table):
+    return main._load_catalog()["tables"].get(table)
+
+
+def test_counts_follow_writes(db):
+    db("create_table emp (id:int, nom:str)\ninsert emp id=1, nom='a'\ninsert emp id=2, nom='b'")
+    entry = _entry("emp")
+    assert entry["kind"] == "table"
+    assert entry["rows"] == 2 and entry["columns"] == 2
+    assert entry["size"] == os.path.getsize(main._data_file("emp"))
+    db("create_index emp id")
+    assert _entry("emp")["indexes"] == ["id"]
+    db("drop_index emp id")
+    assert _entry("emp")["indexes"] == []
+
+
+def test_partition_rows(db):
+    db("create_table p (id:int) partition by hash(id) 2")
+    assert main.insert_rows("p", [{"id": str(i)} for i in range(10)]) == 10
+    entry = _entry("p")
+    assert entry["rows"] == 10
+    assert sum(entry["partition_rows"].values()) == 10 and len(entry["partition_rows"]) == 2
+
+
+def test_views_and_drop(db):
+    db("create_table emp (id:int)\ninsert emp id=1\ncreate materialized view v as search id from emp")
+    assert _entry("v")["kind"] == "view"
+    out = db("show_tables")
+    assert " - emp\n" in out and " - v (vue matérialisée)" in out
+    db("delete_table v\n> oui")
+    assert _entry("v") is None and _entry("emp") is not None
+
+
+def test_rebuilt_when_missing(db):
+    db("create_table emp (id:int)\ninsert emp id=1\ninsert emp id=2")
+    os.remove(main._catalog_file())
+    main._catalog_cache.clear()
+    assert _entry("emp")["rows"] == 2
+    assert os.path.exists(main._catalog_file())
+
+
+def test_describe_reads_catalog(db):
+    db("create_table emp (id:int)\ninsert emp id=1")
+    out = db("describe_table emp")
+    assert "Nombre de lignes : 1" in out and "id:int" in out
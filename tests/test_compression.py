@@ -0,0 +1,31 @@
+import pytest
+
+import main
+from conftest import search, table_rows
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma"])
+def test_compressed_table_round_trip(db, codec):
+    db("create_table p (id:int auto_increment, ville:str, jour:date) partition by hash(id) 2")
+    main.insert_rows("p", [{"ville": ["Tana", "Fianar"][i % 2], "jour": f"2024-01-{1 + i % 28:02d}"} for i in range(500)])
+    before = table_rows("p")
+    db(f"compress p {codec}")
+    for pid in (0, 1):
+        assert main._is_compressed(main._data_file("p", pid))
+    assert sorted(table_rows("p"), key=lambda r: r["id"]) == sorted(before, key=lambda r: r["id"])
+    assert len(search("p", "ville = 'Tana' and jour = '2024-01-03'")) == len(
+        [r for r in before if r["ville"] == "Tana" and r["jour"] == "2024-01-03"])
+
+    db("insert p ville='Tulear', jour='2024-02-01'")
+    assert main._is_compressed(main._data_file("p", 0)) and main._is_compressed(main._data_file("p", 1))
+    assert search("p", "ville = 'Tulear'", columns=["id"]) == [{"id": 501}]
+
+    db("compress p none")
+    assert not main._is_compressed(main._data_file("p", 0))
+    assert len(table_rows("p")) == 501
+
+
+def test_compress_errors(db):
+    db("create_table p (id:int)")
+    db("compress p gzip", ok=False)
+    db("compress absente zlib", ok=False)
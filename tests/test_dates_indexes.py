@@ -0,0 +1,59 @@
+import json
+
+import main
+from conftest import search
+
+
+def access_path(db, line):
+    db(line)
+    return main._stats_history[-1]["access_path"]
+
+
+def test_dates_stored_as_integers(db):
+    db("""create_table ev (id:int auto_increment, jour:date, quand:datetime)
+insert ev jour='1970-01-02', quand='1970-01-01T00:00:01'
+insert ev jour='2024-02-29', quand='2024-02-29T12:30:00'
+insert ev jour=null""")
+    with open(main._data_file("ev"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["rows"][0][1:] == [1, 1000000]
+    assert search("ev", "jour >= '2000-01-01'") == [{"id": 2, "jour": "2024-02-29", "quand": "2024-02-29T12:30:00"}]
+    assert [r["id"] for r in search("ev", "quand between '1970-01-01' and '1970-01-02'")] == [1]
+    assert [r["id"] for r in search("ev", "jour in ('2024-02-29', 'pas une date')")] == [2]
+    assert [r["id"] for r in search("ev", "jour is null")] == [3]
+    assert [r["id"] for r in search("ev", "jour not in ('2024-02-29')")] == [1]
+
+
+def test_in_params_on_dates(db):
+    db("""create_table ev (id:int auto_increment, jour:date)
+insert ev jour='2024-01-01'
+insert ev jour='2024-01-02'
+insert ev jour='2024-01-03'
+prepare q as search id from ev where jour in (?, ?, '2024-01-03')""")
+    ids = lambda rows: sorted(r["id"] for r in rows)
+    assert ids(main.execute("q", ["2024-01-01", "2024-01-02"])) == [1, 2, 3]
+    assert ids(main.execute("q", ["2024-01-02", None])) == [2, 3]  # liste reconstruite au bind
+
+
+def test_sorted_index_serves_ranges(db):
+    db("create_table p (id:int auto_increment, age:int, nom:str)")
+    main.insert_rows("p", [{"age": str(i % 100), "nom": f"n{i}"} for i in range(1000)])
+    db("create_index p age")
+    assert "index" in access_path(db, "search * from p where age between 10 and 12")
+    assert len(search("p", "age between 10 and 12")) == 30
+    assert len(search("p", "age = 5 or age > 97")) == 30
+
+    # index tenu à jour par les écritures
+    db("""insert p age=500, nom='max'
+update p set age=501 where nom = 'n0'""")
+    assert [r["nom"] for r in search("p", "age >= 500")] == ["n0", "max"]
+    assert len(search("p", "age = 0")) == 9
+
+    db("drop_index p age")
+    assert access_path(db, "search * from p where age = 3") == "scan complet"
+
+
+def test_index_errors(db):
+    db("create_table p (id:int, nom:str)\ncreate_index p id")
+    db("create_index p inconnue", ok=False)
+    db("create_index absente id", ok=False)
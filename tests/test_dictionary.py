@@ -0,0 +1,46 @@
+import json
+
+import main
+from conftest import search, table_rows
+
+
+def stored(table):
+    with open(main._data_file(table), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_analyze_encodes_low_cardinality_columns(db):
+    db("create_table p (id:int auto_increment, ville:str, nom:str)")
+    main.insert_rows("p", [{"ville": ["Tana", "Fianar", "Tulear"][i % 3], "nom": f"n{i}"} for i in range(30)])
+    db("analyze p")
+    meta = main._load_table_meta("p")
+    assert sorted(meta["dictionaries"]) == ["ville"]  # 'nom' : toutes les valeurs distinctes
+    data = stored("p")
+    assert all(isinstance(r[1], int) for r in data["rows"])
+    assert sorted(data["dictionaries"]["ville"]) == ["Fianar", "Tana", "Tulear"]
+
+    assert len(search("p", "ville = 'Tana'")) == 10
+    assert len(search("p", "ville in ('Tana', 'Tulear')")) == 20
+    assert len(search("p", "ville != 'Tana'")) == 20
+    assert len(search("p", "ville like 'T%'")) == 20
+    assert sorted((g["ville"], g["count(*)"]) for g in search("p", columns=["ville", "count(*)"], group_by=["ville"])) == \
+        [("Fianar", 10), ("Tana", 10), ("Tulear", 10)]
+
+
+def test_new_values_after_analyze(db):
+    db("create_table p (id:int auto_increment, ville:str)")
+    main.insert_rows("p", [{"ville": ["Tana", "Fianar"][i % 2]} for i in range(10)])
+    db("""analyze p
+insert p ville='Majunga'
+update p set ville='Tana' where id = 2""")
+    assert search("p", "ville = 'Majunga'") == [{"id": 11, "ville": "Majunga"}]
+    assert len(search("p", "ville = 'Tana'")) == 6
+    assert [r["ville"] for r in table_rows("p")][:3] == ["Tana", "Tana", "Tana"]
+
+
+def test_high_cardinality_not_encoded(db):
+    main.DICTIONARY_ENCODING["max_values"] = 2
+    db("create_table p (id:int auto_increment, ville:str)")
+    main.insert_rows("p", [{"ville": ["a", "b", "c"][i % 3]} for i in range(30)])
+    db("analyze p")
+    assert not main._load_table_meta("p").get("dictionaries")
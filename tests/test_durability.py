@@ -0,0 +1,58 @@
+import json
+import os
+
+import pytest
+
+import main
+from conftest import table_rows
+
+
+class Boom(Exception):
+    pass
+
+
+@pytest.mark.parametrize("level", main.DURABILITY_LEVELS)
+def test_failed_write_keeps_previous_file(db, level):
+    db(f"durability {level}\ncreate_table p (id:int)\ninsert p id=1")
+    path = main._data_file("p")
+    with pytest.raises(Boom):
+        with main._open_for_write(path) as f:
+            f.write('{"rows": [[')
+            raise Boom()
+    assert not os.path.exists(path + ".tmp")
+    assert table_rows("p") == [{"id": 1}]
+
+
+def test_levels(db):
+    db("create_table p (id:int)\ndurability normal")
+    path = main._data_file("p")
+    main.run_command("insert p id=1")  # run_script termine par un checkpoint : commandes seules
+    assert path in main._unsynced_paths
+    main.run_command("checkpoint")
+    assert not main._unsynced_paths
+
+    main.run_command("durability off")
+    main.run_command("insert p id=2")
+    assert path not in main._unsynced_paths  # jamais synchronisé
+    main.run_command("durability full")
+    main.run_command("insert p id=3")
+    assert path not in main._unsynced_paths
+    with open(main._db_settings_file("test"), "r", encoding="utf-8") as f:
+        assert json.load(f)["durability"] == "full"
+    assert [r["id"] for r in table_rows("p")] == [1, 2, 3]
+
+
+def test_off_does_not_write_through_hard_links(db, tmp_path):
+    db("durability off\ncreate_table p (id:int)\ninsert p id=1")
+    path = main._data_file("p")
+    copy = str(tmp_path / "lien.json")
+    os.link(path, copy)
+    with open(copy, "r", encoding="utf-8") as f:
+        before = f.read()
+    db("insert p id=2")
+    with open(copy, "r", encoding="utf-8") as f:
+        assert f.read() == before
+
+
+def test_invalid_level(db):
+    db("durability sometimes", ok=False)
@@ -0,0 +1,47 @@
+import csv
+import json
+
+
+def _setup(db):
+    db("create_table emp (id:int, nom:str, naissance:date, actif:bool, tags:list) partition by hash(id) 2\n"
+       "insert emp id=1, nom='Rakoto, Jean', naissance='1990-05-01', actif=true, tags='[1, 2]'\n"
+       "insert emp id=2, nom='Rabe', actif=false\n"
+       "insert emp id=3, nom='Soa', naissance='2001-12-31'")
+
+
+def test_jsonl_table(db, tmp_path):
+    _setup(db)
+    path = tmp_path / "emp.jsonl"
+    out = db(f"export emp to {path}")
+    assert f"3 ligne(s) exportée(s) vers '{path}' (jsonl)." in out
+    rows = sorted((json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()), key=lambda r: r["id"])
+    assert rows[0] == {"id": 1, "nom": "Rakoto, Jean", "naissance": "1990-05-01", "actif": True, "tags": [1, 2]}
+    assert rows[1]["naissance"] is None and rows[1]["actif"] is False
+
+
+def test_csv_search(db, tmp_path):
+    _setup(db)
+    path = tmp_path / "res.out"
+    db(f"export search id,nom,actif,tags from emp where id <= 2 to {path} format csv")
+    with open(str(path), newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "nom", "actif", "tags"]
+    assert sorted(rows[1:]) == [["1", "Rakoto, Jean", "true", "[1, 2]"], ["2", "Rabe", "false", ""]]
+
+
+def test_aggregate(db, tmp_path):
+    _setup(db)
+    path = tmp_path / "agg.csv"
+    db(f"export search actif,count(*) from emp group by actif to {path}")
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "actif,count(*)" and len(lines) == 4
+
+
+def test_errors(db, tmp_path):
+    _setup(db)
+    db(f"export emp to {tmp_path / 'x.xml'}", ok=False)
+    db(f"export absente to {tmp_path / 'x.jsonl'}", ok=False)
+    db(f"export search * from emp where id = to {tmp_path / 'x.jsonl'}", ok=False)
+    db(f"export emp to {tmp_path / 'absent' / 'x.jsonl'}", ok=False)
+    db("export emp", ok=False)
+    assert not (tmp_path / "x.jsonl").exists()
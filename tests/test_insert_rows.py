@@ -0,0 +1,60 @@
+import json
+import os
+import subprocess
+import sys
+
+import main
+from conftest import table_rows
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _table(db):
+    db("create_table emp (id:int not null unique auto_increment, nom:str not null, sal:float default 10, "
+       "né:date, code:str unique)")
+
+
+def test_conversions_defaults_auto_increment(db):
+    _table(db)
+    assert main.insert_rows("emp", [{"nom": "a", "sal": "2.5", "né": "2001-02-03"}, {"nom": "b"}]) == 2
+    rows = table_rows("emp")
+    assert [r["id"] for r in rows] == [1, 2]
+    assert rows[0]["sal"] == 2.5 and rows[1]["sal"] == 10.0
+    assert str(rows[0]["né"]) == "2001-02-03" and rows[1]["né"] is None
+
+
+def test_all_or_nothing(db, capsys):
+    _table(db)
+    assert main.insert_rows("emp", [{"nom": "a"}, {"sal": "1"}]) is None  # nom NOT NULL
+    assert main.insert_rows("emp", [{"nom": "a", "code": "x"}, {"nom": "b", "code": "x"}]) is None  # UNIQUE
+    assert main.insert_rows("emp", [{"nom": "a", "sal": "beaucoup"}]) is None
+    assert table_rows("emp") == []
+    assert main.insert_rows("emp", [{"nom": "a", "code": "x"}]) == 1
+    assert main.insert_rows("emp", [{"nom": "b", "code": "x"}]) is None
+    assert len(table_rows("emp")) == 1
+
+
+def test_one_rewrite_per_partition(db, monkeypatch):
+    db("create_table p (id:int) partition by hash(id) 4")
+    saved = []
+    save_partition = main._save_partition
+
+    def counting(table_name, meta, pid, rows):
+        saved.append(pid)
+        save_partition(table_name, meta, pid, rows)
+    monkeypatch.setattr(main, "_save_partition", counting)
+    assert main.insert_rows("p", [{"id": str(i)} for i in range(100)]) == 100
+    assert sorted(saved) == [0, 1, 2, 3]
+    assert len(table_rows("p")) == 100
+
+
+def test_bench_smoke(tmp_path):
+    out = tmp_path / "bench.json"
+    proc = subprocess.run([sys.executable, os.path.join(ROOT, "bench.py"), "--rows", "50", "--repeat", "1",
+                           "--single", "1", "--startup", "0", "--out", str(out)],
+                          cwd=str(tmp_path), capture_output=True, text=True, timeout=300)
+    assert proc.returncode == 0, proc.stderr
+    report = json.loads(out.read_text(encoding="utf-8"))
+    results = report["runs"][0]["results"]
+    assert results["bulk_insert people"]["count"] == 1
+    assert all(stats["p50_ms"] is not None for stats in results.values())
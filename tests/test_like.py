@@ -0,0 +1,34 @@
+import pytest
+
+import main
+from conftest import search
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    ("Abc", ("exact", "abc")),
+    ("abc%", ("prefix", "abc")),
+    ("%ABC", ("suffix", "abc")),
+    ("%abc%", ("contains", "abc")),
+    ("a%c", ("regex", "a%c")),
+])
+def test_classify(pattern, expected):
+    assert main._classify_like(pattern) == expected
+
+
+def test_regex_pattern_escapes_metacharacters():
+    match = main._compile_like("a.%(b)")
+    assert match("A.xx(b)") and not match("abx(b)")
+
+
+def test_trigram_index(db):
+    db("create_table p (id:int auto_increment, nom:str)")
+    names = [f"{w}{i}" for i, w in enumerate(["Rakoto", "Rabe", "Andriana", "Soa"] * 50)]
+    main.insert_rows("p", [{"nom": n} for n in names])
+    expected = {p: search("p", f"nom like '{p}'") for p in ("%ako%", "ra%", "%a1", "%dri%na%")}
+    db("create_index p nom trigram")
+    for pattern, rows in expected.items():
+        assert search("p", f"nom like '{pattern}'") == rows
+    db("search * from p where nom like '%koto1%'")
+    assert "trigram" in main._stats_history[-1]["access_path"]
+    db("insert p nom='xxKOTOyy'")
+    assert search("p", "nom like '%koto%'", columns=["nom"])[-1] == {"nom": "xxKOTOyy"}
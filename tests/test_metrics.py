@@ -0,0 +1,53 @@
+import re
+import socket
+import urllib.request
+
+import main
+
+
+def _value(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_counters_and_histogram(db, capsys):
+    db("create_table emp (id:int)\ninsert emp id=1")
+    before = main.metrics_text()
+    main.run_command("search * from emp")
+    main.run_command("search * from emp")
+    text = main.metrics_text()
+    key = 'sgbd_commands_total{command="search"}'
+    assert _value(text, key) - _value(before, key) == 2
+    assert _value(text, "sgbd_rows_scanned_total") - _value(before, "sgbd_rows_scanned_total") == 2
+    assert 'sgbd_command_duration_seconds_bucket{command="search",le="+Inf"}' in text
+    assert "# TYPE sgbd_command_duration_seconds histogram" in text
+    assert "# TYPE sgbd_pending_write_partitions gauge" in text
+
+
+def test_format(db):
+    text = main.metrics_text()
+    for line in text.splitlines():
+        if line.startswith("#"):
+            assert re.match(r"# (HELP|TYPE) sgbd_\w+ ", line), line
+        else:
+            assert re.match(r'sgbd_\w+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? \S+$', line), line
+
+
+def test_command_and_server(db):
+    out = db("metrics")
+    assert "# HELP sgbd_commands_total" in out
+    db("metrics serve abc", ok=False)
+    db("metrics truc", ok=False)
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    try:
+        assert main.serve_metrics(port)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10) as resp:
+            assert resp.status == 200
+            assert b"sgbd_commands_total" in resp.read()
+    finally:
+        main.stop_metrics_server()
+    assert main._metrics_server is None
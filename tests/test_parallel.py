@@ -0,0 +1,73 @@
+import pytest
+
+import main
+from conftest import search
+
+
+def fill(db, table, n, partition=""):
+    db(f"create_table {table} (id:int auto_increment, v:int, tag:str){partition}")
+    assert main.insert_rows(table, [{"v": str(i % 97), "tag": f"t{i % 5}"} for i in range(n)]) == n
+
+
+def access_path(db, line):
+    db(line)
+    return main._stats_history[-1]["access_path"]
+
+
+def test_partitioned_table_scanned_in_parallel(db):
+    fill(db, "h", 2000, " partition by hash(id) 4")
+    expected = search("h", "v < 10 and tag = 't1'")
+    main.PARALLEL_SCAN.update(threshold=100, workers=2)
+    assert access_path(db, "search * from h where v < 10 and tag = 't1'").startswith("scan parallèle")
+    assert search("h", "v < 10 and tag = 't1'") == expected  # même résultat, même ordre
+    groups = search("h", columns=["tag", "count(*)"], group_by=["tag"])
+    assert sorted(g["count(*)"] for g in groups) == [400] * 5
+
+
+@pytest.mark.parametrize("layout", ["", "analyze s", "compress s zlib"])
+def test_single_file_split_into_segments(db, layout, monkeypatch):
+    monkeypatch.setitem(main.ZONE_MAPS, "segment_rows", 250)  # blocs compressés
+    fill(db, "s", 2000)
+    if layout:
+        db(layout)
+    expected = search("s", "v < 10 and tag = 't1'")
+    groups = sorted(map(str, search("s", columns=["tag", "count(*)"], group_by=["tag"])))
+    main.PARALLEL_SCAN.update(threshold=100, workers=2, chunk_size=300)
+    calls = []
+    scan_rows = main._scan_rows
+    def spy(data, *args, **kwargs):
+        if not kwargs.get("chunked", True):
+            calls.append(data)
+        return scan_rows(data, *args, **kwargs)
+    main._scan_rows = spy
+    try:
+        assert access_path(db, "search * from s where v < 10 and tag = 't1'") == "scan parallèle"
+        assert main._stats_history[-1]["rows_scanned"] == 2000
+        assert search("s", "v < 10 and tag = 't1'") == expected  # même résultat, même ordre
+        assert sorted(map(str, search("s", columns=["tag", "count(*)"], group_by=["tag"]))) == groups
+    finally:
+        main._scan_rows = scan_rows
+    assert len(calls) == 3 and len(calls[0]) > 1
+    rows = [r for path, segment in calls[0] for r in main._read_segment(path, segment, main._load_table_meta("s"))]
+    assert [r["id"] for r in rows] == list(range(1, 2001))  # segments contigus, sans doublon
+
+
+def test_on_mode_chunks_index_rows(db):
+    fill(db, "s", 500)
+    db("create_index s v")
+    main.PARALLEL_SCAN.update(mode="on", workers=2, chunk_size=2)
+    assert access_path(db, "search * from s where v = 3").endswith(", scan parallèle")
+
+
+def test_on_mode_chunks_loaded_rows(db):
+    fill(db, "s", 500)
+    expected = search("s", "v between 5 and 9")
+    main.PARALLEL_SCAN.update(mode="on", workers=2, chunk_size=100)
+    assert search("s", "v between 5 and 9") == expected
+
+
+def test_parallel_settings(db):
+    db("parallel off threshold=10")
+    assert main.PARALLEL_SCAN["mode"] == "off" and main.PARALLEL_SCAN["threshold"] == 10
+    db("parallel workers=0", ok=False)
+    db("parallel speed=3", ok=False)
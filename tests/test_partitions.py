@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+import main
+from conftest import search, table_rows
+
+
+def partition_of(table, **where):
+    meta = main._load_table_meta(table)
+    for pid, rows in main._load_partitions(table, meta):
+        for row in rows:
+            if all(row.get(k) == v for k, v in where.items()):
+                return pid
+
+
+def access_path(db, line):
+    db(line)
+    return main._stats_history[-1]["access_path"]
+
+
+def test_range_partitions_and_pruning(db):
+    db("""create_table p (id:int auto_increment, nom:str, age:int) partition by range(age) 18,65
+insert p nom='enfant', age=10
+insert p nom='adulte', age=30
+insert p nom='senior', age=70
+insert p nom='inconnu'""")
+    assert main._load_table_meta("p")["partition"] == {"kind": "range", "column": "age", "bounds": [18, 65]}
+    assert [partition_of("p", nom=n) for n in ("enfant", "adulte", "senior", "inconnu")] == [0, 1, 2, 0]
+    assert os.path.exists(main._data_file("p", 2))
+    assert access_path(db, "search * from p where age >= 65").endswith("1/3 partitions")
+    assert [r["nom"] for r in search("p", "age between 18 and 80")] == ["adulte", "senior"]
+
+    # une mise à jour de la colonne de partitionnement déplace la ligne
+    db("update p set age=40 where nom = 'enfant'")
+    assert partition_of("p", nom="enfant") == 1
+    assert len(table_rows("p")) == 4
+
+
+def test_hash_partitions(db):
+    db("create_table h (id:int auto_increment, v:str) partition by hash(id) 4")
+    main.insert_rows("h", [{"v": str(i)} for i in range(200)])
+    counts = [len(rows) for _, rows in main._load_partitions("h", main._load_table_meta("h"))]
+    assert len(counts) == 4 and sum(counts) == 200 and min(counts) > 0
+    assert access_path(db, "search * from h where id in (3, 4)").endswith("2/4 partitions")
+    assert [r["v"] for r in search("h", "id = 17")] == ["16"]
+    assert access_path(db, "search * from h where v = '3'") == "scan complet"
+
+
+@pytest.mark.parametrize("spec", [
+    "partition by hash(id) 0",
+    "partition by hash(nope) 2",
+    "partition by range(id) 5,3",
+    "partition by range(id)",
+    "partition by list(id) 2",
+])
+def test_invalid_specs(db, spec):
+    db(f"create_table bad (id:int) {spec}", ok=False)
+    assert not os.path.exists(main._table_file("bad", "schema.json"))
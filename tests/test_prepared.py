@@ -0,0 +1,59 @@
+import main
+
+
+def names(rows):
+    return [r.get("nom") for r in rows]
+
+
+def test_prepare_execute_and_rebind(db):
+    db("""create_table p (id:int auto_increment, nom:str, age:int)
+insert p nom='Rakoto', age=20
+insert p nom='Soa', age=17
+insert p nom='Rabe', age=35
+prepare q as search nom from p where age >= ? and nom like ?""")
+    plan = main.prepared_statements["q"]
+    assert plan["nparams"] == 2
+    assert names(main.execute("q", ["18", "r%"])) == ["Rakoto", "Rabe"]
+    assert names(main.execute("q", ["30", "%"])) == ["Rabe"]
+    assert len(plan["compiled"]) == 1  # prédicat compilé une fois, paramètres re-liés
+
+    out = db("execute q 0, 's%'")
+    assert "Soa" in out and "Rakoto" not in out
+
+
+def test_null_and_in_params(db):
+    db("""create_table p (id:int auto_increment, nom:str, ville:str)
+insert p nom='a', ville='Tana'
+insert p nom='b', ville=null
+insert p nom='c', ville='Fianar'
+prepare q as search nom from p where ville in (?, ?)""")
+    assert names(main.execute("q", ["Tana", "Fianar"])) == ["a", "c"]
+    assert names(main.execute("q", ["Tana", None])) == ["a"]
+
+
+def test_recompiled_after_schema_change(db):
+    db("""create_table p (id:int auto_increment, nom:str)
+insert p nom='a'
+prepare q as search * from p where id = ?""")
+    assert main.execute("q", ["1"])[0].get("nom") == "a"
+    db("""alter_table p
+> 1
+> age
+> int
+> n
+> n
+> n
+> """)
+    row = main.execute("q", ["1"])[0]
+    assert row.get("nom") == "a" and "age" in row.keys()
+    assert len(main.prepared_statements["q"]["compiled"]) == 2
+
+
+def test_errors(db):
+    db("create_table p (id:int)")
+    db("prepare q as search * from p where id = ?")
+    db("execute inconnue 1", ok=False)
+    db("prepare bad as search * from p where id = = ?", ok=False)
+    db("deallocate q")
+    assert "q" not in main.prepared_statements
+    db("deallocate q", ok=False)
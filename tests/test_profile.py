@@ -0,0 +1,28 @@
+import pstats
+
+import main
+
+
+def test_profile_runs_command(db):
+    db("create_table emp (id:int)\ninsert emp id=1")
+    out = db("profile top=5 search * from emp")
+    assert "=== Profil de 'search * from emp' : 5 fonctions" in out
+    assert "=== Allocations : 5 principaux sites" in out
+    assert "search_table" in out
+    assert [s["command"] for s in list(main._stats_history)[-2:]] == ["search * from emp", "profile top=5 search * from emp"]
+
+
+def test_save(db, tmp_path):
+    db("create_table emp (id:int)")
+    path = tmp_path / "insert.prof"
+    out = db(f"profile save={path} insert emp id=1")
+    assert "Profil enregistré" in out
+    stats = pstats.Stats(str(path))
+    assert any(func[2] == "insert_rows" for func in stats.stats)
+
+
+def test_invalid(db):
+    db("profile", ok=False)
+    db("profile top=x show_tables", ok=False)
+    db("profile exit", ok=False)
+    db("profile search * from absente", ok=False)  # échec de la commande profilée
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+import main
+from conftest import search, table_rows
+
+
+@pytest.fixture
+def replica(db, db_root, tmp_path, monkeypatch):
+    """Base 'test' du primaire (db_root) suivie par <tmp>/replica/test ; switch(root) change de processus simulé."""
+    main.REPLICA["interval"] = 3600  # rattrapage par les commandes seulement
+    root = tmp_path / "replica"
+    db("create_table emp (id:int unique, nom:str)\ninsert emp id=1, nom='a'\n"
+       f"replica add test {root}")
+
+    def switch(to):
+        monkeypatch.setattr(main, "DB_ROOT", str(to))
+        monkeypatch.setattr(main, "USERS_PATH", str(to / "users.json"))
+        monkeypatch.setattr(main, "current_db", None)
+        for cache in (main._catalog_cache, main._db_settings_cache, main._index_cache,
+                      main._replica_cache, main._journal_seq):
+            cache.clear()
+        db("use test\nshow_tables")  # entrées reçues rejouées avant chaque commande
+    switch.primary, switch.replica = db_root, root
+    return switch
+
+
+def test_seed_and_apply(db, replica):
+    assert os.path.exists(replica.replica / "test" / main.REPLICA_STATE)
+    assert os.path.exists(replica.replica / "users.json")
+    db("insert emp id=2, nom='b'\nupdate emp set nom='x' where id = 1")
+    replica(replica.replica)
+    assert sorted((r["id"], r["nom"]) for r in search("emp")) == [(1, "x"), (2, "b")]
+    out = db("replica status")
+    assert "Réplique en lecture seule" in out and "retard : à jour" in out
+
+
+def test_replica_is_read_only(db, replica):
+    replica(replica.replica)
+    db("insert emp id=2, nom='b'", ok=False)
+    db("create_table t (id:int)", ok=False)
+    db("update emp set nom='y' where id = 1", ok=False)
+    assert table_rows("emp") == [{"id": 1, "nom": "a"}]
+
+
+def test_table_operations_and_drop(db, replica):
+    db("create_index emp nom\ncreate_table t (id:int)\ninsert t id=7\n"
+       "create_table gone (id:int)\ndelete_table gone\n> oui")
+    replica(replica.replica)
+    assert search("t") == [{"id": 7}]
+    assert search("emp", "nom = 'a'")[0]["id"] == 1
+    assert main._load_table_meta("emp")["indexes"] == ["nom"]
+    assert "gone" not in main._load_catalog()["tables"]
+    assert not os.path.exists(main._table_file("gone", "schema.json"))
+
+
+def test_shipping_recovers(db, replica):
+    target = replica.replica / "test"
+    moved = replica.replica / "ailleurs"
+    os.replace(str(target), str(moved))
+    out = db("insert emp id=2, nom='b'")  # l'écriture du primaire réussit quand même
+    assert "non alimentée" in out and main._replica_errors
+    os.replace(str(moved), str(target))
+    db("insert emp id=3, nom='c'")
+    assert not main._replica_errors
+    out = db("replica status test")
+    assert "1 suiveur(s)" in out
+    replica(replica.replica)
+    assert sorted(r["id"] for r in search("emp")) == [1, 2, 3]
+
+
+def test_restore_reseeds(db, replica, tmp_path):
+    dest = tmp_path / "sauvegardes"
+    db(f"backup test {dest}\ninsert emp id=2, nom='b'\nrestore test")
+    db("insert emp id=3, nom='c'")
+    replica(replica.replica)
+    assert sorted(r["id"] for r in search("emp")) == [1, 2, 3]
+    assert "retard : à jour" in db("replica status")
+
+
+def test_remove(db, replica):
+    db(f"replica remove test {replica.replica}\ninsert emp id=2, nom='b'")
+    db(f"replica remove test {replica.replica}", ok=False)
+    replica(replica.replica)
+    assert [r["id"] for r in search("emp")] == [1]
+    db("insert emp id=2, nom='b'", ok=False)  # toujours en lecture seule
+
+
+def test_add_errors(db, replica, db_root):
+    db(f"replica add test {replica.replica}", ok=False)  # déjà suiveur
+    db(f"replica add test {db_root}", ok=False)  # même répertoire que le primaire
+    db(f"replica add absente {replica.replica}", ok=False)
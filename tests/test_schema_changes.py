@@ -0,0 +1,55 @@
+import json
+import os
+
+import main
+from conftest import table_rows
+
+
+def alter(db, *answers, ok=True):
+    return db("alter_table p\n" + "\n".join(f"> {a}" for a in answers), ok=ok)
+
+
+def data_header(table):
+    with open(main._data_file(table), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def setup(db):
+    db("""create_table p (id:int auto_increment, nom:str, code:str)
+insert p nom='a', code='12'
+insert p nom='b', code='x'""")
+    return os.stat(main._data_file("p")).st_ino
+
+
+def test_changes_are_applied_at_read_time(db):
+    inode = setup(db)
+    alter(db, 1, "age", "int", "n", "n", "n", "18")
+    alter(db, 4, "nom", "name")
+    alter(db, 3, "code", "int")
+    alter(db, 2, "id")
+    assert os.stat(main._data_file("p")).st_ino == inode  # données non réécrites
+    assert main._load_table_meta("p")["schema_version"] == 5
+    assert table_rows("p") == [{"name": "a", "code": 12, "age": 18}, {"name": "b", "code": None, "age": 18}]
+
+    db("insert p name='c', code=3")
+    assert table_rows("p")[-1] == {"name": "c", "code": 3, "age": 18}
+
+
+def test_rewrite_applies_pending_changes(db):
+    setup(db)
+    alter(db, 4, "nom", "name")
+    assert data_header("p")["schema_version"] == 1
+    db("rewrite p")
+    header = data_header("p")
+    assert header["schema_version"] == 2 and header["columns"] == ["id", "name", "code"]
+    assert [r["name"] for r in table_rows("p")] == ["a", "b"]
+
+
+def test_invalid_changes(db):
+    setup(db)
+    alter(db, 1, "nom", ok=False)
+    alter(db, 2, "inconnue", ok=False)
+    alter(db, 3, "id", "str", ok=False)  # auto_increment reste int
+    alter(db, 4, "nom", "code", ok=False)
+    alter(db, 9, ok=False)
+    assert main._schema_version(main._load_table_meta("p")) == 1
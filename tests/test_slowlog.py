@@ -0,0 +1,43 @@
+import json
+import os
+
+import main
+
+
+def _entries():
+    with open(main._slow_log_file(), "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_logged_above_threshold(db):
+    db("create_table emp (id:int)\ninsert emp id=1")
+    assert not os.path.exists(main._slow_log_file())  # seuil par défaut : 1 s
+    db("slowlog threshold=0\nsearch * from emp where id = 1\nsearch * from emp where id = 2")
+    entries = [e for e in _entries() if e["command"].startswith("search")]
+    assert len(entries) == 2
+    assert entries[0]["db"] == "test" and entries[0]["user"] == "admin"
+    assert entries[0]["rows_scanned"] == 1 and entries[0]["access_path"]
+    assert not any(e["command"].startswith("slowlog") for e in _entries())
+
+
+def test_summary_groups_literals(db):
+    db("create_table emp (id:int)\ninsert emp id=1\nslowlog threshold=0")
+    db("search * from emp where id = 1\nsearch * from emp where id = 2")
+    out = db("slowlog top=50")
+    assert " - [test] search * from emp where id = ?" in out
+    assert "2 fois" in out
+
+
+def test_off_clear_and_rotation(db):
+    db("create_table emp (id:int)\nslowlog threshold=0\nshow_tables")
+    assert os.path.exists(main._slow_log_file())
+    db("slowlog clear")
+    assert not os.path.exists(main._slow_log_file())
+    db("slowlog off\nshow_tables")
+    assert not os.path.exists(main._slow_log_file())
+
+    main.SLOW_LOG["max_bytes"] = 10
+    db("slowlog threshold=0\nshow_tables\nshow_tables")
+    assert os.path.exists(main._slow_log_file() + ".1")
+    db("slowlog threshold=abc", ok=False)
+    db("slowlog bidule", ok=False)
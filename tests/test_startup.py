@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(tmp_path, *args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, *args], cwd=str(tmp_path), env=env,
+                          capture_output=True, text=True, timeout=60)
+
+
+def test_import_creates_nothing(tmp_path):
+    proc = _run(tmp_path, "-c", "import main")
+    assert proc.returncode == 0, proc.stderr
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_show_db_without_directory(tmp_path):
+    proc = _run(tmp_path, "-m", "main", "-c", "show_db")
+    assert proc.returncode == 0, proc.stdout
+    assert "Aucune base de données trouvée." in proc.stdout
+    assert not os.path.exists(str(tmp_path / "databases"))
+
+
+def test_created_on_first_write(tmp_path):
+    proc = _run(tmp_path, "-m", "main", "-c", "create_db test", "-c", "show_db")
+    assert proc.returncode == 0, proc.stdout
+    assert os.path.isdir(str(tmp_path / "databases" / "test"))
+    assert " - test" in proc.stdout
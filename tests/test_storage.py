@@ -0,0 +1,37 @@
+import json
+
+import main
+from conftest import search, table_rows
+
+
+def test_rows_stored_as_arrays(db):
+    db("""create_table p (id:int auto_increment, nom:str, tags:list)
+insert p nom='a', tags='[1, 2]'
+insert p nom='b'""")
+    with open(main._data_file("p"), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    assert data["columns"] == ["id", "nom", "tags"]
+    assert data["rows"] == [[1, "a", [1, 2]], [2, "b", None]]
+
+    row = main._read_data_file(main._data_file("p"))[0]
+    assert isinstance(row, main._RowBase) and not hasattr(row, "__dict__")
+    assert row["nom"] == "a" and row.get("absente", 0) == 0 and dict(row.items()) == {"id": 1, "nom": "a", "tags": [1, 2]}
+
+
+def test_legacy_dict_rows_are_read_and_upgraded(db):
+    db("create_table p (id:int, nom:str)")
+    with open(main._data_file("p"), "w", encoding="utf-8") as f:
+        json.dump([{"id": 1, "nom": "a"}, {"id": 2, "nom": "b"}], f)
+    assert table_rows("p") == [{"id": 1, "nom": "a"}, {"id": 2, "nom": "b"}]
+    assert search("p", "id = 2") == [{"id": 2, "nom": "b"}]
+    db("insert p id=3, nom='c'")
+    with open(main._data_file("p"), "r", encoding="utf-8") as f:
+        assert json.load(f)["rows"] == [[1, "a"], [2, "b"], [3, "c"]]
+
+
+def test_row_classes_are_shared(db):
+    cls = main._row_class(("a", "b"))
+    assert main._row_class(("a", "b")) is cls
+    row = cls([1, 2])
+    row["b"] = 3
+    assert row == {"a": 1, "b": 3}
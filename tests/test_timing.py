@@ -0,0 +1,39 @@
+import main
+
+
+def test_stats_recorded(db):
+    db("create_table emp (id:int, nom:str)\ninsert emp id=1, nom='a'\ninsert emp id=2, nom='b'")
+    main.run_command("search * from emp where id = 2")
+    stats = main._stats_history[-1]
+    assert stats["command"] == "search * from emp where id = 2"
+    assert stats["db"] == "test" and stats["user"] == "admin"
+    assert stats["rows_scanned"] == 2 and stats["rows_matched"] == 1
+    assert stats["bytes_read"] > 0 and stats["total_s"] > 0
+    assert stats["error"] is None
+
+    main.run_command("insert emp id=3, nom='c'")
+    assert main._stats_history[-1]["bytes_written"] > 0
+
+
+def test_timing_output(db, capsys):
+    db("create_table emp (id:int)\ninsert emp id=1")
+    out = db("timing on\nsearch * from emp")
+    assert out.count("Temps : ") == 1  # pas après 'timing' lui-même
+    assert "lignes parcourues 1, retenues 1" in out
+    out = db("timing off\nsearch * from emp")
+    assert "Temps : " not in out
+    db("timing peut-être", ok=False)
+
+
+def test_listeners_and_history(db):
+    seen = []
+    main.add_stats_listener(seen.append)
+    try:
+        main.run_command("show_tables")
+    finally:
+        main.remove_stats_listener(seen.append)
+    main.run_command("show_tables")
+    assert [s["command"] for s in seen] == ["show_tables"]
+    records = main.command_stats(clear=True)
+    assert records[-1]["command"] == "show_tables"
+    assert not main.command_stats()
@@ -0,0 +1,58 @@
+import os
+
+import main
+from conftest import search, table_rows
+
+BASE = """create_table emp (id:int auto_increment, nom:str, ville:str, sal:int)
+insert emp nom='a', ville='Tana', sal=100
+insert emp nom='b', ville='Tana', sal=200
+insert emp nom='c', ville='Fianar', sal=300
+"""
+
+
+def fresh(view):
+    """Contenu de la vue comparé à un recalcul complet."""
+    rows = table_rows(view)
+    main._rebuild_view(view, main._load_view(view))
+    return rows, table_rows(view)
+
+
+def test_projection_view_is_maintained(db):
+    db(BASE + "create materialized view riches as search nom,sal from emp where sal >= 200")
+    assert table_rows("riches") == [{"nom": "b", "sal": 200}, {"nom": "c", "sal": 300}]
+    db("""insert emp nom='d', ville='Tana', sal=500
+update emp set sal=50 where nom = 'b'
+update emp set sal=250 where nom = 'a'""")
+    rows, rebuilt = fresh("riches")
+    assert sorted(rows, key=lambda r: r["nom"]) == sorted(rebuilt, key=lambda r: r["nom"])
+    assert [r["nom"] for r in rows] == ["c", "d", "a"]
+
+
+def test_identical_projections_removed_once(db):
+    db(BASE + "insert emp nom='e', ville='Tana', sal=100\n"
+       "create materialized view villes as search ville from emp")
+    db("update emp set ville='Tulear' where nom = 'a'")
+    assert sorted(r["ville"] for r in table_rows("villes")) == ["Fianar", "Tana", "Tana", "Tulear"]
+
+
+def test_delta_keeps_view_schema_file(db):
+    db(BASE + "create materialized view riches as search nom,sal from emp where sal >= 200\n"
+       "create materialized view parville as search ville,count(*),sum(sal) from emp group by ville")
+    stamps = {v: os.stat(main._table_file(v, "schema.json")).st_ino for v in ("riches", "parville")}
+    db("insert emp nom='d', ville='Tana', sal=500")
+    assert {v: os.stat(main._table_file(v, "schema.json")).st_ino for v in stamps} == stamps
+
+
+def test_search_aggregated_view_columns(db):
+    db(BASE + "create materialized view parville as search ville,count(*),sum(sal) from emp group by ville")
+    rows = search("parville")
+    assert sorted((r["ville"], r["count(*)"], r["sum(sal)"]) for r in rows) == [("Fianar", 1, 300), ("Tana", 2, 300)]
+    assert search("parville", "ville = 'Tana'", columns=["sum(sal)"]) == [{"sum(sal)": 300}]
+    db("insert emp nom='d', ville='Tana', sal=500")
+    assert search("parville", "ville = 'Tana'", columns=["count(*)", "sum(sal)"]) == [{"count(*)": 3, "sum(sal)": 800}]
+
+
+def test_view_errors(db):
+    db(BASE + "create materialized view v as search nom from emp")
+    db("insert v nom='x'", ok=False)
+    db("refresh v")
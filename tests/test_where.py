@@ -0,0 +1,90 @@
+import pytest
+
+import main
+from conftest import search
+
+SCHEMA = {"id": "int", "nom": "str", "age": "int", "ville": "str"}
+ROWS = [
+    {"id": 1, "nom": "Rakoto", "age": 20, "ville": "Tana"},
+    {"id": 2, "nom": "Rabe", "age": 35, "ville": "Tamatave"},
+    {"id": 3, "nom": "Soa", "age": 17, "ville": None},
+    {"id": 4, "nom": "Koto", "age": 65, "ville": "Tana"},
+]
+
+
+def matching(where):
+    pred = main._build_where_predicate(where, SCHEMA)
+    return [r["id"] for r in ROWS if pred(r)]
+
+
+@pytest.mark.parametrize("where, ids", [
+    ("", [1, 2, 3, 4]),
+    ("age > 18", [1, 2, 4]),
+    ("age >= 20 and ville = 'Tana'", [1, 4]),
+    ("ville = 'Tana' or age < 18", [1, 3, 4]),
+    ("age > 18 and ville = 'Tana' or id = 3", [1, 3, 4]),  # and avant or
+    ("age > 18 and (ville = 'Tana' or id = 3)", [1, 4]),
+    ("not ville = 'Tana'", [2, 3]),
+    ("id in (1, 3)", [1, 3]),
+    ("id not in (1, 3)", [2, 4]),
+    ("age between 18 and 40", [1, 2]),
+    ("age not between 18 and 40", [3, 4]),
+    ("ville is null", [3]),
+    ("ville is not null", [1, 2, 4]),
+    ("ville = null", [3]),
+    ("nom like 'ra%'", [1, 2]),
+    ("nom like '%to'", [1, 4]),
+    ("nom like '%o%o%'", [1, 4]),
+    ("nom not like 'ra%'", [3, 4]),
+    ("nom = 'O''Brien'", []),
+    ("age <> 20", [2, 3, 4]),
+])
+def test_predicates(where, ids):
+    assert matching(where) == ids
+
+
+@pytest.mark.parametrize("where", [
+    "age >",
+    "age > 18 and",
+    "(age > 18",
+    "age > 18)",
+    "age not = 3",
+    "age < null",
+    "age @ 3",
+])
+def test_syntax_errors(where):
+    with pytest.raises(ValueError):
+        main._parse_where_clause(where)
+
+
+def test_unknown_column():
+    with pytest.raises(ValueError, match="colonne inconnue"):
+        main._build_where_predicate("taille > 3", SCHEMA)
+
+
+def test_short_circuit_skips_like():
+    calls = []
+    tree = main._parse_where_clause("nom like '%a%b%' and id = 1")
+    pred = main._compile_where(tree, SCHEMA)
+
+    class Row(dict):
+        def get(self, key, default=None):
+            calls.append(key)
+            return super().get(key, default)
+
+    assert not pred(Row(ROWS[1]))
+    assert calls == ["id"]  # le LIKE (regex) est évalué en dernier
+
+
+def test_parse_is_cached():
+    assert main._parse_where_clause("age > 1") is main._parse_where_clause("age > 1")
+
+
+def test_search_command(db):
+    db("""create_table p (id:int auto_increment, nom:str, age:int)
+insert p nom='Rakoto', age=20
+insert p nom='Soa', age=17
+insert p nom='Rabe', age=35""")
+    assert search("p", "age >= 18 and nom like 'r%'", columns=["nom"]) == [{"nom": "Rakoto"}, {"nom": "Rabe"}]
+    out = db("search * from p where age >>> 3", ok=False)
+    assert "WHERE" in out
@@ -0,0 +1,66 @@
+import builtins
+import os
+
+import main
+from conftest import search, table_rows
+
+
+def _setup(db):
+    db("writeback on delay=60\ncreate_table emp (id:int, nom:str)\ncreate_index emp id")
+    # run_script écrit tout en fin de script : les insertions suivantes passent par run_command
+    main.run_command("insert emp id=1, nom='Rakoto'")
+    assert ("test", "emp", None) in main._pending_writes
+
+
+def test_pending_rows_are_visible(db):
+    _setup(db)
+    assert [r["nom"] for r in search("emp", "id = 1")] == ["Rakoto"]
+    assert table_rows("emp") == [{"id": 1, "nom": "Rakoto"}]
+
+
+def test_flush_writes_into_the_pending_db(db, db_root):
+    _setup(db)
+    main.current_db = "other"  # le flusher écrit après un changement de base
+    os.makedirs(os.path.join(str(db_root), "other"))
+    assert main.flush_writes() == 1
+    assert os.listdir(os.path.join(str(db_root), "other")) == []
+    main.current_db = "test"
+    main._index_cache.clear()
+    assert main._read_data_file(main._data_file("emp"))[0]["nom"] == "Rakoto"
+    assert main._load_catalog()["tables"]["emp"]["rows"] == 1
+    assert search("emp", "id = 1")[0]["nom"] == "Rakoto"
+    assert main._load_index("emp", "id")["partitions"]
+
+
+def test_create_db_flushes_pending(db, db_root):
+    _setup(db)
+    main.run_command("create_db other")
+    assert main.current_db == "other"
+    assert not main._pending_writes
+    assert os.listdir(os.path.join(str(db_root), "other")) == []
+    main.current_db = "test"
+    assert main._read_data_file(main._data_file("emp"))[0]["nom"] == "Rakoto"
+
+
+def test_prompt_flushes_on_eof(db, monkeypatch, capsys):
+    _setup(db)
+    lines = iter(["insert emp id=2, nom='Rabe'"])
+
+    def fake_input(prompt_text=""):
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError
+    monkeypatch.setattr(builtins, "input", fake_input)
+    main.prompt()
+    assert "Fin de session." in capsys.readouterr().out
+    assert not main._pending_writes
+    rows = main._read_data_file(main._data_file("emp"))
+    assert [r["id"] for r in rows] == [1, 2]
+
+
+def test_writeback_off_flushes(db):
+    _setup(db)
+    main.run_command("writeback off")
+    assert not main._pending_writes
+    assert len(main._read_data_file(main._data_file("emp"))) == 1
@@ -0,0 +1,42 @@
+import os
+
+import main
+from conftest import search
+
+
+def access_path(db, line):
+    db(line)
+    return main._stats_history[-1]["access_path"]
+
+
+def fill(db, n=2000):
+    main.ZONE_MAPS["segment_rows"] = 100
+    db("create_table p (id:int auto_increment, seq:int, code:str)")
+    main.insert_rows("p", [{"seq": str(i), "code": f"c{i}"} for i in range(n)])
+    db("analyze p")
+    assert os.path.exists(main._zones_file("p"))
+
+
+def test_min_max_skip_segments(db):
+    fill(db)
+    assert access_path(db, "search * from p where seq between 150 and 160") == "zone maps"
+    assert [r["seq"] for r in search("p", "seq between 150 and 160")] == list(range(150, 161))
+    assert main._stats_history[-1]["rows_scanned"] <= 200
+    # la plupart des segments restent : scan complet
+    assert access_path(db, "search * from p where seq > 10") == "scan complet"
+
+
+def test_bloom_filter_equality(db):
+    fill(db)
+    assert access_path(db, "search * from p where code = 'c1234'") == "zone maps"
+    assert [r["seq"] for r in search("p", "code = 'c1234'")] == [1234]
+    assert search("p", "code = 'absent'") == []
+
+
+def test_zone_maps_follow_writes(db):
+    fill(db)
+    db("""insert p seq=5000, code='nouveau'
+update p set seq=-1 where code = 'c10'""")
+    assert [r["code"] for r in search("p", "seq >= 5000")] == ["nouveau"]
+    assert [r["code"] for r in search("p", "seq < 0")] == ["c10"]
+    assert [r["seq"] for r in search("p", "code = 'nouveau'")] == [5000]